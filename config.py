@@ -20,6 +20,27 @@ def get_env_int(var_name, default=0):
         return default
 
 
+def get_env_float(var_name, default=0.0):
+    """將環境變數轉換為 Float"""
+    try:
+        return float(os.getenv(var_name, default))
+    except (ValueError, TypeError):
+        return default
+
+
+def get_env_int_list(var_name, default):
+    """將以逗號分隔的環境變數轉換為排序後的正整數 list (忽略無效的項目，全部無效時使用預設值)"""
+    values = []
+    for item in os.getenv(var_name, "").split(","):
+        try:
+            value = int(item)
+        except ValueError:
+            continue
+        if value > 0:
+            values.append(value)
+    return sorted(values or default)
+
+
 def get_env_ssl_verify(var_name, default=True):
     """
     處理特殊的 SSL_VERIFY:
@@ -62,10 +83,104 @@ class Config:
     OLLAMA_BASE_URL =  os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
     OLLAMA_API_KEY = os.getenv("OLLAMA_API_KEY")
     OLLAMA_MODEL_NAME = os.getenv("OLLAMA_MODEL_NAME", "llama3:8b")
+    # 模型常駐時間 (Ollama keep_alive: "30m", "1h", 秒數, 或 -1 代表永久常駐)
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    # num_ctx 依 prompt 長度挑選固定的 bucket，避免每次請求大小不同導致模型重新載入
+    OLLAMA_NUM_CTX_BUCKETS = get_env_int_list("OLLAMA_NUM_CTX_BUCKETS", [4096, 8192, 16384, 32768])
+    # 為輸出保留的 token 數 (加在 prompt 長度上再挑 bucket)
+    OLLAMA_COMPLETION_RESERVE = get_env_int("OLLAMA_COMPLETION_RESERVE", 4096)
+    # 啟動時預先載入 OLLAMA_MODEL_NAME 與 embedding 模型 (使用 Ollama 時再開啟，避免對不存在的本機伺服器發出請求)
+    OLLAMA_WARMUP = get_env_bool("OLLAMA_WARMUP", False)
+    OLLAMA_WARMUP_NUM_CTX = get_env_int("OLLAMA_WARMUP_NUM_CTX", 8192)
+
+    # LLM HTTP connection pool (shared by every provider)
+    LLM_TIMEOUT = get_env_int("LLM_TIMEOUT", 600)
+    LLM_POOL_CONNECTIONS = get_env_int("LLM_POOL_CONNECTIONS", 10)
+    LLM_POOL_MAXSIZE = get_env_int("LLM_POOL_MAXSIZE", 20)
+    LLM_KEEPALIVE_EXPIRY = get_env_int("LLM_KEEPALIVE_EXPIRY", 60)
+    # Opt-in response cache in front of call_llm (src.llm.cache)
+    LLM_CACHE_ENABLED = get_env_bool("LLM_CACHE_ENABLED", False)
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_responses.sqlite3")
+    LLM_CACHE_MAX_BYTES = get_env_int("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+    LLM_CACHE_MAX_ENTRIES = get_env_int("LLM_CACHE_MAX_ENTRIES", 10000)
+    LLM_CACHE_TTL = get_env_int("LLM_CACHE_TTL", 7 * 24 * 3600)  # seconds, 0 = never expire
+    # Client-side rate limiting (per provider <PROVIDER>_RPM / <PROVIDER>_TPM) and AIMD concurrency
+    LLM_RATE_LIMIT_ENABLED = get_env_bool("LLM_RATE_LIMIT_ENABLED", True)
+    LLM_INITIAL_CONCURRENCY = get_env_int("LLM_INITIAL_CONCURRENCY", 4)
+    LLM_MAX_CONCURRENCY = get_env_int("LLM_MAX_CONCURRENCY", 16)
+    # Completion tokens reserved per call (capped by max_tokens), settled against the actual usage afterwards
+    LLM_RATE_LIMIT_COMPLETION_RESERVE = get_env_int("LLM_RATE_LIMIT_COMPLETION_RESERVE", 1024)
+    LLM_MAX_RETRIES = get_env_int("LLM_MAX_RETRIES", 3)
+    # Hedged requests: also send the prompt to this provider/model after LLM_HEDGE_DELAY seconds
+    # (0 = immediately) and keep the first response. Disabled when LLM_HEDGE_PROVIDER is empty.
+    LLM_HEDGE_PROVIDER = os.getenv("LLM_HEDGE_PROVIDER")
+    LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL")
+    LLM_HEDGE_DELAY = get_env_float("LLM_HEDGE_DELAY", 5.0)
+    # Number of shared asyncio event-loop threads used by acall_llm callers (src.llm.event_loop)
+    LLM_EVENT_LOOP_THREADS = get_env_int("LLM_EVENT_LOOP_THREADS", 1)
+
+    # LLM Record/Replay (離線 benchmark)
+    # record: 錄製真實 provider 的回應；replay: 所有呼叫改由錄製的 corpus 回放；off: 關閉
+    LLM_REPLAY_MODE = os.getenv("LLM_REPLAY_MODE", "off")
+    LLM_REPLAY_PATH = os.getenv("LLM_REPLAY_PATH", ".cache/llm_replay.jsonl.gz")
+    # 回放時模擬的延遲倍率 (1.0 = 錄製時的延遲, 0 = 不等待)
+    LLM_REPLAY_LATENCY_SCALE = get_env_float("LLM_REPLAY_LATENCY_SCALE", 1.0)
 
     # Fuzzer
+    # 無頭加速模式: dummy video driver + 虛擬時鐘，以 frame 數為預算 (不再受 clock.tick 的實際時間限制)
+    FUZZER_HEADLESS = get_env_bool("FUZZER_HEADLESS", True)
+    FUZZER_FRAMES = get_env_int("FUZZER_FRAMES", 3600)  # 60 FPS 下約 60 秒的遊戲時間
+    # 每輪驗證平行執行的 seed 數與同時執行的行程上限 (0 = CPU 核心數)；第一個 crash 會取消其餘 seed
+    FUZZER_INSTANCES = get_env_int("FUZZER_INSTANCES", 4)
+    FUZZER_WORKERS = get_env_int("FUZZER_WORKERS", 0)
+    # random: 隨機 monkey bot (多 seed 平行)；coverage: coverage-guided (輸入序列 corpus + 突變)
+    FUZZER_MODE = os.getenv("FUZZER_MODE", "random")
+    FUZZER_COVERAGE_RUNS = get_env_int("FUZZER_COVERAGE_RUNS", 48)  # 每輪驗證的輸入序列數
+    FUZZER_COVERAGE_FRAMES = get_env_int("FUZZER_COVERAGE_FRAMES", 1200)  # 每個序列的 frame 數
+    # 效能量測 (第一個 seed): 超出預算時視為 performance bug 交給 run_fix
+    FUZZER_PROFILE = get_env_bool("FUZZER_PROFILE", True)
+    FUZZER_PERF_P95_FRAME_MS = get_env_float("FUZZER_PERF_P95_FRAME_MS", 1000 / 60)  # CPU time / frame
+    FUZZER_PERF_MAX_FONTS = get_env_int("FUZZER_PERF_MAX_FONTS", 10)  # 遊戲進行中建立的 Font 數
+    FUZZER_PERF_MAX_SPRITES = get_env_int("FUZZER_PERF_MAX_SPRITES", 2000)
+    FUZZER_PERF_MAX_MEMORY_GROWTH_MB = get_env_float("FUZZER_PERF_MAX_MEMORY_GROWTH_MB", 64)
+    # Crash 最小化: 以 delta debugging 將 crash 的輸入序列縮減為最小重現序列，修復後先重播它再做完整 Fuzz
+    FUZZER_MINIMIZE = get_env_bool("FUZZER_MINIMIZE", True)
+    FUZZER_MINIMIZE_MAX_RUNS = get_env_int("FUZZER_MINIMIZE_MAX_RUNS", 64)
+    FUZZER_MINIMIZE_TIME = get_env_int("FUZZER_MINIMIZE_TIME", 30)  # seconds
+    # Zygote fork server: 預先載入 pygame / pymunk 的常駐行程，每個 fuzz run 以 fork 產生 (不支援 fork 的平台自動退回 subprocess)
+    FUZZER_ZYGOTE = get_env_bool("FUZZER_ZYGOTE", True)
+    FUZZER_ZYGOTE_SOCKET = os.getenv("FUZZER_ZYGOTE_SOCKET", "")  # 空字串 = 暫存目錄下每個行程一個 socket
+    # 實際時間上限 (秒): 無頭模式下只作為卡死保護；關閉無頭模式時為即時測試的時長
     FUZZER_RUNNING_TIME = 30
 
+    # 驗證結果快取：相同程式碼 + fuzz logic 的語法/邏輯審查/Fuzz 結果不重複計算 (跨請求保存)
+    VERIFY_CACHE_ENABLED = get_env_bool("VERIFY_CACHE_ENABLED", True)
+    VERIFY_CACHE_PATH = os.getenv("VERIFY_CACHE_PATH", ".cache/verification.sqlite3")
+    VERIFY_CACHE_MAX_ENTRIES = get_env_int("VERIFY_CACHE_MAX_ENTRIES", 10000)
+    VERIFY_CACHE_TTL = get_env_int("VERIFY_CACHE_TTL", 7 * 24 * 3600)  # seconds, 0 = never expire
+
+    # 每個生成工作的獨立工作目錄 (output/jobs/<job_id>) 與 content-addressed artifact store
+    JOBS_DIR = os.getenv("JOBS_DIR", os.path.join("output", "jobs"))
+    ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", os.path.join("output", "artifacts"))
+    # 超過此秒數未修改的工作目錄會被 GC 刪除 (0 = 永不刪除)
+    JOB_TTL = get_env_int("JOB_TTL", 7 * 24 * 3600)
+
+    # 遊戲 Scaffold: 生成的程式碼繼承 game_runtime.Game，LLM 只需要寫遊戲本身的邏輯
+    GAME_SCAFFOLD_ENABLED = get_env_bool("GAME_SCAFFOLD_ENABLED", True)
+
+    # 程式碼生成模式: full = 一次生成整份程式碼；structural = 先生成骨架，再平行生成每個方法/函式的本體
+    CODE_GEN_MODE = os.getenv("CODE_GEN_MODE", "full")
+    CODE_GEN_WORKERS = get_env_int("CODE_GEN_WORKERS", 4)
+
+    # 截斷的程式碼生成自動續寫: 最多續寫幾次，以及整份輸出的 token 上限
+    CODE_CONTINUATION_MAX_ROUNDS = get_env_int("CODE_CONTINUATION_MAX_ROUNDS", 3)
+    CODE_CONTINUATION_TOKEN_BUDGET = get_env_int("CODE_CONTINUATION_TOKEN_BUDGET", 32768)
+
+    # Fixer: patch = LLM 只輸出 SEARCH/REPLACE 區塊 (套用失敗時退回整份重新生成)；full = 每次重新生成整份程式碼
+    FIXER_MODE = os.getenv("FIXER_MODE", "patch")
+    # 模糊比對 SEARCH 區塊時的最低相似度 (difflib ratio)
+    FIXER_PATCH_THRESHOLD = get_env_float("FIXER_PATCH_THRESHOLD", 0.85)
+
     # Embedding model
     LLM_EMBEDDING_PROVIDER = os.getenv("LLM_EMBEDDING_PROVIDER")
     LLM_EMBEDDING_SERVER_ADDRESS = os.getenv("LLM_EMBEDDING_SERVER_ADDRESS")
@@ -73,6 +188,11 @@ class Config:
     LLM_EMBEDDING_MODEL_TYPE = os.getenv("LLM_EMBEDDING_MODEL_TYPE")
     LLM_EMBEDDING_CLIENT_TOKEN = os.getenv("LLM_EMBEDDING_CLIENT_TOKEN")
 
+    # Semantic prompt cache (src.rag_service.semantic_cache), uses the embedding model above
+    SEMANTIC_CACHE_ENABLED = get_env_bool("SEMANTIC_CACHE_ENABLED", False)
+    SEMANTIC_CACHE_THRESHOLD = get_env_float("SEMANTIC_CACHE_THRESHOLD", 0.92)
+    SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", ".cache/semantic_cache.sqlite3")
+
     # Chroma
     CHROMA_TENANT = os.getenv("CHROMA_TENANT", "default_tenant")
     CHROMA_DATABASE = os.getenv("CHROMA_DATABASE")
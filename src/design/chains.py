@@ -1,19 +1,24 @@
-from src.utils import call_llm
+from src.utils import call_llm, is_llm_error
 from src.design.prompts import CEO_PROMPT, CPO_PROMPT
 
 
-def run_design_phase(user_input, provider="openai", model="gpt-4o-mini"):
+def run_design_phase(user_input, provider="openai", model="gpt-4o-mini", on_token=None):
     """
     流程：User -> CEO (分析) -> CPO (規則化) -> GDD
+    on_token: 串流模式的 callback，會收到 CEO/CPO 生成中的每一段 token
     """
     print(f"[Member 1] 收到需求: {user_input}")
 
     # 1. CEO 分析
-    ceo_response = call_llm(CEO_PROMPT, user_input, provider=provider, model=model)
+    ceo_response = call_llm(CEO_PROMPT, user_input, provider=provider, model=model, on_token=on_token,
+                            stage="ceo")
     print(f"[Member 1] CEO 分析完成: {ceo_response[:50]}...")
+    if is_llm_error(ceo_response):
+        return ceo_response
 
     # 2. CPO 產出文件
     cpo_input = f"用戶想法: {user_input}\nCEO 分析: {ceo_response}"
-    gdd_context = call_llm(CPO_PROMPT, cpo_input, provider=provider, model=model)
+    gdd_context = call_llm(CPO_PROMPT, cpo_input, provider=provider, model=model, on_token=on_token,
+                           stage="cpo")
 
     return gdd_context
\ No newline at end of file
@@ -1,12 +1,18 @@
 import os
+import threading
+import time
 from flask import Flask, render_template, request, redirect, url_for, flash, session, Response, stream_with_context
 from flask_session import Session
 from config import config
 
-from src.design.chains import run_design_phase
-from src.generation.core import run_core_phase
+from src.pipeline import run_generation_pipeline
 from src.testing.runner import launch_game
 from src.testing.fixer import run_fix_loop
+from src.rag_service.semantic_cache import get_semantic_cache
+from src.utils import relay_sse_tokens, warmup_ollama
+from src.llm.metrics import render_metrics
+from src.generation.file_utils import install_game_runtime
+from src.workspace import collect_garbage, create_workspace, job_file, new_job_id, record_artifact, record_file
 
 app = Flask(__name__)
 # --- Flask session config ---
@@ -15,7 +21,90 @@ app.config["SESSION_TYPE"] = "filesystem"
 Session(app)
 
 # Supporting providers
-PROVIDERS = ["mistral", "openai", "groq", "google", "ollama", "deepseek"]
+PROVIDERS = ["mistral", "openai", "groq", "google", "ollama", "deepseek", "replay"]
+
+# Every generation runs in its own workspace (output/jobs/<job_id>, see src.workspace);
+# the session only keeps the job id ('job_id'), never raw file paths.
+
+# Results of /generate_stream, keyed by generation job id.
+# The session cannot be modified once a streaming response has started, so the
+# stream stores its results here and the next GET / moves them into the session.
+# Results that are never picked up (abandoned sessions) are dropped after GENERATION_RESULTS_TTL seconds,
+# and at most GENERATION_RESULTS_MAX are kept (oldest first out).
+GENERATION_RESULTS: dict[str, dict] = {}
+GENERATION_RESULTS_LOCK = threading.Lock()
+GENERATION_RESULTS_TTL = 3600
+GENERATION_RESULTS_MAX = 256
+
+
+def store_generation_result(job_id: str, result: dict) -> None:
+    """
+    Store the result of a generation job for the next GET / and prune expired / excess results.
+    """
+    now = time.time()
+    with GENERATION_RESULTS_LOCK:
+        GENERATION_RESULTS[job_id] = dict(result, stored_at=now)
+        for stale_id in [key for key, value in GENERATION_RESULTS.items()
+                         if now - value["stored_at"] > GENERATION_RESULTS_TTL]:
+            del GENERATION_RESULTS[stale_id]
+        # dict 保持插入順序: 最前面的是最舊的
+        while len(GENERATION_RESULTS) > GENERATION_RESULTS_MAX:
+            del GENERATION_RESULTS[next(iter(GENERATION_RESULTS))]
+
+
+def lookup_semantic_cache(user_input: str):
+    """
+    Look up a previously verified generation of a similar game idea.
+    Embedding failures only disable the lookup, they never block the generation.
+    """
+    cache = get_semantic_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.lookup(user_input)
+    except Exception as e:
+        print(f"[Semantic Cache] Lookup failed: {e}")
+        return None
+
+
+def restore_cached_generation(hit, job_id: str) -> str:
+    """
+    Write the cached GDD, code and fuzz logic into the workspace of a new job.
+    :return: The path of the restored main.py
+    """
+    output_dir = create_workspace(job_id)
+    file_path = os.path.join(output_dir, "main.py")
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(hit.code)
+    install_game_runtime(output_dir, hit.code)
+    record_artifact(job_id, "gdd", hit.gdd)
+    record_file(file_path, "code")
+    if hit.fuzz_logic:
+        logic_path = os.path.join(output_dir, "fuzz_logic.py")
+        with open(logic_path, "w", encoding="utf-8") as f:
+            f.write(hit.fuzz_logic)
+        record_file(logic_path, "fuzz_logic")
+    return file_path
+
+
+def store_semantic_cache(user_input: str, gdd: str, file_path: str) -> None:
+    """
+    Store a verified generation (called once the fix loop reports RESULT_SUCCESS).
+    """
+    cache = get_semantic_cache()
+    if cache is None or not user_input or not file_path or not os.path.exists(file_path):
+        return
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            code = f.read()
+        fuzz_logic = ""
+        logic_path = os.path.join(os.path.dirname(file_path), "fuzz_logic.py")
+        if os.path.exists(logic_path):
+            with open(logic_path, "r", encoding="utf-8") as f:
+                fuzz_logic = f.read()
+        cache.store(user_input, gdd, code, fuzz_logic)
+    except Exception as e:
+        print(f"[Semantic Cache] Store failed: {e}")
 
 @app.route("/", methods=["GET", "POST"])
 def index():
@@ -31,12 +120,16 @@ def index():
 
         api_key = os.getenv(f"{provider.upper()}_API_KEY")
         model_name = os.getenv(f"{provider.upper()}_MODEL_NAME")
-        session['model_name'] = model_name
 
-        if not api_key or not model_name:
+        # replay 回放錄製好的回應，不需要 API Key
+        if provider == "replay":
+            model_name = model_name or "replay"
+        elif not api_key or not model_name:
             flash(f"{provider} API Key 或 Model Name 尚未設定！", "danger")
             return redirect(url_for("index"))
-        os.environ[f"{provider.upper()}_API_KEY"] = api_key
+        else:
+            os.environ[f"{provider.upper()}_API_KEY"] = api_key
+        session['model_name'] = model_name
 
         try:
             if action == "generate":
@@ -44,23 +137,29 @@ def index():
                     flash("請輸入遊戲點子！", "warning")
                     return redirect(url_for("index"))
 
-                # --- Phase 1: Design ---
-                session['gdd_result_global'] = run_design_phase(user_input, provider, model_name)
-                # --- Phase 2: Core ---
-                session['game_file_path_global'] = run_core_phase(session.get('gdd_result_global'), provider, model_name)
+                session['user_input_global'] = user_input
 
-                print("[Member 2] Generation complete")
+                # 語意快取：相似的遊戲點子直接使用已驗證過的結果 (勾選強制重新生成可跳過)
+                if request.form.get("force_regenerate") != "on":
+                    hit = lookup_semantic_cache(user_input)
+                    if hit is not None:
+                        job_id = new_job_id()
+                        restore_cached_generation(hit, job_id)
+                        session['gdd_result_global'] = hit.gdd
+                        session['job_id'] = job_id
+                        flash(f"⚡ 使用快取結果 (相似想法: \"{hit.user_input}\", 相似度 {hit.similarity:.2f})。"
+                              f"如需重新生成，請勾選「強制重新生成」。", "info")
+                        return redirect(url_for("index"))
 
-                if session.get('game_file_path_global'):
-                    session['auto_start_fix'] = True
-                    flash("核心代碼生成完畢，準備開始驗證...", "info")
-                else:
-                    flash("❌ 程式碼生成失敗，未能解析出 Python Block。", "danger")
+                # Phase 1 (Design) 與 Phase 2 (Core) 交給 /generate_stream 以串流方式執行
+                session['generation_job_id'] = new_job_id()
+                session['pending_user_input'] = user_input
+                session['auto_start_generate'] = True
 
 
             elif action == "launch_game":
-                path = session.get('game_file_path_global')
-                if path:
+                path = job_file(session.get('job_id'))
+                if path and os.path.exists(path):
                     msg = launch_game(path)
                     flash(msg, "info")
                 else:
@@ -72,19 +171,35 @@ def index():
 
         return redirect(url_for("index"))
     # --- Get ---
+    job_id = session.get('generation_job_id')
+    if job_id:
+        with GENERATION_RESULTS_LOCK:
+            result = GENERATION_RESULTS.pop(job_id, None)
+        if result is not None:
+            session.pop('generation_job_id', None)
+            session['gdd_result_global'] = result["gdd"]
+            session['job_id'] = job_id if result["file_path"] else None
+            if result["file_path"]:
+                session['auto_start_fix'] = True
+                flash("核心代碼生成完畢，準備開始驗證...", "info")
+            else:
+                flash(f"❌ {result.get('error') or '程式碼生成失敗，未能解析出 Python Block。'}", "danger")
+
     file_content = None
-    path = session.get('game_file_path_global')
+    path = job_file(session.get('job_id'))
     if path and os.path.exists(path):
         with open(path, "r", encoding="utf-8") as f:
             file_content = f.read()
     auto_start_fix = session.pop('auto_start_fix', None)
+    auto_start_generate = session.pop('auto_start_generate', None)
 
     return render_template("index.html",
                            gdd_result=session.get('gdd_result_global'),
-                           game_file_path=session.get('game_file_path_global'),
+                           game_file_path=path if file_content is not None else None,
                            file_content=file_content,
                            providers=PROVIDERS,
-                           auto_start_fix=auto_start_fix
+                           auto_start_fix=auto_start_fix,
+                           auto_start_generate=auto_start_generate
     )
 
 @app.route('/fix_stream')
@@ -94,19 +209,84 @@ def fix_stream():
     run_fix_loop is a generator function, which contains the message given by "yield".
     When the frontend received the message format sent by run_fix_loop, it will show the message automatically.
     """
-    if not session.get('game_file_path_global') or not session.get('gdd_result_global'):
+    path = job_file(session.get('job_id'))
+    if not path or not os.path.exists(path) or not session.get('gdd_result_global'):
         def error_gen():
             yield "data: 錯誤：尚未生成遊戲，無法開始驗證。\n\n"
         return Response(error_gen(), mimetype='text/event-stream')
     gdd = session.get('gdd_result_global')
-    path = session.get('game_file_path_global')
     provider = session.get('provider')
     model_name = session.get('model_name')
+    user_input = session.get('user_input_global')
+
+    def fix_events():
+        for event in run_fix_loop(gdd, path, provider, model_name):
+            if event.startswith("data: RESULT_SUCCESS"):
+                store_semantic_cache(user_input, gdd, path)
+            yield event
+
+    return Response(
+        stream_with_context(fix_events()),
+        mimetype='text/event-stream'
+    )
+
+@app.route('/generate_stream')
+def generate_stream():
+    """
+    Run the design and core phases (one stage graph, see build_generation_pipeline) and forward the
+    LLM output token by token.
+    Log lines are sent as "data: <message>", tokens as "data: TOKEN:<json string>".
+    The results are stored in GENERATION_RESULTS and picked up by the next GET /.
+    """
+    job_id = session.get('generation_job_id')
+    user_input = session.get('pending_user_input')
+    if not job_id or not user_input:
+        def error_gen():
+            yield "data: RESULT_FAIL: 錯誤：沒有等待中的生成工作。\n\n"
+        return Response(error_gen(), mimetype='text/event-stream')
+    provider = session.get('provider')
+    model_name = session.get('model_name')
+
+    def generate_events():
+        output_dir = create_workspace(job_id)
+        yield "data: [Member 1] 開始設計階段 (CEO -> CPO)，接著生成素材與程式碼...\n\n"
+        # 設計與核心階段在同一個 stage graph 中執行；測試階段由 /fix_stream 串流 (需要先把結果存進 session)
+        result = yield from relay_sse_tokens(run_generation_pipeline, user_input, provider, model_name,
+                                             with_testing=False, output_dir=output_dir)
+        gdd = result.outputs.get("gdd_context")
+        if gdd is None:
+            # 錯誤訊息不能當成 GDD 傳給後續階段
+            error = f"設計階段失敗: {result.errors.get('gdd_context', 'Empty GDD').replace(chr(10), ' ')}"
+            store_generation_result(job_id, {"gdd": None, "file_path": None, "error": error})
+            yield f"data: RESULT_FAIL: {error}\n\n"
+            return
+
+        file_path = result.outputs.get("save_code")
+        print("[Member 2] Generation complete")
+        store_generation_result(job_id, {"gdd": gdd, "file_path": file_path})
+
+        if file_path:
+            yield "data: RESULT_SUCCESS: 生成完畢\n\n"
+        else:
+            yield "data: RESULT_FAIL: 程式碼生成失敗，未能解析出 Python Block。\n\n"
+
     return Response(
-        stream_with_context(run_fix_loop(gdd, path, provider, model_name)),
+        stream_with_context(generate_events()),
         mimetype='text/event-stream'
     )
 
+@app.route('/metrics')
+def metrics():
+    """
+    Prometheus scrape endpoint: per-stage LLM latency, time-to-first-token, tokens and estimated cost.
+    """
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 def create_app():
     app.secret_key = config.SECRET_KEY
+    # 背景清除過期的工作目錄與沒有被引用的 artifacts
+    threading.Thread(target=collect_garbage, name="workspace-gc", daemon=True).start()
+    if config.OLLAMA_WARMUP:
+        # 背景載入模型，不阻塞 Flask 啟動
+        threading.Thread(target=warmup_ollama, name="ollama-warmup", daemon=True).start()
     return app
@@ -1,4 +1,5 @@
 import re
+from typing import Callable, Optional
 from src.utils import call_llm
 from src.generation.prompts import ART_PROMPT
 
@@ -6,7 +7,8 @@ from src.generation.prompts import ART_PROMPT
 def generate_assets(
         gdd_context: str,
         provider: str = "openai",
-        model: str = "gpt-4o-mini"
+        model: str = "gpt-4o-mini",
+        on_token: Optional[Callable[[str], None]] = None
 ) -> str:
     """
     Generate the art assets for this specific game.
@@ -19,10 +21,14 @@ def generate_assets(
     :param model: The LLM model to use
     :type model: str
 
+    :param on_token: Streaming callback receiving every token delta
+    :type on_token: Optional[Callable[[str], None]]
+
     :return: The generated assets json
     :rtype: str
     """
-    response = call_llm(ART_PROMPT, f"GDD Content:\n{gdd_context}", provider=provider, model=model)
+    response = call_llm(ART_PROMPT, f"GDD Content:\n{gdd_context}", provider=provider, model=model, on_token=on_token,
+                        stage="art")
 
     try:
         # Find {...} structure
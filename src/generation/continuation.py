@@ -0,0 +1,114 @@
+import re
+from typing import Callable, Optional
+
+from config import config
+from src.generation.prompts import CONTINUATION_PROMPT
+from src.llm.metrics import estimate_tokens, last_record
+from src.utils import call_llm, is_llm_error
+
+# finish_reason 值 (已轉小寫): OpenAI 相容 / Ollama = "length", Gemini = "max_tokens"
+TRUNCATION_FINISH_REASONS = ("length", "max_tokens")
+
+# 兩段輸出重疊至少這麼多字元才視為重複內容
+MIN_OVERLAP_CHARS = 16
+MAX_OVERLAP_CHARS = 4000
+
+_OPEN_FENCE_PATTERN = re.compile(r"^\s*```python[^\n]*\n?", re.IGNORECASE)
+
+
+def has_open_code_fence(text: str) -> bool:
+    """
+    Whether the text opened a ```python block that was never closed.
+    """
+    start = text.find("```python")
+    if start == -1:
+        return False
+    return text.find("```", start + len("```python")) == -1
+
+
+def is_truncated(text: str, finish_reason: Optional[str]) -> bool:
+    """
+    A ```python block decides by itself (open = truncated); without one, the provider's finish_reason decides.
+    """
+    if "```python" in text:
+        return has_open_code_fence(text)
+    return finish_reason in TRUNCATION_FINISH_REASONS
+
+
+def stitch(previous: str, continuation: str) -> str:
+    """
+    Join a continuation to the truncated text, dropping what the model repeated:
+    a re-opened ```python fence, an overlap between the end of previous and the start of the continuation,
+    or a re-written copy of the cut last line.
+    """
+    if has_open_code_fence(previous):
+        continuation = _OPEN_FENCE_PATTERN.sub("", continuation, count=1)
+
+    limit = min(len(previous), len(continuation), MAX_OVERLAP_CHARS)
+    for size in range(limit, MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(continuation[:size]):
+            return previous + continuation[size:]
+
+    # 截斷在一行中間，而模型把整行重新寫了一次
+    head, _, partial_line = previous.rpartition("\n")
+    if partial_line.strip() and continuation.lstrip("\n").startswith(partial_line):
+        return head + "\n" + continuation.lstrip("\n")
+    return previous + continuation
+
+
+def call_llm_with_continuation(
+        system_prompt: str,
+        user_prompt: str,
+        provider: str = "openai",
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.7,
+        max_tokens: int = 8192,
+        on_token: Optional[Callable[[str], None]] = None,
+        stage: str = "unknown",
+        max_rounds: Optional[int] = None,
+        token_budget: Optional[int] = None
+) -> str:
+    """
+    call_llm for code generations: when the output is cut off (finish_reason "length"/"max_tokens"
+    or an unclosed ```python block), continuation calls resume from the cut point and the pieces are
+    stitched together, until the code block closes, max_rounds continuations were made or the output
+    reaches token_budget tokens.
+    :param max_rounds: Maximum continuation calls (default CODE_CONTINUATION_MAX_ROUNDS)
+    :type max_rounds: Optional[int]
+
+    :param token_budget: Maximum estimated tokens of the stitched output (default CODE_CONTINUATION_TOKEN_BUDGET)
+    :type token_budget: Optional[int]
+
+    :return: The (stitched) response, or the error string of the first call
+    :rtype: str
+    """
+    max_rounds = config.CODE_CONTINUATION_MAX_ROUNDS if max_rounds is None else max_rounds
+    token_budget = config.CODE_CONTINUATION_TOKEN_BUDGET if token_budget is None else token_budget
+
+    response = call_llm(system_prompt, user_prompt, provider=provider, model=model, temperature=temperature,
+                        max_tokens=max_tokens, on_token=on_token, stage=stage)
+    if is_llm_error(response):
+        return response
+
+    rounds = 0
+    while is_truncated(response, _finish_reason()) and rounds < max_rounds:
+        if estimate_tokens(response) >= token_budget:
+            print(f"[Continuation] Token budget ({token_budget}) reached, keeping the truncated output")
+            break
+        rounds += 1
+        print(f"[Continuation] Output truncated, continuing ({rounds}/{max_rounds})...")
+
+        prompt = CONTINUATION_PROMPT.format(request=user_prompt, partial=response)
+        continuation = call_llm(system_prompt, prompt, provider=provider, model=model, temperature=temperature,
+                                max_tokens=max_tokens, on_token=on_token, stage=f"{stage}_continuation")
+        if is_llm_error(continuation) or not continuation.strip():
+            print(f"[Continuation] Continuation failed: {continuation[:100]}")
+            break
+        response = stitch(response, continuation)
+
+    return response
+
+
+def _finish_reason() -> Optional[str]:
+    record = last_record()
+    return record.finish_reason if record is not None else None
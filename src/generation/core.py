@@ -1,18 +1,30 @@
-from src.utils import call_llm
-from src.generation.prompts import PROGRAMMER_PROMPT_TEMPLATE, FUZZER_GENERATION_PROMPT
+from src.utils import call_llm, is_llm_error
+from src.generation.prompts import (PROGRAMMER_PROMPT_TEMPLATE, FUZZER_GENERATION_PROMPT, SKELETON_TASK_PROMPT,
+                                    COMPONENT_TASK_PROMPT, SCAFFOLD_PROGRAMMER_PROMPT)
 from src.generation.asset_gen import generate_assets
-from src.generation.file_utils import save_code_to_file
+from src.generation.continuation import call_llm_with_continuation
+from src.generation.file_utils import StreamingCodeExtractor, save_code_to_file
+from src.generation.skeleton import Placeholder, extract_code, extract_function, find_placeholders, splice
+from src.pipeline import Pipeline, Stage, StageFailed
+from src.workspace import record_artifact, record_file
+from config import config
+from concurrent.futures import ThreadPoolExecutor
+import ast
 import os
+from typing import Callable, Optional
 
 
 def generate_code(
         gdd_context: str,
         asset_json: str,
         provider: str = "openai",
-        model: str = "gpt-4o-mini"
+        model: str = "gpt-4o-mini",
+        on_token: Optional[Callable[[str], None]] = None
 ) -> str:
     """
     Generate code according to the given gdd context and the given asset json.
+    With GAME_SCAFFOLD_ENABLED the code is written on top of game_runtime (copied next to main.py when saved),
+    so the LLM only writes the game-specific hooks.
     :param gdd_context: The gdd context to generate code for
     :type gdd_context: str
 
@@ -25,6 +37,9 @@ def generate_code(
     :param model: The LLM model to use
     :type model: str
 
+    :param on_token: Streaming callback receiving every token delta
+    :type on_token: Optional[Callable[[str], None]]
+
     :return: The generated code
     :rtype: str
     """
@@ -38,18 +53,27 @@ def generate_code(
 
     Write the full code now following the Template.
     """
-    return call_llm(PROGRAMMER_PROMPT_TEMPLATE, full_prompt, provider=provider, model=model, temperature=0.2)
+    system_prompt = SCAFFOLD_PROGRAMMER_PROMPT if config.GAME_SCAFFOLD_ENABLED else PROGRAMMER_PROMPT_TEMPLATE
+    # 輸出被截斷時自動續寫，而不是留給 save_code_to_file 硬補 pass
+    return call_llm_with_continuation(system_prompt, full_prompt, provider=provider, model=model,
+                                      temperature=0.2, on_token=on_token, stage="programmer")
 
 
 def generate_structural_code(
         gdd_context: str,
         asset_json: str,
         provider: str = "mistral",
-        model: str = "codestral-latest"
-        
-):
+        model: str = "codestral-latest",
+        on_token: Optional[Callable[[str], None]] = None
+) -> str:
     """
     Generate structural code according to the given gdd context and the given asset json.
+    Two levels: first a skeleton (classes, method signatures, state machine) with placeholder bodies,
+    then every placeholder body is generated concurrently with the skeleton as shared context.
+    The bodies are spliced back by AST line numbers and the result is validated with ast.parse;
+    if the skeleton or the assembled code is invalid, or a component still fails after its retry,
+    it falls back to generate_code (stubbed code is never returned).
+    With GAME_SCAFFOLD_ENABLED the skeleton and the components are written on top of game_runtime.
     :param gdd_context: The gdd context to generate code for
     :type gdd_context: str
 
@@ -62,17 +86,81 @@ def generate_structural_code(
     :param model: The LLM model to use
     :type model: str
 
-    :return: The generated code
+    :param on_token: Streaming callback receiving the skeleton tokens and one progress line per component
+    :type on_token: Optional[Callable[[str], None]]
+
+    :return: The generated code (in a ```python block, like generate_code)
     :rtype: str
     """
-
+    print("[Member 2] Generating the code skeleton...")
+    system_prompt = SCAFFOLD_PROGRAMMER_PROMPT if config.GAME_SCAFFOLD_ENABLED else PROGRAMMER_PROMPT_TEMPLATE
+    skeleton_prompt = SKELETON_TASK_PROMPT.format(gdd=gdd_context, assets=asset_json)
+    raw_skeleton = call_llm_with_continuation(system_prompt, skeleton_prompt, provider=provider,
+                                              model=model, temperature=0.2, on_token=on_token,
+                                              stage="programmer_skeleton")
+    if is_llm_error(raw_skeleton):
+        return raw_skeleton
+
+    skeleton = extract_code(raw_skeleton)
+    try:
+        placeholders = find_placeholders(skeleton)
+    except SyntaxError as e:
+        print(f"[Member 2] Invalid skeleton ({e}), falling back to full generation")
+        return generate_code(gdd_context, asset_json, provider, model, on_token=on_token)
+
+    def generate_component(placeholder: Placeholder) -> tuple[str, str | None]:
+        prompt = COMPONENT_TASK_PROMPT.format(
+            gdd=gdd_context,
+            assets=asset_json,
+            skeleton=skeleton,
+            name=placeholder.name,
+            name_short=placeholder.short_name,
+            signature=placeholder.signature
+        )
+        # 失敗時重試一次
+        for _ in range(2):
+            response = call_llm_with_continuation(system_prompt, prompt, provider=provider,
+                                                  model=model, temperature=0.2, stage="programmer_component")
+            if is_llm_error(response):
+                continue
+            source = extract_function(response, placeholder.short_name)
+            if source is not None:
+                return placeholder.name, source
+        return placeholder.name, None
+
+    print(f"[Member 2] Skeleton ready, generating {len(placeholders)} components in parallel...")
+    implementations: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, config.CODE_GEN_WORKERS)) as pool:
+        for name, source in pool.map(generate_component, placeholders):
+            if source is None:
+                print(f"[Member 2] Component {name} failed")
+                continue
+            implementations[name] = source
+            if on_token is not None:
+                on_token(f"\n# ✔ {name}\n")
+
+    missing = [p.name for p in placeholders if p.name not in implementations]
+    if missing:
+        # 每個 component 已重試過一次，仍失敗就不要回傳還留著 NotImplementedError 的程式碼
+        print(f"[Member 2] Components failed ({', '.join(missing)}), falling back to full generation")
+        return generate_code(gdd_context, asset_json, provider, model, on_token=on_token)
+
+    code = splice(skeleton, implementations, placeholders)
+    try:
+        ast.parse(code)
+    except SyntaxError as e:
+        print(f"[Member 2] Assembled code is invalid ({e}), falling back to full generation")
+        return generate_code(gdd_context, asset_json, provider, model, on_token=on_token)
+
+    return f"```python\n{code}```"
 
 
 
 def generate_fuzzer_logic(
         gdd_context: str,
         provider: str = "openai",
-        model: str = "gpt-4o-mini"
+        model: str = "gpt-4o-mini",
+        on_token: Optional[Callable[[str], None]] = None
 ) -> str:
     """
     Generate a fuzzer logic according to the given gdd context.
@@ -85,22 +173,131 @@ def generate_fuzzer_logic(
     :param model: The LLM model to use
     :type model: str
 
+    :param on_token: Streaming callback receiving every token delta
+    :type on_token: Optional[Callable[[str], None]]
+
     :return: The generated code
     :rtype: str
     """
     print("[Member 2] Start to generate fuzzer logic")
     prompt = FUZZER_GENERATION_PROMPT.replace("{gdd}", gdd_context)
     print("[Member 2] Generating the custom fuzzer test script (Fuzzer)...")
-    return call_llm("You are a QA Engineer.", prompt, provider=provider, model=model, temperature=0.2)
+    return call_llm("You are a QA Engineer.", prompt, provider=provider, model=model, temperature=0.2,
+                    on_token=on_token, stage="fuzzer_logic")
+
+
+def _report_code_block(start_line: int, end_line: int, error: Optional[SyntaxError]) -> None:
+    if error is not None:
+        print(f"[Member 2] Syntax error in lines {start_line}-{end_line} while streaming: {error}")
+
+
+def build_core_stages(
+        provider: str = "openai",
+        model: str = "gpt-4o-mini",
+        on_token: Optional[Callable[[str], None]] = None,
+        output_dir: str = "output"
+) -> list[Stage]:
+    """
+    The core phase as a stage graph (input: "gdd_context"):
+        gdd_context -> assets -> code -> save_code ---------> save_fuzz_logic
+        gdd_context -> fuzzer_logic ----------------------------^
+    The fuzzer logic only needs the GDD, so it runs in parallel with the assets and the code.
+    Only the assets/code stages stream tokens to on_token, so the parallel fuzzer output
+    does not interleave with the code in the live view.
+    :param provider: The LLM service provider
+    :type provider: str
+
+    :param model: The LLM model to use
+    :type model: str
+
+    :param on_token: Streaming callback receiving every token delta
+    :type on_token: Optional[Callable[[str], None]]
+
+    :param output_dir: The directory of the generated files (the job workspace)
+    :type output_dir: str
+
+    :return: The stages of the core phase
+    :rtype: list[Stage]
+    """
+
+    def assets_stage(gdd_context: str) -> str:
+        print("[Member 2] Start to generate the assets (JSON)...")
+        assets = generate_assets(gdd_context, provider, model, on_token=on_token)
+        print(f"[Member 2] Generation complete: {assets[:50]}...")
+        record_artifact(output_dir, "assets", assets)
+        return assets
+
+    def code_stage(gdd_context: str, assets: str) -> str:
+        print("[Member 2] Start to generate the code...")
+        code_on_token = on_token
+        extractor = None
+        if on_token is not None:
+            # 串流模式: 程式碼邊生成邊寫入檔案，並在生成途中檢查已完成的頂層區塊
+            extractor = StreamingCodeExtractor(output_dir=output_dir, on_block=_report_code_block)
+
+            def code_on_token(delta: str) -> None:
+                extractor.feed(delta)
+                on_token(delta)
+
+        if config.CODE_GEN_MODE == "structural":
+            raw_code = generate_structural_code(gdd_context, assets, provider, model, on_token=code_on_token)
+        else:
+            raw_code = generate_code(gdd_context, assets, provider, model, on_token=code_on_token)
+        if extractor is not None:
+            extractor.close()
+        if is_llm_error(raw_code):
+            # 429 等錯誤已在 call_llm 重試過，仍失敗就不要把錯誤訊息當成程式碼存檔
+            print(f"[Member 2] Code generation failed: {raw_code}")
+            raise StageFailed(raw_code)
+        return raw_code
+
+    def save_code_stage(code: str) -> str:
+        print("[Member 2] Saving file...")
+        file_path = save_code_to_file(code, output_dir=output_dir)
+        if not file_path:
+            raise StageFailed("No python code block in the generated code")
+        record_file(file_path, "code")
+        return file_path
+
+    def fuzzer_logic_stage(gdd_context: str) -> str | None:
+        fuzzer_logic = generate_fuzzer_logic(gdd_context, provider, model)
+        if is_llm_error(fuzzer_logic):
+            print(f"[Member 2] Fuzzer logic generation failed, using the default fuzz logic: {fuzzer_logic}")
+            return None
+        return fuzzer_logic
+
+    def save_fuzz_logic_stage(save_code: str, fuzzer_logic: str | None) -> str | None:
+        # 不存檔: 沒有 fuzz_logic.py 時 fuzzer 會改用預設的 monkey bot (空檔案則不會注入任何輸入)
+        if fuzzer_logic is None:
+            return None
+        fuzz_logic_path = save_code_to_file(fuzzer_logic, output_dir=os.path.dirname(save_code),
+                                            filename="fuzz_logic.py")
+        if os.path.getsize(fuzz_logic_path) == 0:
+            print("[Member 2] No python code in the generated fuzzer logic, using the default fuzz logic")
+            os.remove(fuzz_logic_path)
+            return None
+        record_file(fuzz_logic_path, "fuzz_logic")
+        return fuzz_logic_path
+
+    return [
+        Stage("assets", assets_stage, ("gdd_context",)),
+        Stage("code", code_stage, ("gdd_context", "assets")),
+        Stage("save_code", save_code_stage, ("code",)),
+        Stage("fuzzer_logic", fuzzer_logic_stage, ("gdd_context",)),
+        Stage("save_fuzz_logic", save_fuzz_logic_stage, ("save_code", "fuzzer_logic")),
+    ]
 
 
 def run_core_phase(
         gdd_context: str,
         provider: str = "openai",
-        model: str = "gpt-4o-mini"
+        model: str = "gpt-4o-mini",
+        on_token: Optional[Callable[[str], None]] = None,
+        output_dir: str = "output"
 ) -> str:
     """
     Run the game and the logic tester (game tester) codes generation routine.
+    The stages run as a graph (see build_core_stages), the fuzzer logic overlaps with the assets and the code.
     :param gdd_context: The gdd context to generate code for
     :type gdd_context: str
 
@@ -110,24 +307,15 @@ def run_core_phase(
     :param model: The LLM model to use
     :type model: str
 
+    :param on_token: Streaming callback receiving every token delta
+    :type on_token: Optional[Callable[[str], None]]
+
+    :param output_dir: The directory of the generated files (the job workspace, see src.workspace)
+    :type output_dir: str
+
     :return: The file path of the generated code
     :rtype: str
     """
-
-    print("[Member 2] Start to generate the assets (JSON)...")
-    assets = generate_assets(gdd_context, provider, model)
-    print(f"[Member 2] Generation complete: {assets[:50]}...")
-
-    print("[Member 2] Start to generate the code...")
-    raw_code = generate_code(gdd_context, assets, provider, model)
-
-    print("[Member 2] Saving file...")
-    file_path = save_code_to_file(raw_code)
-
-    if file_path:
-        fuzzer_logic_code = generate_fuzzer_logic(gdd_context, provider, model)
-        output_dir = os.path.dirname(file_path)
-
-        save_code_to_file(fuzzer_logic_code, output_dir=output_dir, filename="fuzz_logic.py")
-
-    return file_path
+    result = Pipeline(build_core_stages(provider, model, on_token, output_dir)).run({"gdd_context": gdd_context})
+    print(result.summary())
+    return result.outputs.get("save_code")
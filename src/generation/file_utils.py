@@ -1,5 +1,38 @@
+import ast
 import re
 import os
+import shutil
+from typing import Callable, Optional
+
+# 預先驗證過的遊戲 runtime (見 scaffold/game_runtime.py)，使用它的遊戲會在旁邊放一份複本
+GAME_RUNTIME_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scaffold", "game_runtime.py")
+GAME_RUNTIME_FILENAME = "game_runtime.py"
+_RUNTIME_IMPORT_PATTERN = re.compile(r"^\s*(from\s+game_runtime\s+import|import\s+game_runtime)\b", re.MULTILINE)
+
+
+def uses_game_runtime(code: str) -> bool:
+    return bool(_RUNTIME_IMPORT_PATTERN.search(code or ""))
+
+
+def install_game_runtime(output_dir: str, code: str = "") -> str | None:
+    """
+    Copy game_runtime.py next to a generated game that imports it.
+    An existing copy is replaced when it differs (e.g. an older RUNTIME_VERSION).
+    :return: The path of the copy, or None when the code does not use the runtime
+    :rtype: str | None
+    """
+    if not uses_game_runtime(code):
+        return None
+    target = os.path.join(output_dir, GAME_RUNTIME_FILENAME)
+    with open(GAME_RUNTIME_SOURCE, "r", encoding="utf-8") as f:
+        runtime_source = f.read()
+    if os.path.exists(target):
+        with open(target, "r", encoding="utf-8") as f:
+            if f.read() == runtime_source:
+                return target
+    os.makedirs(output_dir, exist_ok=True)
+    shutil.copyfile(GAME_RUNTIME_SOURCE, target)
+    return target
 
 
 def save_code_to_file(
@@ -52,23 +85,182 @@ def save_code_to_file(
 
     # [FIX] 針對截斷代碼進行緊急修補
     if is_truncated:
-        print(f"[Warning] 偵測到 {filename} 被 LLM 截斷，正在嘗試修補...")
-        clean_code += "\n\n# --- [AUTO-FIX: Truncated Code] ---\n"
-
-        # 如果截斷發生在 class 或 function 內部，簡單補一個 pass 避免 IndentationError
-        # (這很簡陋，但比崩潰好)
-        if clean_code.strip().endswith(":"):
-            clean_code += "    pass\n"
-
-        # 嘗試補上 main 執行區塊，讓程式至少能跑起來測試
-        if "def main():" in clean_code and 'if __name__ == "__main__":' not in clean_code:
-            # 如果 main 函式也沒寫完，先試著關閉 main
-            clean_code += "\n    # Force closing main due to truncation\n    pass\n    pygame.quit()\n    sys.exit()\n\n"
-            clean_code += 'if __name__ == "__main__":\n    try:\n        main()\n    except Exception as e:\n        print(f"Truncation Error: {e}")'
+        clean_code = repair_truncated_code(clean_code, filename)
 
     # 存檔
     file_path = os.path.join(output_dir, filename)
     with open(file_path, "w", encoding="utf-8") as f:
         f.write(clean_code)
+    install_game_runtime(output_dir, clean_code)
+
+    return file_path
 
-    return file_path
\ No newline at end of file
+
+def repair_truncated_code(clean_code: str, filename: str = "main.py") -> str:
+    """
+    Last-resort repair of code cut off by the LLM, so it can at least be started and tested.
+    """
+    print(f"[Warning] 偵測到 {filename} 被 LLM 截斷，正在嘗試修補...")
+    clean_code += "\n\n# --- [AUTO-FIX: Truncated Code] ---\n"
+
+    # 如果截斷發生在 class 或 function 內部，簡單補一個 pass 避免 IndentationError
+    # (這很簡陋，但比崩潰好)
+    if clean_code.strip().endswith(":"):
+        clean_code += "    pass\n"
+
+    # 嘗試補上 main 執行區塊，讓程式至少能跑起來測試
+    if "def main():" in clean_code and 'if __name__ == "__main__":' not in clean_code:
+        # 如果 main 函式也沒寫完，先試著關閉 main
+        clean_code += "\n    # Force closing main due to truncation\n    pass\n    pygame.quit()\n    sys.exit()\n\n"
+        clean_code += 'if __name__ == "__main__":\n    try:\n        main()\n    except Exception as e:\n        print(f"Truncation Error: {e}")'
+    return clean_code
+
+
+# 這些關鍵字在第 0 欄出現時仍屬於上一個頂層敘述 (if/try/for/while 的延續)
+_CONTINUATION_KEYWORDS = ("else", "elif", "except", "finally", "case")
+
+
+class StreamingCodeExtractor:
+    """
+    Incremental version of save_code_to_file: consumes token chunks as they arrive, recognises the
+    ```python fence and appends every completed code line to the output file right away.
+    States: "prose" (before the fence) -> "code" -> "done" (closing fence seen).
+    Every completed top-level block (import, class, def, ...) is syntax-checked with ast.parse and
+    reported to on_block(start_line, end_line, error) while the generation is still running.
+    A block that does not parse yet (e.g. a multi-line string reaching column 0) is merged with the next one,
+    so only the remainder checked by close() can report a real syntax error.
+    """
+
+    def __init__(
+            self,
+            output_dir: str = "output",
+            filename: str = "main.py",
+            on_block: Optional[Callable[[int, int, Optional[SyntaxError]], None]] = None
+    ):
+        self.file_path = os.path.join(output_dir, filename)
+        self.filename = filename
+        self.on_block = on_block
+        self.state = "prose"
+        self.code_lines: list[str] = []
+        self.checked_lines = 0
+        self.syntax_error: Optional[SyntaxError] = None
+        self._buffer = ""
+        self._prose: list[str] = []
+        self._file = None
+
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+    @property
+    def truncated(self) -> bool:
+        """
+        True while the code block is open (after close(): the generation ended inside the block).
+        """
+        return self.state == "code"
+
+    @property
+    def code(self) -> str:
+        return "\n".join(self.code_lines)
+
+    def feed(self, chunk: str) -> None:
+        """
+        Consume one token delta. Only complete lines are processed; the rest is kept until the next chunk.
+        """
+        if self.state == "done" or not chunk:
+            return
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._consume_line(line)
+            if self.state == "done":
+                self._buffer = ""
+                break
+
+    def _consume_line(self, line: str) -> None:
+        stripped = line.strip()
+        if self.state == "prose":
+            if stripped.startswith("```python"):
+                self.state = "code"
+                self._file = open(self.file_path, "w", encoding="utf-8")
+            else:
+                self._prose.append(line)
+            return
+
+        if stripped.startswith("```"):
+            # 續寫時模型可能重新開一個 ```python，這不是結束
+            if stripped.startswith("```python"):
+                return
+            self.state = "done"
+            self._check_block(len(self.code_lines))
+            return
+
+        if line and not line[0].isspace() and not line.startswith(("#", ")", "]", "}")) \
+                and not line.startswith(_CONTINUATION_KEYWORDS):
+            # 新的頂層敘述開始 → 上一個頂層區塊已完成
+            self._check_block(len(self.code_lines))
+
+        self.code_lines.append(line)
+        self._file.write(line + "\n")
+        self._file.flush()
+
+    def _check_block(self, end: int) -> None:
+        if end <= self.checked_lines:
+            return
+        block_lines = self.code_lines[self.checked_lines:end]
+        if all(not line.strip() or line.startswith("@") for line in block_lines):
+            # 只有 decorator / 空行，要等下一行的 def/class
+            return
+        try:
+            ast.parse("\n".join(block_lines))
+        except SyntaxError as e:
+            if self.state == "done":
+                self._report(end, e)
+            return
+        self._report(end, None)
+
+    def _report(self, end: int, error: Optional[SyntaxError]) -> None:
+        start = self.checked_lines + 1
+        if error is not None:
+            if error.lineno:
+                error.lineno += self.checked_lines
+            self.syntax_error = error
+        self.checked_lines = end
+        if self.on_block is not None:
+            self.on_block(start, end, error)
+
+    def close(self) -> str | None:
+        """
+        Flush the last line, check the remaining block and finish the file.
+        Without a ```python fence, the whole text is used when it looks like code (same as save_code_to_file).
+        Truncated code gets the same last-resort repair as save_code_to_file.
+        :return: The file path, or None when no code was found
+        :rtype: str | None
+        """
+        if self._buffer:
+            line, self._buffer = self._buffer, ""
+            if self.state != "done":
+                self._consume_line(line)
+
+        if self.state == "prose":
+            text = "\n".join(self._prose)
+            if "import pygame" not in text:
+                print("Warning: 無法解析出有效的 Python 代碼")
+                return None
+            self.state = "code"
+            self._file = open(self.file_path, "w", encoding="utf-8")
+            for line in text.strip().split("\n"):
+                self._consume_line(line)
+            self.state = "done"
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        if self.truncated:
+            with open(self.file_path, "w", encoding="utf-8") as f:
+                f.write(repair_truncated_code(self.code.strip(), self.filename))
+        else:
+            self.state = "done"
+            self._check_block(len(self.code_lines))
+        install_game_runtime(os.path.dirname(self.file_path), self.code)
+        return self.file_path
@@ -191,4 +191,140 @@ if random.random() < 0.05:
 ```
 
 Now, generate the test logic for this specific game:
-"""
\ No newline at end of file
+"""
+
+# Continuation Prompt: 程式碼輸出被截斷時，要求模型從截斷處繼續
+CONTINUATION_PROMPT = """
+{request}
+
+---
+Your previous answer was cut off because it reached the output limit.
+Here is everything you wrote so far:
+
+【YOUR ANSWER SO FAR】:
+{partial}
+
+【TASK】:
+Continue EXACTLY from the last character above.
+- Do NOT repeat anything that was already written.
+- Do NOT add explanations or open a new ```python block.
+- Finish the code and close the block with ```.
+"""
+
+
+# Structural Code Generation (CODE_GEN_MODE=structural)
+# 第一步: 只產生骨架 (類別、方法簽名、狀態機)，需要實作的本體以 NotImplementedError 佔位
+SKELETON_TASK_PROMPT = """
+GDD:
+{gdd}
+
+ASSETS (JSON):
+{assets}
+
+【TASK】: Write the SKELETON of main.py following the Template and the rules above.
+- Write ALL imports, constants and colors in full.
+- Write EVERY class with ALL of its methods, and EVERY function, including the entry point and the
+  state handling the Template requires (`main()` and the `"START"` / `"PLAYING"` / `"GAME_OVER"` state machine,
+  or the `Game` subclass and its hooks when the Template uses `game_runtime`).
+- Each method/function gets its final signature and a one-line docstring describing exactly what it must do.
+- Do NOT implement the bodies: after the docstring, the body must be exactly
+  `raise NotImplementedError`
+- Small helpers that are already given in the Template (e.g. `draw_text`, `restart_program`) may be written in full.
+  Never redefine names imported from `game_runtime`.
+- Keep the `if __name__ == "__main__":` block.
+Wrap the skeleton in a ```python ... ``` block.
+"""
+
+# 第二步: 以骨架作為共用上下文，逐一 (平行) 實作每個方法/函式
+COMPONENT_TASK_PROMPT = """
+GDD:
+{gdd}
+
+ASSETS (JSON):
+{assets}
+
+SKELETON (the whole program, other bodies are being written in parallel by other developers):
+```python
+{skeleton}
+```
+
+【TASK】: Implement `{name}`:
+```python
+{signature}
+```
+- Follow its docstring, the GDD and the rules above.
+- Only use names, attributes and methods that exist in the SKELETON (or that you create inside this body).
+- Keep the exact same signature.
+- Output ONLY the complete definition of `{name_short}` (the `def` line and its body) in a ```python ... ``` block.
+"""
+
+
+# Programmer (Scaffold 版本): 遊戲迴圈、狀態機、開始/結束畫面由 game_runtime 提供，LLM 只寫遊戲本身的邏輯
+SCAFFOLD_PROGRAMMER_PROMPT = """
+You are an expert Pygame Developer.
+Task: Write 'main.py' based on the Design and Assets, on top of the provided `game_runtime` module.
+
+【game_runtime API】 (already written and tested, do NOT re-implement it):
+- `Game`: owns pygame.init, the window, the clock, the event loop, `pygame.display.flip()` and the
+  "START" / "PLAYING" / "GAME_OVER" state machine with its start and game-over screens (R restarts).
+  - Class attributes: `title`, `instructions` (list of lines shown on the start screen), `width`, `height`, `fps`, `background`.
+  - Hooks to override: `setup(self)` (create/reset the world, called at start and on restart),
+    `handle_event(self, event)` (inputs while PLAYING), `update(self, dt)`, `draw(self, screen)`.
+  - Attributes: `self.screen`, `self.all_sprites` (pygame.sprite.Group), `self.score`, `self.state`.
+  - Call `self.game_over("YOU WIN")` / `self.game_over()` to end the round.
+- `SafeSprite`: use instead of `pygame.sprite.Sprite` (its update() accepts any arguments).
+- `draw_text(screen, text, size, color, x, y)`, `get_font(size)` (cached fonts), `grid_get(grid, r, c)` (None-safe grid access).
+- Constants: `WIDTH`, `HEIGHT`, `FPS`, `WHITE`, `BLACK`, `GRAY`, `RED`, `GREEN`, `BLUE`, `YELLOW`.
+
+【CRITICAL RULES】:
+1. **Visuals**: Use `pygame.draw.rect` or `pygame.draw.circle`. NO `pygame.image.load`.
+2. **No boilerplate**: Do NOT write a `while` game loop, `pygame.display.flip()`, `clock.tick`, start/game-over screens or a restart function.
+3. **Grid Safety**: Read grid cells with `grid_get(grid, r, c)` or check `is not None` before accessing attributes.
+4. **Mouse Dragging Logic (Pool/Slingshot)**: `MOUSEBUTTONDOWN` sets `self.aiming = True` and `self.start_pos = event.pos` anywhere on screen;
+   `MOUSEBUTTONUP` applies the force `(start_pos - end_pos)`; draw an aiming line while aiming.
+5. **Physics**: float `pygame.math.Vector2` positions/velocities, friction `velocity *= 0.98`, invert velocity on wall collision.
+6. **Format**: Wrap the code in ```python ... ``` block.
+
+【CODE STRUCTURE TEMPLATE】:
+```python
+import math
+import random
+
+import pygame
+from game_runtime import Game, SafeSprite, draw_text, grid_get, WIDTH, HEIGHT, WHITE
+
+
+class Player(SafeSprite):
+    def __init__(self, x, y):
+        super().__init__()
+        # ...
+
+    def update(self, dt):
+        # ...
+
+
+class MyGame(Game):
+    title = "GAME TITLE"
+    instructions = ["Press WASD to Move", "Press Any Key to Start"]
+
+    def setup(self):
+        self.player = Player(WIDTH // 2, HEIGHT // 2)
+        self.all_sprites.add(self.player)
+
+    def handle_event(self, event):
+        # Handle Game Inputs (Jump, Shoot, Drag)
+        pass
+
+    def update(self, dt):
+        self.all_sprites.update(dt)
+        # Collisions, scoring, self.game_over() ...
+
+    def draw(self, screen):
+        self.all_sprites.draw(screen)
+        draw_text(screen, f"Score: {self.score}", 28, WHITE, 80, 20)
+
+
+if __name__ == "__main__":
+    MyGame().run()
+```
+"""
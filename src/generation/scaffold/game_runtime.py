@@ -0,0 +1,216 @@
+"""
+game_runtime: pre-validated Pygame scaffold shipped next to every generated main.py.
+
+Generated games subclass Game and only implement the game-specific hooks:
+    setup(), handle_event(event), update(dt), draw(screen)
+The runtime owns the window, the clock, the START / PLAYING / GAME_OVER state machine,
+the start and game-over screens, restart, and the Sprite update(*args) guard.
+"""
+import pygame
+
+RUNTIME_VERSION = "1.0.1"
+
+WIDTH, HEIGHT = 800, 600
+FPS = 60
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+GRAY = (200, 200, 200)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+BLUE = (0, 0, 255)
+YELLOW = (255, 255, 0)
+
+START = "START"
+PLAYING = "PLAYING"
+GAME_OVER = "GAME_OVER"
+
+_font_cache: dict = {}
+
+
+def get_font(size: int, name=None) -> "pygame.font.Font":
+    """
+    Fonts are expensive to create, so every (name, size) is created once.
+    """
+    key = (name, size)
+    font = _font_cache.get(key)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = pygame.font.Font(name, size)
+        _font_cache[key] = font
+    return font
+
+
+def draw_text(screen, text, size, color, x, y, center=True) -> "pygame.Rect":
+    text_surface = get_font(size).render(str(text), True, color)
+    if center:
+        text_rect = text_surface.get_rect(center=(int(x), int(y)))
+    else:
+        text_rect = text_surface.get_rect(topleft=(int(x), int(y)))
+    screen.blit(text_surface, text_rect)
+    return text_rect
+
+
+def grid_get(grid, row, col, default=None):
+    """
+    Safe grid access: returns default for out-of-range indexes and empty (None) cells.
+    """
+    if row < 0 or col < 0:
+        return default
+    try:
+        cell = grid[row][col]
+    except (IndexError, KeyError, TypeError):
+        return default
+    return default if cell is None else cell
+
+
+class SafeSprite(pygame.sprite.Sprite):
+    """
+    Sprite whose update() accepts any arguments: Group.update(*args) never raises TypeError,
+    whether a subclass defines update(self) and gets a dt, or update(self, dt) and gets nothing.
+    Extra positional arguments are dropped, missing required ones are filled with one frame's dt.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        update = cls.__dict__.get("update")
+        if update is None or getattr(update, "_safe_update", False):
+            return
+
+        code = getattr(update, "__code__", None)
+        if code is not None and code.co_flags & 0x04:  # already has *args
+            return
+        positional = code.co_argcount - 1 if code is not None else 0
+        required = positional - len(getattr(update, "__defaults__", None) or ())
+
+        def safe_update(self, *args, **kw):
+            args = args[:positional]
+            if len(args) < required:
+                args += (1.0 / FPS,) * (required - len(args))
+            return update(self, *args)
+
+        safe_update._safe_update = True
+        safe_update.__doc__ = update.__doc__
+        cls.update = safe_update
+
+    def update(self, *args, **kwargs):
+        pass
+
+
+class Game:
+    """
+    Base class of a generated game. Override the hooks, then call MyGame().run().
+    Class attributes configure the window and the built-in screens.
+    """
+    title = "Auto Generated Game"
+    instructions: list = ["Press Any Key to Start"]
+    width = WIDTH
+    height = HEIGHT
+    fps = FPS
+    background = BLACK
+
+    # Called once per frame with the game instance before the events are read (used by test tooling)
+    frame_hooks: list = []
+
+    def __init__(self):
+        pygame.init()
+        self.screen = pygame.display.set_mode((self.width, self.height))
+        pygame.display.set_caption(self.title)
+        self.clock = pygame.time.Clock()
+        self.state = START
+        self.running = True
+        self.frame = 0
+        self.score = 0
+        self.message = "GAME OVER"
+        self.all_sprites = pygame.sprite.Group()
+        self.setup()
+
+    # --- Hooks (override in the generated game) ---
+    def setup(self) -> None:
+        """
+        Create / reset the game world. Called at start and on every restart.
+        """
+
+    def handle_event(self, event) -> None:
+        """
+        Input handling while PLAYING.
+        """
+
+    def update(self, dt: float) -> None:
+        """
+        Game logic while PLAYING (dt in seconds).
+        """
+        self.all_sprites.update(dt)
+
+    def draw(self, screen) -> None:
+        """
+        Drawing while PLAYING.
+        """
+        self.all_sprites.draw(screen)
+
+    def draw_start_screen(self, screen) -> None:
+        draw_text(screen, self.title, 64, WHITE, self.width // 2, self.height // 2 - 60)
+        for index, line in enumerate(self.instructions):
+            draw_text(screen, line, 28, GRAY, self.width // 2, self.height // 2 + 10 + index * 32)
+
+    def draw_game_over_screen(self, screen) -> None:
+        draw_text(screen, self.message, 64, RED, self.width // 2, self.height // 2 - 30)
+        draw_text(screen, f"Score: {self.score}", 32, WHITE, self.width // 2, self.height // 2 + 20)
+        draw_text(screen, "Press R to Restart", 32, WHITE, self.width // 2, self.height // 2 + 60)
+
+    # --- State machine ---
+    def start(self) -> None:
+        self.state = PLAYING
+
+    def game_over(self, message: str = "GAME OVER") -> None:
+        self.message = message
+        self.state = GAME_OVER
+
+    def restart(self) -> None:
+        """
+        In-process restart (no new interpreter): clear the sprites, call setup() and play again.
+        """
+        self.all_sprites.empty()
+        self.score = 0
+        self.setup()
+        self.state = PLAYING
+
+    def _dispatch(self, event) -> None:
+        if event.type == pygame.QUIT:
+            self.running = False
+        elif self.state == START:
+            if event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                self.start()
+        elif self.state == GAME_OVER:
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
+                self.restart()
+        else:
+            self.handle_event(event)
+
+    def run(self) -> None:
+        while self.running:
+            for hook in list(Game.frame_hooks):
+                hook(self)
+
+            for event in pygame.event.get():
+                self._dispatch(event)
+
+            dt = self.clock.tick(self.fps) / 1000.0
+            self.screen.fill(self.background)
+            if self.state == START:
+                self.draw_start_screen(self.screen)
+            elif self.state == PLAYING:
+                self.update(dt)
+                self.draw(self.screen)
+            else:
+                self.draw_game_over_screen(self.screen)
+
+            pygame.display.flip()
+            self.frame += 1
+
+        pygame.quit()
+
+
+def add_frame_hook(hook) -> None:
+    Game.frame_hooks.append(hook)
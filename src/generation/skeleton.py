@@ -0,0 +1,148 @@
+import ast
+import io
+import re
+import textwrap
+import tokenize
+from dataclasses import dataclass
+
+_CODE_BLOCK_PATTERN = re.compile(r"```python(.*?)(?:```|$)", re.DOTALL)
+
+
+@dataclass
+class Placeholder:
+    """
+    A function/method of the skeleton whose body is still `raise NotImplementedError`.
+    Line numbers are 1-based and inclusive (decorators included).
+    """
+    name: str  # "Player.update" or "main"
+    short_name: str
+    signature: str  # Source of the skeleton definition (signature + docstring)
+    start_line: int
+    end_line: int
+    col_offset: int
+
+
+def extract_code(raw_text: str) -> str:
+    """
+    The content of the first ```python block (or the whole text when there is none).
+    """
+    match = _CODE_BLOCK_PATTERN.search(raw_text)
+    return (match.group(1) if match else raw_text).strip("\n")
+
+
+def _is_placeholder_body(node: ast.FunctionDef | ast.AsyncFunctionDef) -> bool:
+    body = node.body
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+            and isinstance(body[0].value.value, str):
+        body = body[1:]
+    if len(body) != 1 or not isinstance(body[0], ast.Raise) or body[0].exc is None:
+        return False
+    exc = body[0].exc.func if isinstance(body[0].exc, ast.Call) else body[0].exc
+    return isinstance(exc, ast.Name) and exc.id == "NotImplementedError"
+
+
+def find_placeholders(code: str) -> list[Placeholder]:
+    """
+    Top-level functions and class methods whose body is only a docstring plus `raise NotImplementedError`.
+    :raises SyntaxError: When the skeleton is not valid Python
+    """
+    tree = ast.parse(code)
+    lines = code.splitlines()
+
+    def placeholder(node, owner: str | None) -> Placeholder:
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        return Placeholder(
+            name=f"{owner}.{node.name}" if owner else node.name,
+            short_name=node.name,
+            signature=textwrap.dedent("\n".join(lines[start - 1:node.end_lineno])),
+            start_line=start,
+            end_line=node.end_lineno,
+            col_offset=node.col_offset
+        )
+
+    found = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and _is_placeholder_body(node):
+            found.append(placeholder(node, None))
+        elif isinstance(node, ast.ClassDef):
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and _is_placeholder_body(item):
+                    found.append(placeholder(item, node.name))
+    return found
+
+
+def extract_function(raw_text: str, name: str) -> str | None:
+    """
+    Find the definition of `name` in an LLM response and return its source, dedented.
+    Returns None when the response has no parsable definition of that name.
+    """
+    code = extract_code(raw_text)
+    first_line = next((line for line in code.splitlines() if line.strip()), "")
+    code = reindent(code, remove=len(first_line) - len(first_line.lstrip(" \t")))
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    lines = code.splitlines()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == name:
+            if _is_placeholder_body(node):
+                return None
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            return reindent("\n".join(lines[start - 1:node.end_lineno]), remove=node.col_offset)
+    return None
+
+
+def _string_lines(source: str) -> set[int]:
+    """
+    1-based numbers of the lines after the first line of a multi-line string: their indentation is string content.
+    """
+    found: set[int] = set()
+    fstring_starts: list[int] = []
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(source).readline):
+            if token.type == tokenize.STRING:
+                first = token.start[0]
+            elif token.type == getattr(tokenize, "FSTRING_START", None):
+                fstring_starts.append(token.start[0])
+                continue
+            elif token.type == getattr(tokenize, "FSTRING_END", None) and fstring_starts:
+                first = fstring_starts.pop()
+            else:
+                continue
+            found.update(range(first + 1, token.end[0] + 1))
+    except (tokenize.TokenError, SyntaxError):
+        pass
+    return found
+
+
+def reindent(source: str, remove: int = 0, prefix: str = "") -> str:
+    """
+    Remove up to `remove` columns of indentation from every code line and add `prefix` to it.
+    Unlike textwrap.dedent / indent, the lines inside multi-line strings are kept verbatim.
+    """
+    string_lines = _string_lines(source)
+    result = []
+    for number, line in enumerate(source.splitlines(), 1):
+        if number not in string_lines:
+            indent = len(line) - len(line.lstrip(" \t"))
+            line = line[min(remove, indent):]
+            if line.strip():
+                line = prefix + line
+        result.append(line)
+    return "\n".join(result)
+
+
+def splice(skeleton: str, implementations: dict[str, str], placeholders: list[Placeholder]) -> str:
+    """
+    Replace the placeholder definitions by their implementations (by AST line numbers, bottom-up so
+    earlier line numbers stay valid). Placeholders without an implementation are kept.
+    """
+    lines = skeleton.splitlines()
+    for item in sorted(placeholders, key=lambda p: p.start_line, reverse=True):
+        source = implementations.get(item.name)
+        if source is None:
+            continue
+        indented = reindent(source, prefix=" " * item.col_offset).splitlines()
+        lines[item.start_line - 1:item.end_line] = indented
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from config import config
+
+
+def make_cache_key(
+        provider: str,
+        model: str,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int
+) -> str:
+    """
+    Content address of an LLM request: SHA-256 of every field that changes the response.
+    """
+    payload = json.dumps(
+        [provider.lower(), model, system_prompt, user_prompt, float(temperature), int(max_tokens)],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Disk-backed LLM response cache (SQLite).
+    - Size-bounded LRU: the least recently accessed entries are evicted once max_bytes / max_entries is exceeded.
+    - TTL: entries older than ttl seconds are treated as misses and removed (ttl <= 0 disables expiry).
+    - Safe for several Flask workers: every operation uses its own connection, WAL mode and a busy timeout.
+    Hit/miss counters are kept per process and in the database (shared by every worker).
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, max_entries: int = 10000, ttl: int = 0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _count(self, conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO stats(name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def get(self, key: str) -> str | None:
+        """
+        Return the cached response of the key, or None on a miss / expired entry.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT response, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+
+            if row is not None and self.ttl > 0 and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+
+            if row is None:
+                self._count(conn, "misses")
+            else:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                self._count(conn, "hits")
+            conn.execute("COMMIT")
+        except Exception:
+            # BEGIN 本身失敗 (例如 database is locked) 時沒有交易可以 ROLLBACK，不要蓋掉原本的錯誤
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if row is None else row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """
+        Store a response and evict expired / least recently used entries over the bounds.
+        """
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO entries(key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now)
+            )
+            if self.ttl > 0:
+                conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl,))
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            # BEGIN 本身失敗 (例如 database is locked) 時沒有交易可以 ROLLBACK，不要蓋掉原本的錯誤
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total_size, total_count = conn.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM entries").fetchone()
+        if total_size <= self.max_bytes and total_count <= self.max_entries:
+            return
+
+        rows = conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall()
+        evicted = []
+        for key, size in rows:
+            if total_size <= self.max_bytes and total_count <= self.max_entries:
+                break
+            evicted.append((key,))
+            total_size -= size
+            total_count -= 1
+        conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def clear(self) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self) -> dict:
+        """
+        :return: Hit/miss counters of this process and of every process sharing the cache file
+        :rtype: dict
+        """
+        with closing(self._connect()) as conn:
+            shared = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            total_size, total_count = conn.execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM entries"
+            ).fetchone()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_hits": shared.get("hits", 0),
+                "shared_misses": shared.get("misses", 0),
+                "entries": total_count,
+                "bytes": total_size,
+            }
+
+
+_cache: ResponseCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache | None:
+    """
+    Return the process-wide response cache, or None when LLM_CACHE_ENABLED is off.
+    """
+    global _cache
+    if not config.LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                config.LLM_CACHE_PATH,
+                max_bytes=config.LLM_CACHE_MAX_BYTES,
+                max_entries=config.LLM_CACHE_MAX_ENTRIES,
+                ttl=config.LLM_CACHE_TTL
+            )
+        return _cache
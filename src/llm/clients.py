@@ -0,0 +1,239 @@
+import asyncio
+import atexit
+import threading
+import weakref
+from typing import Any
+
+from config import config
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of reusable LLM clients.
+    Clients are keyed by (provider, base_url, api_key), so every call to the same endpoint
+    shares one keep-alive connection pool instead of paying the TLS/TCP setup again.
+    """
+
+    def __init__(
+            self,
+            pool_connections: int = 10,
+            pool_maxsize: int = 20,
+            keepalive_expiry: int = 60,
+            timeout: int = 600
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._clients: dict[tuple, Any] = {}
+        self._gemini_api_key: str | None = None
+        # Async clients are bound to the event loop that created them: {loop: {key: client}}
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple, Any]]" = \
+            weakref.WeakKeyDictionary()
+
+    def _httpx_limits(self):
+        import httpx
+
+        return httpx.Limits(
+            max_connections=self.pool_maxsize,
+            max_keepalive_connections=self.pool_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def get_openai_client(self, provider: str, api_key: str, base_url: str | None):
+        """
+        Return the shared openai.OpenAI client for the given OpenAI compatible endpoint.
+        :param provider: The LLM service provider
+        :type provider: str
+
+        :param api_key: The API key of the provider
+        :type api_key: str
+
+        :param base_url: The base url of the provider (None for OpenAI)
+        :type base_url: str | None
+
+        :return: The pooled OpenAI client
+        :rtype: openai.OpenAI
+        """
+        key = (provider, base_url, api_key)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                import openai
+
+                http_client = openai.DefaultHttpxClient(limits=self._httpx_limits(), timeout=self.timeout)
+                # Retries (429/5xx) are handled by src.llm.rate_limit, not by the SDK
+                client = openai.OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+                self._clients[key] = client
+            return client
+
+    def get_ollama_session(self, base_url: str, api_key: str | None):
+        """
+        Return the shared requests.Session for the given Ollama server.
+        :param base_url: The base url of the Ollama server
+        :type base_url: str
+
+        :param api_key: The API key of the Ollama server (optional)
+        :type api_key: str | None
+
+        :return: The pooled session
+        :rtype: requests.Session
+        """
+        key = ("ollama", base_url, api_key)
+        with self._lock:
+            session = self._clients.get(key)
+            if session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({"Content-Type": "application/json"})
+                if api_key:
+                    session.headers.update({"Authorization": f"Bearer {api_key}"})
+                self._clients[key] = session
+            return session
+
+    def get_gemini_model(self, api_key: str, model: str, system_prompt: str):
+        """
+        Return the shared GenerativeModel for the given (model, system_prompt).
+        genai.configure is global, so it is only called again when the API key changes.
+        The generation config is passed per request, so the number of cached models stays
+        bounded by the number of distinct system prompts in the pipeline.
+        :param api_key: The Google API key
+        :type api_key: str
+
+        :param model: The Gemini model name
+        :type model: str
+
+        :param system_prompt: The system instruction
+        :type system_prompt: str
+
+        :return: The cached model
+        :rtype: google.generativeai.GenerativeModel
+        """
+        import google.generativeai as genai
+
+        key = ("google", model, api_key, system_prompt)
+        with self._lock:
+            if self._gemini_api_key != api_key:
+                genai.configure(api_key=api_key)
+                self._gemini_api_key = api_key
+
+            gemini_model = self._clients.get(key)
+            if gemini_model is None:
+                gemini_model = genai.GenerativeModel(model_name=model, system_instruction=system_prompt)
+                self._clients[key] = gemini_model
+            return gemini_model
+
+    def _loop_clients(self) -> dict[tuple, Any]:
+        loop = asyncio.get_running_loop()
+        clients = self._async_clients.get(loop)
+        if clients is None:
+            clients = {}
+            self._async_clients[loop] = clients
+        return clients
+
+    def get_async_openai_client(self, provider: str, api_key: str, base_url: str | None):
+        """
+        Return the openai.AsyncOpenAI client of the running event loop for the given endpoint.
+        Must be called from inside a coroutine.
+        :param provider: The LLM service provider
+        :type provider: str
+
+        :param api_key: The API key of the provider
+        :type api_key: str
+
+        :param base_url: The base url of the provider (None for OpenAI)
+        :type base_url: str | None
+
+        :return: The pooled async OpenAI client
+        :rtype: openai.AsyncOpenAI
+        """
+        key = (provider, base_url, api_key)
+        with self._lock:
+            clients = self._loop_clients()
+            client = clients.get(key)
+            if client is None:
+                import openai
+
+                http_client = openai.DefaultAsyncHttpxClient(limits=self._httpx_limits(), timeout=self.timeout)
+                client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client,
+                                            max_retries=0)
+                clients[key] = client
+            return client
+
+    def get_async_ollama_client(self, base_url: str, api_key: str | None):
+        """
+        Return the httpx.AsyncClient of the running event loop for the given Ollama server.
+        Must be called from inside a coroutine.
+        :param base_url: The base url of the Ollama server
+        :type base_url: str
+
+        :param api_key: The API key of the Ollama server (optional)
+        :type api_key: str | None
+
+        :return: The pooled async client
+        :rtype: httpx.AsyncClient
+        """
+        key = ("ollama", base_url, api_key)
+        with self._lock:
+            clients = self._loop_clients()
+            client = clients.get(key)
+            if client is None:
+                import httpx
+
+                headers = {"Content-Type": "application/json"}
+                if api_key:
+                    headers["Authorization"] = f"Bearer {api_key}"
+                client = httpx.AsyncClient(limits=self._httpx_limits(), headers=headers)
+                clients[key] = client
+            return client
+
+    async def aclose_loop_clients(self) -> None:
+        """
+        Close the async clients bound to the running event loop.
+        Call this before the loop is closed (see src.llm.event_loop).
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = list(self._async_clients.pop(loop, {}).values())
+
+        for client in clients:
+            try:
+                if hasattr(client, "aclose"):
+                    await client.aclose()
+                else:
+                    await client.close()
+            except Exception as e:
+                print(f"[LLM Client] Failed to close async client: {e}")
+
+    def close_all(self) -> None:
+        """
+        Close every pooled connection. Registered with atexit, also safe to call manually.
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._gemini_api_key = None
+
+        for client in clients:
+            close = getattr(client, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception as e:
+                    print(f"[LLM Client] Failed to close client: {e}")
+
+
+registry = ClientRegistry(
+    pool_connections=config.LLM_POOL_CONNECTIONS,
+    pool_maxsize=config.LLM_POOL_MAXSIZE,
+    keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY,
+    timeout=config.LLM_TIMEOUT
+)
+atexit.register(registry.close_all)
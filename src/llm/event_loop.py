@@ -0,0 +1,91 @@
+import asyncio
+import atexit
+import concurrent.futures
+import itertools
+import threading
+from typing import Any, Coroutine
+
+from config import config
+
+
+class EventLoopThread:
+    """
+    An asyncio event loop running forever in a daemon thread.
+    Synchronous code (Flask workers, the pipeline) submits coroutines to it, so many in-flight
+    LLM calls share one thread instead of each blocking its own OS thread.
+    """
+
+    def __init__(self, name: str = "llm-event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self) -> None:
+        """
+        Close the async clients of this loop, then stop the loop and join the thread.
+        """
+        if not self.loop.is_running():
+            return
+        from src.llm.clients import registry
+
+        try:
+            self.submit(registry.aclose_loop_clients()).result(timeout=5)
+        except Exception as e:
+            print(f"[LLM Event Loop] Failed to close async clients: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+_loops: list[EventLoopThread] = []
+_loops_lock = threading.Lock()
+_loop_cycle = None
+
+
+def _next_loop() -> EventLoopThread:
+    global _loop_cycle
+    with _loops_lock:
+        if not _loops:
+            for i in range(max(1, config.LLM_EVENT_LOOP_THREADS)):
+                _loops.append(EventLoopThread(name=f"llm-event-loop-{i}"))
+            _loop_cycle = itertools.cycle(_loops)
+        return next(_loop_cycle)
+
+
+def submit(coro: Coroutine) -> concurrent.futures.Future:
+    """
+    Schedule a coroutine on one of the shared LLM event loops (round-robin).
+    :param coro: The coroutine to run, e.g. acall_llm(...)
+    :type coro: Coroutine
+
+    :return: A thread-safe future of the coroutine result
+    :rtype: concurrent.futures.Future
+    """
+    return _next_loop().submit(coro)
+
+
+def run_sync(coro: Coroutine, timeout: float | None = None) -> Any:
+    """
+    Run a coroutine on the shared LLM event loops and block until it finishes.
+    Must not be called from inside one of those loops.
+    """
+    return submit(coro).result(timeout=timeout)
+
+
+def shutdown() -> None:
+    global _loop_cycle
+    with _loops_lock:
+        loops = list(_loops)
+        _loops.clear()
+        _loop_cycle = None
+    for loop_thread in loops:
+        loop_thread.stop()
+
+
+atexit.register(shutdown)
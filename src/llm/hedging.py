@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+
+@dataclass
+class HedgeCandidate:
+    provider: str
+    model: str
+    call: Callable[[], Awaitable[str]]
+
+    @property
+    def label(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+
+@dataclass
+class HedgeResult:
+    response: str
+    winner: HedgeCandidate
+    elapsed: float
+    hedged: bool
+
+
+class HedgeStats:
+    """
+    Counts which provider/model won the hedged races, so the p99 gain can be traded against quality.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wins: Counter = Counter()
+        self.hedges_started = 0
+
+    def record(self, result: HedgeResult) -> None:
+        with self._lock:
+            self.wins[result.winner.label] += 1
+            if result.hedged:
+                self.hedges_started += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"wins": dict(self.wins), "hedges_started": self.hedges_started}
+
+
+hedge_stats = HedgeStats()
+
+
+async def hedged_race(
+        primary: HedgeCandidate,
+        backup: HedgeCandidate,
+        delay: float,
+        is_error: Callable[[str], bool]
+) -> HedgeResult:
+    """
+    Send the request to the primary candidate, and to the backup after `delay` seconds
+    (immediately when delay <= 0, or as soon as the primary fails).
+    The first successful response wins and the other request is cancelled.
+    If every candidate fails, the primary's error is returned.
+    :param primary: The configured provider/model of the call
+    :type primary: HedgeCandidate
+
+    :param backup: The hedge provider/model
+    :type backup: HedgeCandidate
+
+    :param delay: Seconds to wait for the primary before hedging
+    :type delay: float
+
+    :param is_error: Predicate recognising error responses (they never win)
+    :type is_error: Callable[[str], bool]
+
+    :return: The winning response
+    :rtype: HedgeResult
+    """
+    start = time.perf_counter()
+    tasks: dict[asyncio.Task, HedgeCandidate] = {}
+    errors: dict[str, str] = {}
+
+    def launch(candidate: HedgeCandidate) -> None:
+        tasks[asyncio.ensure_future(candidate.call())] = candidate
+
+    def outcome(task: asyncio.Task, candidate: HedgeCandidate) -> str:
+        try:
+            return task.result()
+        except Exception as e:
+            return f"LLM Call Error ({candidate.provider}): {str(e)}"
+
+    launch(primary)
+    if delay > 0:
+        done, _ = await asyncio.wait(tasks.keys(), timeout=delay)
+        for task in done:
+            response = outcome(task, primary)
+            if not is_error(response):
+                return HedgeResult(response, primary, time.perf_counter() - start, hedged=False)
+            errors[primary.label] = response
+            del tasks[task]
+
+    launch(backup)
+    try:
+        while tasks:
+            done, _ = await asyncio.wait(tasks.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                candidate = tasks.pop(task)
+                response = outcome(task, candidate)
+                if not is_error(response):
+                    return HedgeResult(response, candidate, time.perf_counter() - start, hedged=True)
+                errors[candidate.label] = response
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return HedgeResult(errors.get(primary.label, next(iter(errors.values()))), primary,
+                       time.perf_counter() - start, hedged=True)
@@ -0,0 +1,284 @@
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Iterator, Optional
+
+# USD per 1M tokens (input, output). Override or extend with LLM_PRICES='{"model": [input, output]}'
+MODEL_PRICES: dict[str, tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "llama3-8b-8192": (0.05, 0.08),
+    "codestral-latest": (0.30, 0.90),
+    "deepseek-chat": (0.27, 1.10),
+}
+try:
+    MODEL_PRICES.update({k: tuple(v) for k, v in json.loads(os.getenv("LLM_PRICES", "{}")).items()})
+except (ValueError, TypeError, AttributeError) as e:
+    print(f"[LLM Metrics] Ignoring invalid LLM_PRICES: {e}")
+
+# Local (self-hosted) and replayed providers do not cost anything per token
+FREE_PROVIDERS = ("ollama", "replay")
+
+DURATION_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+TOKEN_BUCKETS = (64, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def estimate_tokens(text: str | None) -> int:
+    """
+    Rough local token count (~4 characters per token) for providers that do not report usage.
+    """
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+
+def estimate_cost(provider: str, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    if provider.lower() in FREE_PROVIDERS:
+        return 0.0
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return 0.0
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+@dataclass
+class CallRecord:
+    stage: str
+    provider: str
+    model: str
+    start: float = field(default_factory=time.perf_counter)
+    first_token_at: Optional[float] = None
+    end: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    finish_reason: Optional[str] = None
+    status: str = "ok"
+    prompt_text: str = ""
+    response: str = ""
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def ttft(self) -> float:
+        # Non-streaming calls receive their first token together with the whole response
+        if self.first_token_at is None:
+            return self.duration
+        return self.first_token_at - self.start
+
+
+_current_record: contextvars.ContextVar[Optional[CallRecord]] = contextvars.ContextVar(
+    "llm_call_record", default=None
+)
+
+# The record of the last finished call of this context (thread / task), e.g. to read its finish_reason
+_last_record: contextvars.ContextVar[Optional[CallRecord]] = contextvars.ContextVar(
+    "llm_last_call_record", default=None
+)
+
+
+def current_record() -> Optional[CallRecord]:
+    return _current_record.get()
+
+
+def last_record() -> Optional[CallRecord]:
+    """
+    The record of the most recent call_llm/acall_llm that finished in the current thread or task.
+    """
+    return _last_record.get()
+
+
+def note_first_token() -> None:
+    record = _current_record.get()
+    if record is not None and record.first_token_at is None:
+        record.first_token_at = time.perf_counter()
+
+
+def note_usage(prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+    record = _current_record.get()
+    if record is None:
+        return
+    if prompt_tokens is not None:
+        record.prompt_tokens = prompt_tokens
+    if completion_tokens is not None:
+        record.completion_tokens = completion_tokens
+
+
+def note_finish_reason(reason: Optional[str]) -> None:
+    record = _current_record.get()
+    if record is not None and reason:
+        record.finish_reason = str(reason).lower()
+
+
+async def bind_record(record: Optional[CallRecord], awaitable: Awaitable):
+    """
+    Run an awaitable with the given record as the current call record.
+    Needed when the coroutine runs on another thread's event loop (contextvars do not follow it).
+    """
+    token = _current_record.set(record)
+    try:
+        return await awaitable
+    finally:
+        _current_record.reset(token)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    In-process aggregation of LLM calls, labelled by (stage, provider, model).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.duration: dict[tuple, Histogram] = {}
+        self.ttft: dict[tuple, Histogram] = {}
+        self.completion_tokens_hist: dict[tuple, Histogram] = {}
+        self.calls: dict[tuple, int] = {}
+        self.prompt_tokens: dict[tuple, int] = {}
+        self.completion_tokens: dict[tuple, int] = {}
+        self.cost: dict[tuple, float] = {}
+
+    def record(self, record: CallRecord) -> None:
+        labels = (record.stage, record.provider, record.model)
+        prompt_tokens = record.prompt_tokens
+        if prompt_tokens is None:
+            prompt_tokens = estimate_tokens(record.prompt_text)
+        completion_tokens = record.completion_tokens
+        if completion_tokens is None:
+            completion_tokens = estimate_tokens(record.response)
+        cost = 0.0 if record.status == "cached" else \
+            estimate_cost(record.provider, record.model, prompt_tokens, completion_tokens)
+
+        with self._lock:
+            self.duration.setdefault(labels, Histogram(DURATION_BUCKETS)).observe(record.duration)
+            self.ttft.setdefault(labels, Histogram(DURATION_BUCKETS)).observe(record.ttft)
+            self.completion_tokens_hist.setdefault(labels, Histogram(TOKEN_BUCKETS)).observe(completion_tokens)
+            status_labels = labels + (record.status,)
+            self.calls[status_labels] = self.calls.get(status_labels, 0) + 1
+            self.prompt_tokens[labels] = self.prompt_tokens.get(labels, 0) + prompt_tokens
+            self.completion_tokens[labels] = self.completion_tokens.get(labels, 0) + completion_tokens
+            self.cost[labels] = self.cost.get(labels, 0.0) + cost
+
+    def render_prometheus(self) -> str:
+        """
+        :return: Every metric in the Prometheus text exposition format
+        :rtype: str
+        """
+        lines = []
+        with self._lock:
+            _render_histograms(lines, "llm_call_duration_seconds", "Wall time of LLM calls.", self.duration)
+            _render_histograms(lines, "llm_time_to_first_token_seconds", "Time to first token of LLM calls.",
+                               self.ttft)
+            _render_histograms(lines, "llm_completion_tokens", "Completion tokens per LLM call.",
+                               self.completion_tokens_hist)
+
+            lines.append("# HELP llm_calls_total LLM calls by status (ok, error, cached).")
+            lines.append("# TYPE llm_calls_total counter")
+            for (stage, provider, model, status), value in sorted(self.calls.items()):
+                lines.append(f"llm_calls_total{{{_labels(stage, provider, model)},status=\"{status}\"}} {value}")
+
+            _render_counters(lines, "llm_prompt_tokens_total", "Prompt tokens sent.", self.prompt_tokens)
+            _render_counters(lines, "llm_completion_tokens_total", "Completion tokens received.",
+                             self.completion_tokens)
+            _render_counters(lines, "llm_cost_usd_total", "Estimated cost in USD.", self.cost)
+        return "\n".join(lines) + "\n"
+
+
+def _labels(stage: str, provider: str, model: str) -> str:
+    def escape(value: str) -> str:
+        return str(value).replace("\\", "\\\\").replace("\"", "\\\"")
+    return f"stage=\"{escape(stage)}\",provider=\"{escape(provider)}\",model=\"{escape(model)}\""
+
+
+def _render_histograms(lines: list, name: str, help_text: str, histograms: dict) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, hist in sorted(histograms.items()):
+        label_text = _labels(*labels)
+        cumulative = 0
+        for bound, count in zip(hist.buckets, hist.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{{{label_text},le=\"{bound}\"}} {cumulative}")
+        lines.append(f"{name}_bucket{{{label_text},le=\"+Inf\"}} {hist.count}")
+        lines.append(f"{name}_sum{{{label_text}}} {hist.sum:.6f}")
+        lines.append(f"{name}_count{{{label_text}}} {hist.count}")
+
+
+def _render_counters(lines: list, name: str, help_text: str, counters: dict) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for labels, value in sorted(counters.items()):
+        lines.append(f"{name}{{{_labels(*labels)}}} {value:.6f}" if isinstance(value, float)
+                     else f"{name}{{{_labels(*labels)}}} {value}")
+
+
+metrics_registry = MetricsRegistry()
+
+
+def render_metrics() -> str:
+    """
+    Prometheus text of the LLM call metrics plus the response cache and hedging counters.
+    """
+    from src.llm.cache import get_response_cache
+    from src.llm.hedging import hedge_stats
+
+    lines = [metrics_registry.render_prometheus().rstrip("\n")]
+
+    cache = get_response_cache()
+    if cache is not None:
+        stats = cache.stats()
+        lines.append("# HELP llm_cache_requests_total Response cache lookups of this process.")
+        lines.append("# TYPE llm_cache_requests_total counter")
+        lines.append(f"llm_cache_requests_total{{result=\"hit\"}} {stats['hits']}")
+        lines.append(f"llm_cache_requests_total{{result=\"miss\"}} {stats['misses']}")
+        lines.append("# HELP llm_cache_bytes Size of the response cache.")
+        lines.append("# TYPE llm_cache_bytes gauge")
+        lines.append(f"llm_cache_bytes {stats['bytes']}")
+
+    hedges = hedge_stats.snapshot()
+    lines.append("# HELP llm_hedge_wins_total Hedged races won per provider/model.")
+    lines.append("# TYPE llm_hedge_wins_total counter")
+    for label, value in sorted(hedges["wins"].items()):
+        lines.append(f"llm_hedge_wins_total{{candidate=\"{label}\"}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def track_llm_call(stage: str, provider: str, model: str, prompt_text: str = "") -> Iterator[CallRecord]:
+    """
+    Measure one LLM call. Provider code reports usage / first token / finish reason through
+    note_usage, note_first_token and note_finish_reason; the caller sets record.response
+    (and record.status = "cached" for cache hits). Error responses are detected by status "error".
+    """
+    record = CallRecord(stage=stage, provider=provider.lower(), model=model, prompt_text=prompt_text)
+    token = _current_record.set(record)
+    try:
+        yield record
+    except BaseException:
+        record.status = "error"
+        raise
+    finally:
+        _current_record.reset(token)
+        _last_record.set(record)
+        record.end = time.perf_counter()
+        metrics_registry.record(record)
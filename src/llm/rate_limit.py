@@ -0,0 +1,272 @@
+import asyncio
+import email.utils
+import random
+import threading
+import time
+
+from config import config, get_env_int
+
+# Default (requests/min, tokens/min) per provider, 0 = unlimited.
+# Override with <PROVIDER>_RPM / <PROVIDER>_TPM, e.g. GROQ_TPM=12000
+DEFAULT_LIMITS: dict[str, tuple[int, int]] = {
+    "openai": (500, 200000),
+    "groq": (30, 6000),
+    "mistral": (60, 500000),
+    "deepseek": (60, 1000000),
+    "google": (15, 1000000),
+    "ollama": (0, 0),
+}
+
+
+class ProviderThrottled(Exception):
+    """
+    Raised by the provider branches of src.utils on HTTP 429 / 5xx, so the dispatcher can back off and retry.
+    """
+
+    def __init__(self, provider: str, status: int, retry_after: float | None, message: str):
+        super().__init__(message)
+        self.provider = provider
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(headers) -> float | None:
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(retry_after)
+        if parsed is None:
+            return None
+        return max(0.0, parsed.timestamp() - time.time())
+
+
+def raise_if_throttled(error: Exception, provider: str) -> None:
+    """
+    Re-raise an SDK/HTTP error as ProviderThrottled when it is a 429 or a 5xx.
+    Works with openai.APIStatusError, requests/httpx HTTP errors and google.api_core exceptions.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status is None and isinstance(getattr(error, "code", None), int):
+        status = error.code
+    if not isinstance(status, int) or not (status == 429 or 500 <= status < 600):
+        return
+    try:
+        retry_after = _parse_retry_after(getattr(response, "headers", None))
+    except (TypeError, ValueError):
+        retry_after = None
+    raise ProviderThrottled(provider, status, retry_after, str(error)) from error
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute. Reservations may drive the level negative,
+    the caller then waits for the returned number of seconds (works for threads and coroutines alike).
+    """
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def reserve(self, amount: float) -> float:
+        """
+        :return: Seconds to wait before the reserved amount is available
+        :rtype: float
+        """
+        if self.unlimited:
+            return 0.0
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            self.level -= amount
+            if self.level >= 0:
+                return 0.0
+            return -self.level / self.rate
+
+    def refund(self, amount: float) -> None:
+        if self.unlimited or amount <= 0:
+            return
+        with self._lock:
+            self.level = min(self.capacity, self.level + amount)
+
+    def charge(self, amount: float) -> None:
+        """
+        Take tokens used beyond the reservation; the level may go negative, later reservations then wait.
+        """
+        if self.unlimited or amount <= 0:
+            return
+        with self._lock:
+            self.level -= amount
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency window: +1/limit per successful call (about +1 per round trip),
+    halved on every 429/5xx. A Retry-After pauses all new calls until it has passed.
+    """
+
+    def __init__(self, initial: int, maximum: int):
+        self.maximum = max(1, maximum)
+        self.limit = float(min(max(1, initial), self.maximum))
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+        # aacquire 的等待者 (可能在不同的 event loop 上)，release 時以 call_soon_threadsafe 喚醒
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _try_acquire(self) -> tuple[bool, float | None]:
+        """
+        :return: (whether a slot was taken, seconds until the next check or None to wait for a release)
+        :rtype: tuple[bool, float | None]
+        """
+        now = time.monotonic()
+        if now < self.paused_until:
+            return False, self.paused_until - now
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True, None
+        return False, None
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                acquired, timeout = self._try_acquire()
+                if acquired:
+                    return
+                self._cond.wait(timeout=timeout)
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                acquired, timeout = self._try_acquire()
+                if acquired:
+                    return
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter[1], timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._cond:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    def release(self, throttled: bool = False, retry_after: float | None = None) -> None:
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # event loop 已關閉，等待者不會再被排程
+                pass
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class ProviderLimiter:
+    """
+    Client-side limits of one provider: requests/min and tokens/min buckets plus the AIMD window.
+    """
+
+    def __init__(self, provider: str, rpm: int, tpm: int, initial_concurrency: int, max_concurrency: int):
+        self.provider = provider
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, max_concurrency)
+
+    def acquire(self, reserved_tokens: int) -> None:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(reserved_tokens))
+        if wait > 0:
+            print(f"[Rate Limit] {self.provider}: waiting {wait:.1f}s for the rate limit")
+            time.sleep(wait)
+        self.concurrency.acquire()
+
+    async def aacquire(self, reserved_tokens: int) -> None:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(reserved_tokens))
+        if wait > 0:
+            print(f"[Rate Limit] {self.provider}: waiting {wait:.1f}s for the rate limit")
+            await asyncio.sleep(wait)
+        await self.concurrency.aacquire()
+
+    def release(self, reserved_tokens: int, used_tokens: int | None = None, throttled: bool = False,
+                retry_after: float | None = None) -> None:
+        """
+        Give the slot back and settle the reservation against the actual usage: unused reserved tokens are
+        refunded (a throttled request used none), tokens used beyond the reservation are charged.
+        """
+        used = 0 if throttled or used_tokens is None else used_tokens
+        self.tokens.refund(reserved_tokens - used)
+        self.tokens.charge(used - reserved_tokens)
+        self.concurrency.release(throttled=throttled, retry_after=retry_after)
+
+    @staticmethod
+    def backoff(attempt: int, retry_after: float | None) -> float:
+        if retry_after:
+            return retry_after
+        return min(60.0, (2 ** attempt) + random.random())
+
+
+def reservation(prompt_tokens: int, max_tokens: int) -> int:
+    """
+    Tokens to reserve for one call: the prompt plus an estimated completion (LLM_RATE_LIMIT_COMPLETION_RESERVE),
+    not the whole max_tokens, which would take Groq's 6000 TPM bucket for every call.
+    """
+    return prompt_tokens + min(max_tokens, config.LLM_RATE_LIMIT_COMPLETION_RESERVE)
+
+
+_limiters: dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> ProviderLimiter:
+    provider = provider.lower()
+    if provider == "gemini":
+        provider = "google"
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            default_rpm, default_tpm = DEFAULT_LIMITS.get(provider, (0, 0))
+            enabled = config.LLM_RATE_LIMIT_ENABLED
+            limiter = ProviderLimiter(
+                provider,
+                rpm=get_env_int(f"{provider.upper()}_RPM", default_rpm) if enabled else 0,
+                tpm=get_env_int(f"{provider.upper()}_TPM", default_tpm) if enabled else 0,
+                initial_concurrency=config.LLM_INITIAL_CONCURRENCY if enabled else 1024,
+                max_concurrency=config.LLM_MAX_CONCURRENCY if enabled else 1024
+            )
+            _limiters[provider] = limiter
+        return limiter
@@ -0,0 +1,219 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Iterator, Optional
+
+from config import config
+from src.llm.metrics import CallRecord
+
+REPLAY_PROVIDER = "replay"
+REPLAY_MISS_PREFIX = "Error: Replay corpus has no entry"
+
+# 串流回放時每段 delta 的字元數
+_STREAM_CHUNK_CHARS = 32
+
+
+def make_replay_key(system_prompt: str, user_prompt: str, temperature: float, max_tokens: int) -> str:
+    """
+    Replay key of a request. Provider and model are left out on purpose, so a corpus recorded
+    with any provider can be replayed by the "replay" provider.
+    """
+    payload = json.dumps([system_prompt, user_prompt, float(temperature), int(max_tokens)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReplayCorpus:
+    """
+    Recorded request/response pairs in a gzip JSONL file (one gzip member appended per entry).
+    Every entry keeps the latency metadata of the original call (total duration and time to first token),
+    so a replay can simulate the provider's timing. Later entries of the same key replace earlier ones.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] | None = None
+
+    def _load(self) -> dict[str, dict]:
+        if self._entries is not None:
+            return self._entries
+        entries: dict[str, dict] = {}
+        if os.path.exists(self.path):
+            try:
+                with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        entry = json.loads(line)
+                        entries[entry["key"]] = entry
+            except (OSError, EOFError, ValueError) as e:
+                # 錄製中斷時最後一筆可能不完整，保留已讀取的部分
+                print(f"[LLM Replay] Corpus {self.path} is truncated, {len(entries)} entries loaded: {e}")
+        self._entries = entries
+        return entries
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            return self._load().get(key)
+
+    def record(self, key: str, record: CallRecord, response: str) -> None:
+        """
+        Append a response and the timing of the call that produced it.
+        Cached responses are stored without latency (they replay instantly).
+        """
+        cached = record.status == "cached"
+        entry = {
+            "key": key,
+            "stage": record.stage,
+            "provider": record.provider,
+            "model": record.model,
+            "response": response,
+            "latency": None if cached else round(record.duration, 4),
+            "ttft": None if cached else round(record.ttft, 4),
+            "prompt_tokens": record.prompt_tokens,
+            "completion_tokens": record.completion_tokens,
+            "finish_reason": record.finish_reason,
+            "recorded_at": time.time(),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+            self._load()[key] = entry
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+
+_corpus: ReplayCorpus | None = None
+_corpus_lock = threading.Lock()
+
+
+def get_replay_corpus() -> ReplayCorpus:
+    global _corpus
+    with _corpus_lock:
+        if _corpus is None:
+            _corpus = ReplayCorpus(config.LLM_REPLAY_PATH)
+        return _corpus
+
+
+def replay_mode() -> str:
+    """
+    :return: "record", "replay" or "off"
+    :rtype: str
+    """
+    mode = (config.LLM_REPLAY_MODE or "off").lower()
+    return mode if mode in ("record", "replay") else "off"
+
+
+def _lookup(system_prompt: str, user_prompt: str, temperature: float, max_tokens: int) -> dict | None:
+    entry = get_replay_corpus().get(make_replay_key(system_prompt, user_prompt, temperature, max_tokens))
+    if entry is None:
+        print(f"[LLM Replay] Miss: no recorded response for this prompt ({len(get_replay_corpus())} entries)")
+    return entry
+
+
+def _miss_message() -> str:
+    return f"{REPLAY_MISS_PREFIX} for this prompt ({config.LLM_REPLAY_PATH}). Record it with LLM_REPLAY_MODE=record."
+
+
+def _latency(entry: dict) -> tuple[float, float]:
+    """
+    :return: Simulated (time to first token, total duration) in seconds, scaled by LLM_REPLAY_LATENCY_SCALE
+    :rtype: tuple[float, float]
+    """
+    scale = max(0.0, config.LLM_REPLAY_LATENCY_SCALE)
+    latency = (entry.get("latency") or 0.0) * scale
+    ttft = min(latency, (entry.get("ttft") or latency) * scale)
+    return ttft, latency
+
+
+def _note_entry(entry: dict) -> None:
+    from src.llm.metrics import note_finish_reason, note_usage
+
+    note_usage(entry.get("prompt_tokens"), entry.get("completion_tokens"))
+    note_finish_reason(entry.get("finish_reason"))
+
+
+def call_replay(system_prompt: str, user_prompt: str, temperature: float, max_tokens: int) -> str:
+    """
+    Serve a recorded response, sleeping for the recorded (scaled) latency.
+    A prompt that was never recorded returns an error string, like every other provider.
+    """
+    entry = _lookup(system_prompt, user_prompt, temperature, max_tokens)
+    if entry is None:
+        return _miss_message()
+    _, latency = _latency(entry)
+    if latency > 0:
+        time.sleep(latency)
+    _note_entry(entry)
+    return entry["response"]
+
+
+async def acall_replay(system_prompt: str, user_prompt: str, temperature: float, max_tokens: int) -> str:
+    import asyncio
+
+    entry = _lookup(system_prompt, user_prompt, temperature, max_tokens)
+    if entry is None:
+        return _miss_message()
+    _, latency = _latency(entry)
+    if latency > 0:
+        await asyncio.sleep(latency)
+    _note_entry(entry)
+    return entry["response"]
+
+
+def stream_replay(system_prompt: str, user_prompt: str, temperature: float, max_tokens: int) -> Iterator[str]:
+    """
+    Stream a recorded response: the first chunk arrives after the recorded time to first token,
+    the rest is spread evenly over the remaining recorded duration.
+    """
+    from src.utils import LLMStreamError
+
+    entry = _lookup(system_prompt, user_prompt, temperature, max_tokens)
+    if entry is None:
+        # 與其他 provider 一樣以 LLMStreamError 回報，不會被當成 token 串流到畫面或程式碼中
+        yield LLMStreamError(_miss_message())
+        return
+
+    response = entry["response"]
+    ttft, latency = _latency(entry)
+    chunks = [response[i:i + _STREAM_CHUNK_CHARS] for i in range(0, len(response), _STREAM_CHUNK_CHARS)]
+    interval = (latency - ttft) / max(1, len(chunks) - 1)
+
+    if ttft > 0:
+        time.sleep(ttft)
+    for index, chunk in enumerate(chunks):
+        if index and interval > 0:
+            time.sleep(interval)
+        yield chunk
+    _note_entry(entry)
+
+
+def record_response(
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        record: Optional[CallRecord],
+        response: str
+) -> None:
+    """
+    Store a successful real-provider response when LLM_REPLAY_MODE=record.
+    """
+    if record is None or replay_mode() != "record" or record.provider == REPLAY_PROVIDER:
+        return
+    try:
+        get_replay_corpus().record(make_replay_key(system_prompt, user_prompt, temperature, max_tokens),
+                                   record, response)
+    except OSError as e:
+        print(f"[LLM Replay] Failed to record response: {e}")
@@ -0,0 +1,265 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+
+class StageFailed(Exception):
+    """
+    Raised by a stage function to mark the stage as failed without a traceback.
+    Every stage depending on it is skipped.
+    """
+
+
+@dataclass
+class Stage:
+    """
+    One node of a pipeline graph.
+    func is called with one keyword argument per input; an input is either the name of another
+    stage (its return value) or the name of a value given to Pipeline.run.
+    """
+    name: str
+    func: Callable[..., Any]
+    inputs: tuple[str, ...] = ()
+
+
+@dataclass
+class StageTiming:
+    name: str
+    start: float
+    end: float
+    status: str = "ok"  # ok, failed, skipped
+    error: str = ""
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class PipelineResult:
+    outputs: dict[str, Any]
+    timings: dict[str, StageTiming]
+    critical_path: list[str]
+    wall_time: float
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and all(t.status == "ok" for t in self.timings.values())
+
+    def summary(self) -> str:
+        """
+        :return: Per-stage timings (relative to the pipeline start) and the critical path
+        :rtype: str
+        """
+        origin = min((t.start for t in self.timings.values()), default=0.0)
+        lines = [f"[Pipeline] Wall time: {self.wall_time:.2f}s, "
+                 f"sum of stages: {sum(t.duration for t in self.timings.values()):.2f}s"]
+        for timing in sorted(self.timings.values(), key=lambda t: t.start):
+            lines.append(f"[Pipeline]   {timing.name:<16} {timing.start - origin:7.2f}s -> "
+                         f"{timing.end - origin:7.2f}s ({timing.duration:.2f}s) {timing.status}")
+        lines.append(f"[Pipeline] Critical path: {' -> '.join(self.critical_path)}")
+        return "\n".join(lines)
+
+
+class Pipeline:
+    """
+    Small DAG scheduler: stages declare their inputs and every stage whose inputs are ready is run
+    on a thread pool, so independent LLM calls overlap and the end-to-end latency follows the
+    critical path instead of the sum of all calls.
+    A stage that raises fails; stages depending on it are skipped, the others still run.
+    """
+
+    def __init__(self, stages: Optional[list[Stage]] = None, max_workers: int = 4):
+        self.stages: dict[str, Stage] = {}
+        self.max_workers = max_workers
+        for stage in stages or []:
+            self.add(stage)
+
+    def add(self, stage: Stage) -> "Pipeline":
+        if stage.name in self.stages:
+            raise ValueError(f"Duplicate stage '{stage.name}'")
+        self.stages[stage.name] = stage
+        return self
+
+    def _validate(self, initial: dict[str, Any]) -> None:
+        for stage in self.stages.values():
+            for name in stage.inputs:
+                if name not in self.stages and name not in initial:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown input '{name}'")
+
+        # 拓撲排序檢查循環依賴
+        visiting, visited = set(), set()
+
+        def visit(name: str) -> None:
+            if name in visited or name not in self.stages:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle detected at stage '{name}'")
+            visiting.add(name)
+            for dependency in self.stages[name].inputs:
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+
+        for stage_name in self.stages:
+            visit(stage_name)
+
+    def run(self, inputs: Optional[dict[str, Any]] = None) -> PipelineResult:
+        """
+        Run every stage once its inputs are available.
+        :param inputs: Values that stages can depend on by name (e.g. "gdd_context", "provider")
+        :type inputs: Optional[dict[str, Any]]
+
+        :return: Outputs of the successful stages, timings and the critical path
+        :rtype: PipelineResult
+        """
+        initial = dict(inputs or {})
+        self._validate(initial)
+
+        values: dict[str, Any] = dict(initial)
+        timings: dict[str, StageTiming] = {}
+        errors: dict[str, str] = {}
+        pending = dict(self.stages)
+        running: dict[Future, tuple[Stage, float]] = {}
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline") as pool:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    failed = [d for d in stage.inputs if d in timings and timings[d].status != "ok"]
+                    if failed:
+                        now = time.perf_counter()
+                        timings[name] = StageTiming(name, now, now, "skipped", f"upstream failed: {failed[0]}")
+                        del pending[name]
+                    elif all(d in values for d in stage.inputs):
+                        kwargs = {d: values[d] for d in stage.inputs}
+                        running[pool.submit(stage.func, **kwargs)] = (stage, time.perf_counter())
+                        del pending[name]
+
+                if not running:
+                    # 剩下的 stage 全部因為上游失敗而無法執行
+                    continue
+
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, stage_start = running.pop(future)
+                    end = time.perf_counter()
+                    try:
+                        values[stage.name] = future.result()
+                        timings[stage.name] = StageTiming(stage.name, stage_start, end)
+                    except Exception as e:
+                        errors[stage.name] = str(e)
+                        timings[stage.name] = StageTiming(stage.name, stage_start, end, "failed", str(e))
+                        if not isinstance(e, StageFailed):
+                            print(f"[Pipeline] Stage '{stage.name}' raised {type(e).__name__}: {e}")
+
+        outputs = {name: value for name, value in values.items() if name in self.stages}
+        return PipelineResult(
+            outputs=outputs,
+            timings=timings,
+            critical_path=self._critical_path(timings),
+            wall_time=time.perf_counter() - start,
+            errors=errors
+        )
+
+    def _critical_path(self, timings: dict[str, StageTiming]) -> list[str]:
+        """
+        Walk back from the stage that finished last, always following the dependency that finished last.
+        """
+        executed = {name: t for name, t in timings.items() if t.status != "skipped"}
+        if not executed:
+            return []
+        path = [max(executed.values(), key=lambda t: t.end).name]
+        while True:
+            dependencies = [d for d in self.stages[path[-1]].inputs if d in executed]
+            if not dependencies:
+                break
+            path.append(max(dependencies, key=lambda d: executed[d].end))
+        return list(reversed(path))
+
+
+def build_generation_pipeline(
+        provider: str = "openai",
+        model: str = "gpt-4o-mini",
+        on_token: Optional[Callable[[str], None]] = None,
+        with_testing: bool = True,
+        output_dir: str = "output"
+) -> Pipeline:
+    """
+    Design, core and testing phases as one graph (input: "user_input"):
+        user_input -> gdd_context -> [core stages] -> testing
+    The design stage fails on an LLM error, so the error text never reaches the core stages as a GDD.
+    The testing stage drains run_fix_loop (without token streaming) and returns
+    {"passed": bool, "events": [...]}.
+    :param provider: The LLM service provider
+    :type provider: str
+
+    :param model: The LLM model to use
+    :type model: str
+
+    :param on_token: Streaming callback receiving every token delta of the design and code stages
+    :type on_token: Optional[Callable[[str], None]]
+
+    :param with_testing: Whether to add the testing (fix loop) stage
+    :type with_testing: bool
+
+    :param output_dir: The directory of the generated files (the job workspace)
+    :type output_dir: str
+
+    :return: The pipeline, run it with pipeline.run({"user_input": ...})
+    :rtype: Pipeline
+    """
+    from src.design.chains import run_design_phase
+    from src.generation.core import build_core_stages
+    from src.utils import is_llm_error
+    from src.workspace import record_artifact
+
+    def design_stage(user_input: str) -> str:
+        gdd_context = run_design_phase(user_input, provider, model, on_token=on_token)
+        if is_llm_error(gdd_context):
+            raise StageFailed(gdd_context or "Empty GDD")
+        record_artifact(output_dir, "gdd", gdd_context)
+        return gdd_context
+
+    pipeline = Pipeline([Stage("gdd_context", design_stage, ("user_input",))])
+    for stage in build_core_stages(provider, model, on_token, output_dir):
+        pipeline.add(stage)
+
+    if with_testing:
+        from src.testing.fixer import run_fix_loop
+
+        def testing_stage(gdd_context: str, save_code: str, save_fuzz_logic: str | None) -> dict:
+            events = [event[len("data: "):].strip()
+                      for event in run_fix_loop(gdd_context, save_code, provider, model, stream_tokens=False)]
+            passed = bool(events) and events[-1].startswith("RESULT_SUCCESS")
+            if not passed:
+                raise StageFailed(events[-1] if events else "Fix loop produced no result")
+            return {"passed": passed, "events": events}
+
+        # 等 fuzz logic 存檔後才測試 (fuzzer logic 生成失敗時 save_fuzz_logic 為 None，改用預設邏輯)
+        pipeline.add(Stage("testing", testing_stage, ("gdd_context", "save_code", "save_fuzz_logic")))
+    return pipeline
+
+
+def run_generation_pipeline(
+        user_input: str,
+        provider: str = "openai",
+        model: str = "gpt-4o-mini",
+        on_token: Optional[Callable[[str], None]] = None,
+        with_testing: bool = True,
+        output_dir: str = "output"
+) -> PipelineResult:
+    """
+    Build and run the generation graph (see build_generation_pipeline) for one game idea.
+    :param user_input: The game idea
+    :type user_input: str
+
+    :return: The outputs ("gdd_context", "save_code", ...), per-stage errors and timings
+    :rtype: PipelineResult
+    """
+    pipeline = build_generation_pipeline(provider, model, on_token, with_testing, output_dir)
+    result = pipeline.run({"user_input": user_input})
+    print(result.summary())
+    return result
@@ -9,7 +9,8 @@ from dataclasses import dataclass
 
 
 class RemoteOllamaAuthEF(EmbeddingFunction):
-    def __init__(self, base_url: str, api_key: str, model_name: str = "nomic-embed-text", timeout: int = 30):
+    def __init__(self, base_url: str, api_key: str, model_name: str = "nomic-embed-text", timeout: int = 30,
+                 keep_alive: str | int | None = None, num_ctx: int | None = None):
         self.api_url = f"{base_url}/api/embeddings"
         self.model_name = model_name
         self.headers = {
@@ -17,6 +18,9 @@ class RemoteOllamaAuthEF(EmbeddingFunction):
             "Content-Type": "application/json"
         }
         self.timeout = timeout
+        # keep_alive 讓 embedding 模型常駐；若與聊天模型是同一個模型，num_ctx 必須一致才不會重新載入
+        self.keep_alive = keep_alive
+        self.num_ctx = num_ctx
 
     def __call__(self, input: Documents) -> Embeddings:
         embeddings = []
@@ -25,6 +29,10 @@ class RemoteOllamaAuthEF(EmbeddingFunction):
                 "model": self.model_name,
                 "prompt": text
             }
+            if self.keep_alive is not None:
+                payload["keep_alive"] = self.keep_alive
+            if self.num_ctx is not None:
+                payload["options"] = {"num_ctx": self.num_ctx}
             try:
                 response = requests.post(
                     self.api_url,
@@ -42,6 +50,31 @@ class RemoteOllamaAuthEF(EmbeddingFunction):
         return embeddings
 
 
+def create_embedding_function(provider: str, base_url: str, base_port: str, model_type: str, token: str):
+    """
+    Build the embedding function used by RagService (also used by the semantic prompt cache).
+    """
+    model_type = model_type.lower()
+
+    if provider == "ollama":
+        from src.utils import ollama_keep_alive
+
+        return RemoteOllamaAuthEF(
+            base_url=f"{base_url}:{base_port}",
+            api_key=token,
+            model_name=model_type,
+            timeout=120,
+            keep_alive=ollama_keep_alive(),
+            num_ctx=Config.OLLAMA_WARMUP_NUM_CTX if model_type == Config.OLLAMA_MODEL_NAME else None
+        )
+
+    elif provider == "default":
+        return embedding_functions.DefaultEmbeddingFunction()
+
+    else:
+        raise ValueError(f"不支援的 provider: {provider}")
+
+
 @dataclass
 class RagConfig:
     tenant: str = getattr(Config, 'CHROMA_TENANT', 'default_tenant')
@@ -150,21 +183,7 @@ class RagService:
             raise ValueError(f"Unsupported Chroma client_type: {mode}。Please use 'cloud' or 'http'")
 
     def _get_embedding_function(self, provider: str, base_url: str, base_port: str, model_type: str, token: str):
-        model_type = model_type.lower()
-
-        if provider == "ollama":
-            return RemoteOllamaAuthEF(
-                base_url=f"{base_url}:{base_port}",
-                api_key=token,
-                model_name=model_type,
-                timeout=120
-            )
-
-        elif provider == "default":
-            return embedding_functions.DefaultEmbeddingFunction()
-
-        else:
-            raise ValueError(f"不支援的 provider: {provider}")
+        return create_embedding_function(provider, base_url, base_port, model_type, token)
 
     def hash_content(self, content):
         return hashlib.sha256(content.encode('utf-8')).hexdigest()
@@ -0,0 +1,142 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+
+from config import Config
+
+
+@dataclass
+class SemanticCacheHit:
+    user_input: str
+    gdd: str
+    code: str
+    fuzz_logic: str
+    similarity: float
+
+
+def _normalize(vector) -> list[float]:
+    values = [float(v) for v in vector]
+    norm = math.sqrt(sum(v * v for v in values))
+    if norm == 0:
+        return values
+    return [v / norm for v in values]
+
+
+class SemanticCache:
+    """
+    Semantic cache of whole generations: game idea -> (GDD, verified code, fuzz logic).
+    The idea is embedded with the RagService embedding function, so near-identical ideas
+    ("flappy bird clone", "a flappy-bird style game") hit the same entry when their cosine
+    similarity is above the threshold.
+    Entries are stored in a local SQLite file; vectors are normalized on insert so the cosine
+    similarity is a plain dot product.
+    """
+
+    def __init__(self, embedding_function, path: str, threshold: float = 0.92):
+        self.embedding_function = embedding_function
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, user_input TEXT NOT NULL, embedding TEXT NOT NULL, "
+                "gdd TEXT NOT NULL, code TEXT NOT NULL, fuzz_logic TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _embed(self, text: str) -> list[float]:
+        return _normalize(self.embedding_function([text])[0])
+
+    def lookup(self, user_input: str) -> SemanticCacheHit | None:
+        """
+        Return the most similar cached generation above the threshold, or None.
+        :param user_input: The game idea given to run_design_phase
+        :type user_input: str
+
+        :return: The cached artifacts
+        :rtype: SemanticCacheHit | None
+        """
+        query = self._embed(user_input)
+
+        best_row = None
+        best_similarity = -1.0
+        with closing(self._connect()) as conn:
+            for row in conn.execute("SELECT user_input, embedding, gdd, code, fuzz_logic FROM entries"):
+                vector = json.loads(row[1])
+                if len(vector) != len(query):
+                    continue
+                similarity = sum(a * b for a, b in zip(query, vector))
+                if similarity > best_similarity:
+                    best_similarity = similarity
+                    best_row = row
+
+        if best_row is None or best_similarity < self.threshold:
+            return None
+        return SemanticCacheHit(
+            user_input=best_row[0],
+            gdd=best_row[2],
+            code=best_row[3],
+            fuzz_logic=best_row[4],
+            similarity=best_similarity
+        )
+
+    def store(self, user_input: str, gdd: str, code: str, fuzz_logic: str = "") -> None:
+        """
+        Store a verified generation for the given game idea.
+        """
+        embedding = self._embed(user_input)
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO entries(user_input, embedding, gdd, code, fuzz_logic, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (user_input, json.dumps(embedding), gdd, code, fuzz_logic, time.time())
+            )
+
+
+_semantic_cache: SemanticCache | None = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache | None:
+    """
+    Return the process-wide semantic cache, or None when SEMANTIC_CACHE_ENABLED is off
+    or the embedding function cannot be created.
+    """
+    global _semantic_cache
+    if not Config.SEMANTIC_CACHE_ENABLED:
+        return None
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            try:
+                from src.rag_service.rag import RagConfig, create_embedding_function
+
+                rag_config = RagConfig()
+                embedding_function = create_embedding_function(
+                    rag_config.provider,
+                    rag_config.base_url,
+                    rag_config.base_port,
+                    rag_config.model_type,
+                    rag_config.embedding_token
+                )
+            except Exception as e:
+                print(f"[Semantic Cache] Disabled, failed to create embedding function: {e}")
+                return None
+            _semantic_cache = SemanticCache(
+                embedding_function,
+                Config.SEMANTIC_CACHE_PATH,
+                threshold=Config.SEMANTIC_CACHE_THRESHOLD
+            )
+        return _semantic_cache
@@ -0,0 +1,183 @@
+import ast
+import os
+import random
+import time
+
+from config import config
+from src.generation.file_utils import uses_game_runtime
+from src.testing.fuzz_harness import new_seed
+from src.testing.fuzzer import FuzzPool, FuzzReport
+
+# 輸入序列的上限，避免突變後無限變長
+MAX_ACTIONS = 256
+# 沒有在程式碼中找到任何按鍵時使用
+DEFAULT_KEYS = ("K_SPACE", "K_RETURN", "K_LEFT", "K_RIGHT", "K_UP", "K_DOWN")
+MOUSE_HINTS = ("MOUSEBUTTONDOWN", "MOUSEBUTTONUP", "MOUSEMOTION", "mouse")
+
+
+def event_vocabulary(code: str) -> tuple[list[str], bool]:
+    """
+    The inputs the game actually reacts to: every K_* constant in the code (pygame.K_LEFT or K_LEFT),
+    plus K_r for the runtime's restart screen.
+    :return: (key names, whether mouse clicks are handled)
+    :rtype: tuple[list[str], bool]
+    """
+    keys: set[str] = set()
+    mouse = False
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return list(DEFAULT_KEYS), True
+
+    for node in ast.walk(tree):
+        name = node.attr if isinstance(node, ast.Attribute) else node.id if isinstance(node, ast.Name) else None
+        if name is None:
+            continue
+        if name.startswith("K_"):
+            keys.add(name)
+        elif name in MOUSE_HINTS:
+            mouse = True
+    if uses_game_runtime(code):
+        keys.add("K_r")
+    return sorted(keys) or list(DEFAULT_KEYS), mouse
+
+
+def executable_lines(code: str) -> set[int]:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return set()
+    return {node.lineno for node in ast.walk(tree) if isinstance(node, ast.stmt)}
+
+
+class InputMutator:
+    """
+    Random generation and mutation of input sequences (see fuzz_harness.install_input_script).
+    """
+
+    def __init__(self, rng: random.Random, keys: list[str], mouse: bool, frames: int,
+                 width: int = 800, height: int = 600):
+        self.rng = rng
+        self.keys = keys
+        self.mouse = mouse
+        self.frames = frames
+        self.width = width
+        self.height = height
+
+    def random_action(self, frame: int | None = None) -> dict:
+        frame = self.rng.randrange(self.frames) if frame is None else frame
+        if self.mouse and self.rng.random() < 0.25:
+            return {"frame": frame, "click": [self.rng.randrange(self.width), self.rng.randrange(self.height)],
+                    "button": 1}
+        return {"frame": frame, "key": self.rng.choice(self.keys), "hold": self.rng.choice((1, 2, 5, 15, 45))}
+
+    def random_sequence(self) -> list[dict]:
+        count = self.rng.randint(4, 40)
+        return sorted((self.random_action() for _ in range(count)), key=lambda a: a["frame"])
+
+    def mutate(self, actions: list[dict], corpus: list[list[dict]]) -> list[dict]:
+        actions = [dict(a) for a in actions]
+        for _ in range(self.rng.randint(1, 4)):
+            operation = self.rng.choice(("insert", "insert", "delete", "retarget", "shift", "repeat", "splice"))
+            if operation == "insert" or not actions:
+                actions.append(self.random_action())
+            elif operation == "delete":
+                actions.pop(self.rng.randrange(len(actions)))
+            elif operation == "retarget":
+                index = self.rng.randrange(len(actions))
+                actions[index] = self.random_action(actions[index]["frame"])
+            elif operation == "shift":
+                action = actions[self.rng.randrange(len(actions))]
+                action["frame"] = min(self.frames - 1, max(0, action["frame"] + self.rng.randint(-60, 60)))
+            elif operation == "repeat":
+                # 重複一段輸入 (連續按鍵、組合鍵)
+                start = self.rng.randrange(len(actions))
+                chunk = actions[start:start + self.rng.randint(1, 4)]
+                offset = self.rng.randint(1, 120)
+                actions.extend(dict(a, frame=min(self.frames - 1, a["frame"] + offset)) for a in chunk)
+            elif operation == "splice" and corpus:
+                other = self.rng.choice(corpus)
+                cut = self.rng.randrange(self.frames)
+                actions = [a for a in actions if a["frame"] < cut] + [dict(a) for a in other if a["frame"] >= cut]
+        return sorted(actions, key=lambda a: a["frame"])[:MAX_ACTIONS]
+
+
+def run_coverage_fuzz(file_path: str, duration: float = 30, frames: int | None = None, runs: int | None = None,
+                      seed: int | None = None) -> FuzzReport:
+    """
+    Coverage-guided fuzzing: scripted input sequences instead of the random monkey bot, line-arc coverage
+    traced in the child, and a corpus of the sequences that reached new arcs which is mutated for the next runs.
+    Stops at the first crash (reported with its seed and input sequence), after `runs` runs
+    (default FUZZER_COVERAGE_RUNS) or after `duration` wall-clock seconds.
+    :return: The report, with the coverage of all runs in report.coverage
+    :rtype: FuzzReport
+    """
+    if not os.path.exists(file_path):
+        return FuzzReport(False, "File not found")
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        code = f.read()
+
+    frames = frames or config.FUZZER_COVERAGE_FRAMES
+    runs = runs or config.FUZZER_COVERAGE_RUNS
+    seed = new_seed() if seed is None else seed
+    rng = random.Random(seed)
+    keys, mouse = event_vocabulary(code)
+    mutator = InputMutator(rng, keys, mouse, frames)
+    total_lines = executable_lines(code)
+
+    env = os.environ.copy()
+    env["SDL_AUDIODRIVER"] = "dummy"
+    env["SDL_VIDEODRIVER"] = "dummy"
+    print(f"[Fuzzer] 正在對 {os.path.basename(file_path)} 進行 coverage-guided 測試 "
+          f"({runs} runs x {frames} frames, {len(keys)} keys{', mouse' if mouse else ''}, seed={seed})...")
+
+    # 原始程式碼 (不注入 monkey bot)：輸入完全由 action 序列決定
+    pool = FuzzPool(file_path, code, frames, env)
+    corpus: list[list[dict]] = []
+    arcs: set = set()
+    started = 0
+    finished = 0
+    deadline = time.monotonic() + duration
+
+    def coverage_summary() -> dict:
+        lines = {line for arc in arcs for line in arc if line > 0} & total_lines
+        return {"lines": len(lines), "total": len(total_lines), "arcs": len(arcs), "corpus": len(corpus),
+                "runs": finished}
+
+    try:
+        while (started < runs or pool.running) and time.monotonic() < deadline:
+            while started < runs and pool.has_capacity():
+                # 先跑幾個隨機序列建立 corpus，之後以突變為主
+                if len(corpus) < 2 or rng.random() < 0.1:
+                    actions = mutator.random_sequence()
+                else:
+                    actions = mutator.mutate(rng.choice(corpus), corpus)
+                pool.launch(seed + started, tag=(seed + started, actions), actions=actions, coverage=True)
+                started += 1
+
+            for (run_seed, actions), passed, message, result in pool.finished():
+                finished += 1
+                if result is not None:
+                    new_arcs = {tuple(arc) for arc in result.get("arcs", ())} - arcs
+                    if new_arcs:
+                        arcs.update(new_arcs)
+                        corpus.append(actions)
+                if not passed:
+                    pool.cancel_all()
+                    return FuzzReport.crashed(message, run_seed, finished, result, actions, coverage_summary())
+            pool.wait_interval()
+    finally:
+        pool.close()
+
+    summary = coverage_summary()
+    return FuzzReport(True, f"Fuzz Test Passed (coverage-guided: {format_coverage(summary)}, seed={seed}).",
+                      seed, finished, None, summary)
+
+
+def format_coverage(coverage: dict | None) -> str:
+    if not coverage:
+        return ""
+    percent = 100 * coverage["lines"] / coverage["total"] if coverage["total"] else 0.0
+    return f"{coverage['lines']}/{coverage['total']} lines ({percent:.0f}%), {coverage['arcs']} arcs, " \
+           f"corpus {coverage['corpus']}, {coverage['runs']} runs"
@@ -1,12 +1,24 @@
-from typing import Optional, Any, Generator
+from typing import Optional, Any, Generator, Callable
 
-from src.utils import call_llm
-from src.testing.prompts import FIXER_PROMPT, LOGIC_REVIEW_PROMPT, LOGIC_FIXER_PROMPT
+from src.utils import call_llm, is_llm_error, relay_sse_tokens
+from src.testing.prompts import (FIXER_PROMPT, LOGIC_REVIEW_PROMPT, LOGIC_FIXER_PROMPT, PATCH_FIXER_PROMPT,
+                                 PERFORMANCE_FIXER_PROMPT)
+from src.testing.patcher import PatchError, apply_patch
 from src.generation.file_utils import save_code_to_file
-from src.testing.fuzzer import run_fuzz_test
+from src.generation.continuation import call_llm_with_continuation
+from src.testing.fuzzer import fuzz_game
+from src.testing.coverage_fuzzer import run_coverage_fuzz, format_coverage
+from src.testing.performance import performance_violations, performance_report, format_performance
+from src.testing.minimizer import CrashRepro, minimize_crash, replay_crash
+from src.testing.static_analyzer import analyze_file, format_diagnostics
+from src.testing.verification_cache import VerificationResult, get_verification_cache, verification_key
+from src.workspace import record_file, record_artifact
 from config import config
 import os
 import ast
+import json
+import time
+from dataclasses import asdict
 
 def static_code_check(file_path: str) -> tuple[bool, str]:
     """
@@ -23,25 +35,32 @@ def static_code_check(file_path: str) -> tuple[bool, str]:
     except Exception as e:
         return False, f"其他錯誤 ❌: {e}"
 
-def game_logic_check(gdd:str ,file_path: str, provider: str = "openai", model: str = "gpt-4o-mini") -> tuple[bool, str]:
+def game_logic_check(gdd:str ,file_path: str, provider: str = "openai", model: str = "gpt-4o-mini",
+                     on_token: Optional[Callable[[str], None]] = None) -> tuple[bool, str]:
     with open(file_path, "r", encoding="utf-8") as f:
         code = f.read()
     prompt = LOGIC_REVIEW_PROMPT.format(code=code)
     response = call_llm("You are a code logic reviewer.",
              prompt,
              provider=provider,
-             model=model
+             model=model,
+             on_token=on_token,
+             stage="logic_review"
     )
     print(f"[Member 3]: response of game_logic_check {response}")
     if "PASS" in response.upper() : return True, ""
     return False, response
 
 def run_fix(file_path: str, error_message: str, provider: str = "openai"
-                 , model: str  = "gpt-4o-mini", fix_type: str="syntax", gdd: Optional[str]="") -> tuple[str | None, str]:
+                 , model: str  = "gpt-4o-mini", fix_type: str="syntax", gdd: Optional[str]="",
+            on_token: Optional[Callable[[str], None]] = None) -> tuple[str | None, str]:
     """
     Auto Fix Loop: Read Codes -> Submit Errors -> Get new codes -> save
     The first return is the path to the fixed file.
     The second return is the result message.
+    on_token receives the fixer's output token by token (streaming mode).
+    With FIXER_MODE=patch the LLM only returns SEARCH/REPLACE blocks, which are applied to the file;
+    if the patch cannot be applied the whole file is regenerated as before.
     """
     print(f"[Member 3] 正在嘗試修復代碼... (Error: {error_message[:50]}...)")
 
@@ -54,71 +73,235 @@ def run_fix(file_path: str, error_message: str, provider: str = "openai"
 
     response: str  = ""
 
-    if fix_type == "syntax":
+    if config.FIXER_MODE == "patch":
+        patched_path, response = run_patch_fix(file_path, broken_code, error_message, provider, model, gdd,
+                                               on_token)
+        if patched_path:
+            record_file(patched_path, "code")
+            return patched_path, response
+        print("[Member 3] Patch 套用失敗，改為重新生成整份代碼")
+
+    if fix_type in ("syntax", "static"):
         # Insert the codes to the prompt
         fix_syntax_full_prompt: str = FIXER_PROMPT.format(code=broken_code, error=error_message)
         # Call LLM for fixing
-        response = call_llm("You are a Code error Fixer.", fix_syntax_full_prompt, provider=provider, model=model)
+        response = call_llm_with_continuation("You are a Code error Fixer.", fix_syntax_full_prompt,
+                                              provider=provider, model=model, on_token=on_token, stage="fixer")
     elif fix_type == "logic":
         fix_logic_full_prompt: str = LOGIC_FIXER_PROMPT.format(code=broken_code, error=error_message, gdd=gdd)
-        response = call_llm("You are a code logics fixer.", fix_logic_full_prompt, provider=provider, model=model)
+        response = call_llm_with_continuation("You are a code logics fixer.", fix_logic_full_prompt,
+                                              provider=provider, model=model, on_token=on_token, stage="fixer")
+    elif fix_type == "performance":
+        fix_perf_full_prompt: str = PERFORMANCE_FIXER_PROMPT.format(code=broken_code, error=error_message, gdd=gdd)
+        response = call_llm_with_continuation("You are a game performance optimizer.", fix_perf_full_prompt,
+                                              provider=provider, model=model, on_token=on_token, stage="fixer")
 
     # Save the fixed files (truncate)
     output_dir: str = os.path.dirname(file_path)
     new_path: str | None = save_code_to_file(response, output_dir=output_dir)
 
     if new_path:
+        record_file(new_path, "code")
         return new_path, response
     else:
         return None, response
 
 
+def run_patch_fix(file_path: str, broken_code: str, error_message: str, provider: str = "openai",
+                  model: str = "gpt-4o-mini", gdd: Optional[str] = "",
+                  on_token: Optional[Callable[[str], None]] = None) -> tuple[str | None, str]:
+    """
+    Ask the LLM for SEARCH/REPLACE blocks (or a unified diff) and apply them with fuzzy context matching.
+    Output tokens scale with the size of the fix instead of the size of the file.
+    The first return is the path to the patched file (None when the patch could not be applied).
+    The second return is the LLM response.
+    """
+    prompt = PATCH_FIXER_PROMPT.format(code=broken_code, error=error_message, gdd=gdd or "")
+    response = call_llm("You are a Code error Fixer.", prompt, provider=provider, model=model,
+                        on_token=on_token, stage="fixer")
+    if is_llm_error(response):
+        return None, response
+
+    try:
+        patched_code = apply_patch(broken_code, response, threshold=config.FIXER_PATCH_THRESHOLD)
+    except PatchError as e:
+        print(f"[Member 3] Patch 無法套用: {e}")
+        return None, response
+
+    if patched_code == broken_code:
+        return None, response
+
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(patched_code)
+    return file_path, response
+
+
 def run_fix_loop(gdd: str, file_path: str, provider: str = "openai",
-                 model: str = "gpt-4o-mini") -> Generator[str, None, None]:
+                 model: str = "gpt-4o-mini", stream_tokens: bool = True) -> Generator[str, None, None]:
     """
     Generator function for SSE (Server-Sent Events).
     Yields strings in the format: "data: <message>\n\n"
+    When stream_tokens is True, the reviewer/fixer output is also forwarded as "data: TOKEN:<json>\n\n" events
+    while it is being generated.
     """
+    def llm_step(func, *args):
+        if stream_tokens:
+            return (yield from relay_sse_tokens(func, *args))
+        return func(*args)
+
     yield f"data: [Member 3] 收到需求，開始驗證: {os.path.basename(file_path)}\n\n"
 
     max_retries: int = 3
     game_is_valid = False
     error_msg = ""
+    # 上一次 Fuzz crash 的最小重現序列：修復後先重播它，不再 crash 才進行完整 Fuzz
+    repro: CrashRepro | None = None
+
+    cache = get_verification_cache()
+
+    def cached(key: str | None, check: str) -> VerificationResult | None:
+        return cache.get(key, check) if cache is not None and key is not None else None
+
+    def remember(key: str | None, result: VerificationResult) -> None:
+        if cache is not None and key is not None:
+            cache.put(key, result)
 
     while (not game_is_valid) and (max_retries > 0):
-        syntax_is_valid, error_msg = static_code_check(file_path)
+        # 以 (程式碼 + fuzz logic) 的 SHA-256 查詢驗證結果：修復後內容不變、或重新連線 /fix_stream 時不重複審查/測試
+        key = verification_key(file_path) if cache is not None and file_path and os.path.exists(file_path) else None
+
+        hit = cached(key, "syntax")
+        if hit is not None:
+            syntax_is_valid, error_msg = hit.passed, hit.message
+        else:
+            syntax_is_valid, error_msg = static_code_check(file_path)
+            remember(key, VerificationResult("syntax", syntax_is_valid, error_msg))
         if not syntax_is_valid:
             yield f"data: ❌ 語法錯誤: {error_msg} (嘗試修復中...)\n\n"
             print(f"[Member3]: ❌ 語法錯誤: {error_msg}")
 
-            file_path, error_msg = run_fix(file_path, error_msg, provider, model, "syntax")
+            file_path, error_msg = yield from llm_step(run_fix, file_path, error_msg, provider, model, "syntax")
             max_retries -= 1
             continue
 
         yield "data: ✅ 語法正確\n\n"
 
-        logic_is_valid, error_msg = game_logic_check(gdd, file_path, provider, model)
+        # 本地 AST 靜態分析 (毫秒級)：找到問題就直接修復，跳過昂貴的 LLM 審查與 Fuzz 測試
+        diagnostics = [d for d in analyze_file(file_path) if d.severity == "error"]
+        if diagnostics:
+            error_msg = format_diagnostics(diagnostics)
+            yield f"data: ❌ 靜態分析: {error_msg.replace(chr(10), ' | ')} (嘗試修復中...)\n\n"
+            print(f"[Member3]: ❌ 靜態分析:\n{error_msg}")
+
+            file_path, error_msg = yield from llm_step(run_fix, file_path, error_msg, provider, model, "static", gdd)
+            max_retries -= 1
+            continue
+
+        yield "data: ✅ 靜態分析通過\n\n"
+
+        hit = cached(key, "logic_review")
+        if hit is not None:
+            logic_is_valid, error_msg = hit.passed, hit.message
+            yield "data: ♻️ 邏輯審查結果已快取 (程式碼未變更)\n\n"
+        else:
+            started = time.perf_counter()
+            logic_is_valid, error_msg = yield from llm_step(game_logic_check, gdd, file_path, provider, model)
+            if logic_is_valid or not is_llm_error(error_msg):
+                remember(key, VerificationResult("logic_review", logic_is_valid, error_msg,
+                                                 duration=time.perf_counter() - started))
         if not logic_is_valid:
             yield f"data: ❌ 邏輯錯誤: {error_msg} (嘗試修復中...)\n\n"
             print(f"[Member3]: ❌ 邏輯錯誤: {error_msg}")
 
-            file_path, error_msg = run_fix(file_path, error_msg, provider, model, "logic", gdd)
+            file_path, error_msg = yield from llm_step(run_fix, file_path, error_msg, provider, model, "logic", gdd)
             max_retries -= 1
             continue
 
         yield "data: ✅ 邏輯正確\n\n"
 
-        fuzz_passed, error_msg = run_fuzz_test(file_path, config.FUZZER_RUNNING_TIME)
+        if repro is not None:
+            still_crashes, replay_msg = replay_crash(file_path, repro, config.FUZZER_RUNNING_TIME)
+            if still_crashes:
+                error_msg = f"{replay_msg}\n\n{repro.describe()}"
+                yield f"data: ❌ 最小重現序列仍然 crash ({len(repro.actions)} inputs) (嘗試修復中...)\n\n"
+                print(f"[Member3]: ❌ 最小重現序列仍然 crash:\n{error_msg}")
+
+                file_path, error_msg = yield from llm_step(run_fix, file_path, error_msg, provider, model, "logic",
+                                                           gdd)
+                max_retries -= 1
+                continue
+            yield "data: ✅ 最小重現序列已不再 crash，進行完整 Fuzz 測試\n\n"
+            repro = None
+
+        fuzz_check = f"fuzz:{config.FUZZER_MODE}"
+        report = None
+        hit = cached(key, fuzz_check)
+        if hit is not None:
+            fuzz_passed, error_msg = hit.passed, hit.message
+            yield f"data: ♻️ Fuzz 結果已快取 ({hit.duration:.1f}s, seed={hit.seed})\n\n"
+        else:
+            started = time.perf_counter()
+            if config.FUZZER_MODE == "coverage" and config.FUZZER_HEADLESS:
+                report = run_coverage_fuzz(file_path, config.FUZZER_RUNNING_TIME)
+                if report.passed and config.FUZZER_PROFILE:
+                    # coverage 追蹤會扭曲時間量測: 另跑一個一般 seed 取得效能資料
+                    plain = fuzz_game(file_path, config.FUZZER_RUNNING_TIME, instances=1)
+                    if plain.passed:
+                        report.perf = plain.perf
+                    else:
+                        report = plain
+            else:
+                report = fuzz_game(file_path, config.FUZZER_RUNNING_TIME)
+            fuzz_passed, error_msg = report.passed, report.message
+            if report.coverage:
+                yield f"data: 📈 Fuzz coverage: {format_coverage(report.coverage)}\n\n"
+            # 測試本身無法執行 (環境問題) 的結果不快取
+            if not error_msg.startswith("Fuzz Test Failed to Run"):
+                remember(key, VerificationResult(fuzz_check, fuzz_passed, error_msg, seed=report.seed,
+                                                 duration=time.perf_counter() - started))
+        if not fuzz_passed and report is not None and report.actions is not None and config.FUZZER_MINIMIZE \
+                and config.FUZZER_HEADLESS:
+            yield f"data: 🔍 正在最小化 crash 輸入序列 ({len(report.actions)} inputs, seed={report.seed})...\n\n"
+            repro = minimize_crash(file_path, report)
+            if repro is not None:
+                error_msg = f"{error_msg}\n\n{repro.describe()}"
+                record_artifact(file_path, "repro", json.dumps(asdict(repro), ensure_ascii=False))
+                yield f"data: 🔍 最小重現序列: {len(repro.actions)} / " \
+                      f"{repro.original_length} inputs ({repro.runs} replays)\n\n"
         if not fuzz_passed:
-            yield f"data: ❌ 運行時錯誤 (Fuzzer): {error_msg} (嘗試修復中...)\n\n"
+            yield f"data: ❌ 運行時錯誤 (Fuzzer): {error_msg.replace(chr(10), ' | ')} (嘗試修復中...)\n\n"
             print(f"[Member3]: ❌ 運行時錯誤 (Fuzzer): {error_msg}")
 
-            file_path, error_msg = run_fix(file_path, error_msg, provider, model, "logic", gdd)
+            file_path, error_msg = yield from llm_step(run_fix, file_path, error_msg, provider, model, "logic", gdd)
             max_retries -= 1
             continue
 
         yield "data: ✅ 運行功能正確\n\n"
 
+        # 效能預算: 使用同一次 Fuzz 執行的量測結果 (FPS / frame time / 記憶體 / sprite / font)
+        hit = cached(key, "performance")
+        if hit is not None:
+            perf_ok, error_msg = hit.passed, hit.message
+        elif report is not None and report.perf and report.perf.get("frames_measured"):
+            yield f"data: ⏱️ 效能: {format_performance(report.perf)}\n\n"
+            violations = performance_violations(report.perf)
+            perf_ok = not violations
+            error_msg = performance_report(report.perf, violations) if violations else format_performance(report.perf)
+            remember(key, VerificationResult("performance", perf_ok, error_msg, seed=report.seed))
+        else:
+            perf_ok = True
+            if config.FUZZER_PROFILE:
+                yield "data: ⏱️ 效能檢查已略過 (沒有效能量測資料)\n\n"
+                print("[Member3]: 效能檢查已略過 (沒有效能量測資料)")
+        if not perf_ok:
+            yield f"data: ❌ 效能問題: {error_msg.replace(chr(10), ' | ')} (嘗試修復中...)\n\n"
+            print(f"[Member3]: ❌ 效能問題:\n{error_msg}")
+
+            file_path, error_msg = yield from llm_step(run_fix, file_path, error_msg, provider, model, "performance",
+                                                       gdd)
+            max_retries -= 1
+            continue
+
         game_is_valid = True
 
     # The format let js can detect finished
@@ -0,0 +1,593 @@
+"""
+Headless, time-accelerated fuzz harness.
+
+Run as a script in the fuzz subprocess:
+    python fuzz_harness.py <game_fuzz_temp.py> --frames 3600 --seed 1234
+
+It selects the dummy SDL video/audio drivers, replaces the wall clock seen by the game with a virtual
+clock (pygame.time.Clock.tick / get_ticks / delay / wait / set_timer, time.sleep / time / monotonic / perf_counter)
+and runs the game until it has rendered the frame budget, as fast as the CPU allows.
+The outcome is printed on stdout as a single RESULT_MARKER line followed by JSON.
+
+Coverage-guided mode (--actions / --coverage): the input comes from a scripted action sequence instead of the
+random monkey bot, and the executed line arcs of the game module are reported in the result.
+
+Profiling (--profile): per-frame CPU time, resident memory growth, live sprites / groups and Font constructions
+are reported in result["perf"].
+
+Input trace: in random-bot mode every input event the bot posts is logged with its frame number; on a crash the
+trace (replayable as --actions) and the crash site are reported, for delta-debugging by src/testing/minimizer.py.
+
+Only the standard library is imported at module level: the parent process imports this module
+for the helpers at the bottom without loading pygame.
+"""
+import json
+import os
+import random
+import sys
+import time
+import traceback
+import types
+
+RESULT_MARKER = "__FUZZ_HARNESS_RESULT__"
+HARNESS_PATH = os.path.abspath(__file__)
+
+# 遊戲沒有 clock.tick 時，每個 frame 推進的虛擬時間 (ms)
+DEFAULT_FRAME_MS = 1000.0 / 60
+# Bot 的亂數與遊戲的亂數分開 (seed 不同但可重現)
+BOT_SEED_SALT = 0x5EED
+# Profiling 不計入的啟動 frame 數 (載入資源、建立字型)
+PROFILE_WARMUP_FRAMES = 30
+# sprite 數量與記憶體的取樣間隔 (frame)
+PROFILE_SAMPLE_FRAMES = 30
+# 記錄到 input trace 的事件 (bot 注入的輸入；計時器事件與遊戲自己的事件不記錄)
+RECORDED_EVENTS = ("KEYDOWN", "KEYUP", "MOUSEBUTTONDOWN", "MOUSEBUTTONUP", "MOUSEMOTION", "MOUSEWHEEL")
+MAX_TRACE_LENGTH = 5000
+
+
+class VirtualClock:
+    """
+    Virtual time (ms) advanced by the game's own clock.tick / sleep calls, never by the wall clock.
+    A frame ends at every display.flip / display.update; the run stops once the frame budget is used.
+    """
+
+    def __init__(self, frames: int, seed: int):
+        self.frames_budget = frames
+        self.seed = seed
+        self.now_ms = 0.0
+        self.frame = 0
+        self.ticked = False  # 這個 frame 是否已呼叫 clock.tick
+        self.timers: dict = {}  # event type -> [event, interval_ms, next_fire_ms, remaining loops (0 = forever)]
+        self.frame_callbacks: list = []  # called with the new frame number after every frame
+        self.arcs: set | None = None  # (from line, to line) of the game module, coverage mode only
+        self.profiler: FrameProfiler | None = None
+        self.trace: list | None = None  # Injected input events as raw "post" actions, random-bot mode only
+        self.crash_site: dict | None = None
+        self.wall_start = time.perf_counter()
+        self.real = {
+            "time": time.time,
+            "monotonic": time.monotonic,
+            "perf_counter": time.perf_counter,
+            "sleep": time.sleep,
+        }
+        self.epoch = time.time()
+
+    def advance(self, ms: float) -> None:
+        self.now_ms += max(0.0, ms)
+        self._fire_timers()
+
+    def _fire_timers(self) -> None:
+        if not self.timers:
+            return
+        import pygame
+        for event_type, timer in list(self.timers.items()):
+            event, interval, next_fire, loops = timer
+            while next_fire <= self.now_ms:
+                pygame.event.post(event)
+                next_fire += interval
+                if loops:
+                    loops -= 1
+                    if loops == 0:
+                        self.timers.pop(event_type, None)
+                        break
+            timer[2], timer[3] = next_fire, loops
+
+    def end_frame(self) -> None:
+        if not self.ticked:
+            self.advance(DEFAULT_FRAME_MS)
+        self.ticked = False
+        self.frame += 1
+        if self.frame >= self.frames_budget:
+            finish(self, "passed")
+        for callback in self.frame_callbacks:
+            callback(self.frame)
+
+    def result(self, status: str, error: str = "") -> dict:
+        result = {
+            "status": status,
+            "frames": self.frame,
+            "virtual_time": round(self.now_ms / 1000.0, 3),
+            "wall_time": round(self.real["perf_counter"]() - self.wall_start, 3),
+            "seed": self.seed,
+            "error": error,
+        }
+        if self.arcs is not None:
+            result["arcs"] = sorted(self.arcs)
+        if self.profiler is not None:
+            result["perf"] = self.profiler.report()
+        if status == "crashed":
+            result["crash_site"] = self.crash_site
+            if self.trace is not None:
+                result["trace"] = self.trace
+        return result
+
+
+class FrameProfiler:
+    """
+    Per-frame CPU time (time.process_time: not inflated by the other fuzz processes sharing the CPU),
+    resident memory growth, live sprites / sprite groups and pygame Font constructions.
+    The first PROFILE_WARMUP_FRAMES frames only set the baselines.
+    Memory is sampled from the process RSS every PROFILE_SAMPLE_FRAMES frames outside the timed region:
+    tracemalloc would slow every allocation down (about 5x per frame) and fail healthy games on the frame budget.
+    """
+
+    def __init__(self):
+        import weakref
+        self.process_time = time.process_time
+        self.frame_ms: list[float] = []
+        self.last_cpu: float | None = None
+        self.sprites = weakref.WeakSet()
+        self.groups = weakref.WeakSet()
+        self.fonts_created = 0
+        self.fonts_at_warmup = 0
+        self.memory_at_warmup: float | None = None
+        self.memory_peak = 0.0
+        self.sprites_at_warmup = 0
+        self.max_sprites = 0
+        self.max_grouped = 0
+
+    def install(self, clock: VirtualClock) -> None:
+        import pygame
+
+        profiler = self
+        sprite_init = pygame.sprite.Sprite.__init__
+        group_init = pygame.sprite.AbstractGroup.__init__
+
+        def counting_sprite_init(sprite, *args, **kwargs):
+            profiler.sprites.add(sprite)
+            sprite_init(sprite, *args, **kwargs)
+
+        def counting_group_init(group, *args, **kwargs):
+            profiler.groups.add(group)
+            group_init(group, *args, **kwargs)
+
+        class _CountingFont(pygame.font.Font):
+            def __init__(font, *args, **kwargs):
+                profiler.fonts_created += 1
+                super().__init__(*args, **kwargs)
+
+        sys_font = pygame.font.SysFont
+
+        def counting_sys_font(*args, **kwargs):
+            profiler.fonts_created += 1
+            return sys_font(*args, **kwargs)
+
+        pygame.sprite.Sprite.__init__ = counting_sprite_init
+        pygame.sprite.AbstractGroup.__init__ = counting_group_init
+        pygame.font.Font = _CountingFont
+        pygame.font.SysFont = counting_sys_font
+
+        clock.profiler = self
+        clock.frame_callbacks.append(self.on_frame)
+
+    def on_frame(self, frame: int) -> None:
+        now = self.process_time()
+        if frame > PROFILE_WARMUP_FRAMES and self.last_cpu is not None:
+            self.frame_ms.append((now - self.last_cpu) * 1000.0)
+        if frame == PROFILE_WARMUP_FRAMES:
+            self.memory_at_warmup = _resident_kb()
+            self.sprites_at_warmup = len(self.sprites)
+            self.fonts_at_warmup = self.fonts_created
+        if frame % PROFILE_SAMPLE_FRAMES == 0:
+            self.max_sprites = max(self.max_sprites, len(self.sprites))
+            self.max_grouped = max(self.max_grouped, sum(len(group) for group in list(self.groups)))
+            self.memory_peak = max(self.memory_peak, _resident_kb() or 0.0)
+        # 量測不含 profiler 自己的時間
+        self.last_cpu = self.process_time()
+
+    def report(self) -> dict:
+        current = _resident_kb()
+        samples = sorted(self.frame_ms)
+
+        def percentile(q: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))], 3)
+
+        mean = sum(samples) / len(samples) if samples else 0.0
+        memory_measured = bool(samples) and current is not None and self.memory_at_warmup is not None
+        return {
+            "frames_measured": len(samples),
+            "frame_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99),
+                         "max": round(samples[-1], 3) if samples else 0.0},
+            "fps": round(1000.0 / mean, 1) if mean > 0 else 0.0,
+            "memory_growth_kb": round(current - self.memory_at_warmup, 1) if memory_measured else 0.0,
+            "memory_peak_kb": round(max(self.memory_peak, current or 0.0), 1),
+            "sprites": {"start": self.sprites_at_warmup, "end": len(self.sprites),
+                        "max": max(self.max_sprites, len(self.sprites))},
+            "grouped_sprites_max": self.max_grouped,
+            "groups": len(self.groups),
+            "fonts_created": self.fonts_created,
+            "fonts_created_in_game": self.fonts_created - self.fonts_at_warmup if samples else 0,
+        }
+
+
+def _resident_kb() -> float | None:
+    """
+    Resident set size of this process in KB (Linux /proc), None where it is unavailable.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def finish(clock: VirtualClock, status: str, error: str = "") -> None:
+    """
+    Print the result line and leave immediately: os._exit cannot be swallowed by the game's own try/except.
+    """
+    sys.settrace(None)
+    sys.stdout.write(f"\n{RESULT_MARKER}{json.dumps(clock.result(status, error))}\n")
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(1 if status == "crashed" else 0)
+
+
+def install_virtual_time(clock: VirtualClock) -> None:
+    import pygame
+
+    class _Clock:
+        def __init__(self):
+            self._last = 0.0
+            self._fps = 0.0
+
+        def tick(self, framerate=0):
+            step = 1000.0 / framerate if framerate and framerate > 0 else DEFAULT_FRAME_MS
+            clock.advance(step)
+            clock.ticked = True
+            elapsed = clock.now_ms - self._last
+            self._last = clock.now_ms
+            self._fps = 1000.0 / elapsed if elapsed > 0 else 0.0
+            return int(elapsed)
+
+        tick_busy_loop = tick
+
+        def get_time(self):
+            return int(1000.0 / self._fps) if self._fps else 0
+
+        def get_rawtime(self):
+            return self.get_time()
+
+        def get_fps(self):
+            return self._fps
+
+    def _sleep_ms(ms):
+        clock.advance(float(ms))
+        return int(ms)
+
+    def _set_timer(event, millis, loops=0):
+        event = pygame.event.Event(event) if isinstance(event, int) else event
+        if not millis or millis <= 0:
+            clock.timers.pop(event.type, None)
+            return
+        clock.timers[event.type] = [event, float(millis), clock.now_ms + millis, int(loops)]
+
+    pygame.time.Clock = _Clock
+    pygame.time.get_ticks = lambda: int(clock.now_ms)
+    pygame.time.delay = _sleep_ms
+    pygame.time.wait = _sleep_ms
+    pygame.time.set_timer = _set_timer
+
+    time.sleep = lambda seconds: clock.advance(float(seconds) * 1000.0)
+    time.time = lambda: clock.epoch + clock.now_ms / 1000.0
+    time.monotonic = lambda: clock.now_ms / 1000.0
+    time.perf_counter = lambda: clock.now_ms / 1000.0
+
+    # 每次畫面更新 = 一個 frame
+    original_flip = pygame.display.flip
+    original_update = pygame.display.update
+
+    def _flip():
+        result = original_flip()
+        clock.end_frame()
+        return result
+
+    def _update(*args, **kwargs):
+        result = original_update(*args, **kwargs)
+        clock.end_frame()
+        return result
+
+    pygame.display.flip = _flip
+    pygame.display.update = _update
+
+
+class _PressedKeys:
+    """
+    Stand-in for pygame.key.get_pressed() driven by the scripted KEYDOWN / KEYUP events
+    (posted events do not change SDL's own keyboard state).
+    """
+
+    def __init__(self, held: set):
+        self.held = held
+
+    def __getitem__(self, key) -> bool:
+        return key in self.held
+
+    def __len__(self) -> int:
+        return 512
+
+    def __iter__(self):
+        return iter([True] * len(self.held))
+
+
+def install_input_script(clock: VirtualClock, actions: list) -> None:
+    """
+    Replay a scripted action sequence instead of the random monkey bot. Actions:
+        {"frame": 12, "key": "K_LEFT", "hold": 8}         KEYDOWN at frame 12, KEYUP 8 frames later
+        {"frame": 40, "click": [400, 300], "button": 1}   MOUSEBUTTONDOWN, MOUSEBUTTONUP one frame later
+        {"frame": 41, "post": "KEYDOWN", "attrs": {...}}  exactly one event, as logged by install_event_recorder
+    Events due at frame n are posted when frame n - 1 ends, so the game reads them during frame n.
+    """
+    import pygame
+
+    schedule: list = []  # (frame, order, kind, payload)
+    for order, action in enumerate(actions):
+        frame = max(0, int(action.get("frame", 0)))
+        if "key" in action:
+            key = getattr(pygame, str(action["key"]), None)
+            if not isinstance(key, int):
+                continue
+            hold = max(1, int(action.get("hold", 1)))
+            schedule.append((frame, order, "down", key))
+            schedule.append((frame + hold, order, "up", key))
+        elif "click" in action:
+            pos = tuple(int(v) for v in action["click"][:2])
+            button = int(action.get("button", 1))
+            schedule.append((frame, order, "press", (pos, button)))
+            schedule.append((frame + 1, order, "release", (pos, button)))
+        elif action.get("post") in RECORDED_EVENTS:
+            attrs = {name: tuple(value) if isinstance(value, list) else value
+                     for name, value in action.get("attrs", {}).items()}
+            schedule.append((frame, order, "raw", (getattr(pygame, action["post"]), attrs)))
+    schedule.sort(key=lambda item: (item[0], item[1]))
+
+    held: set = set()
+    mouse = {"pos": (0, 0), "buttons": [False] * 5}
+
+    def post_due(frame: int) -> None:
+        while schedule and schedule[0][0] <= frame:
+            _, _, kind, payload = schedule.pop(0)
+            if kind in ("down", "up"):
+                unicode = chr(payload) if payload < 0x110000 and chr(payload).isprintable() else ""
+                event_type = pygame.KEYDOWN if kind == "down" else pygame.KEYUP
+                (held.add if kind == "down" else held.discard)(payload)
+                pygame.event.post(pygame.event.Event(event_type, {"key": payload, "mod": 0, "unicode": unicode,
+                                                                  "scancode": 0}))
+            elif kind == "raw":
+                pygame.event.post(pygame.event.Event(*payload))
+            else:
+                pos, button = payload
+                mouse["pos"] = pos
+                mouse["buttons"][(button - 1) % 5] = kind == "press"
+                event_type = pygame.MOUSEBUTTONDOWN if kind == "press" else pygame.MOUSEBUTTONUP
+                pygame.event.post(pygame.event.Event(event_type, {"pos": pos, "button": button}))
+
+    clock.frame_callbacks.append(post_due)
+    pygame.key.get_pressed = lambda: _PressedKeys(held)
+    pygame.mouse.get_pos = lambda: mouse["pos"]
+    pygame.mouse.get_pressed = lambda num_buttons=3: tuple(mouse["buttons"][:num_buttons])
+
+
+def install_event_recorder(clock: VirtualClock) -> None:
+    """
+    Log every input event posted through pygame.event.post (by the monkey bot) with the frame it was posted in,
+    as raw "post" actions that install_input_script replays identically.
+    """
+    import pygame
+
+    recorded = {getattr(pygame, name): name for name in RECORDED_EVENTS if hasattr(pygame, name)}
+    key_names = {getattr(pygame, name): name for name in dir(pygame) if name.startswith("K_")}
+    original_post = pygame.event.post
+    clock.trace = []
+
+    def recording_post(event, *args, **kwargs):
+        name = recorded.get(getattr(event, "type", None))
+        if name is not None and len(clock.trace) < MAX_TRACE_LENGTH:
+            attrs = {}
+            for attr, value in event.dict.items():
+                if isinstance(value, tuple):
+                    value = list(value)
+                if isinstance(value, (int, float, str, bool, list)):
+                    attrs[attr] = value
+            action = {"frame": clock.frame, "post": name, "attrs": attrs}
+            if attrs.get("key") in key_names:
+                action["key_name"] = key_names[attrs["key"]]
+            clock.trace.append(action)
+        return original_post(event, *args, **kwargs)
+
+    pygame.event.post = recording_post
+
+
+def install_coverage(clock: VirtualClock, game_path: str) -> None:
+    """
+    Record the (previous line, line) arcs executed in the game module (negative first line = function entry).
+    Frames of other files are not traced at all.
+    """
+    arcs: set = set()
+    clock.arcs = arcs
+
+    def global_trace(frame, event, arg):
+        if frame.f_code.co_filename != game_path:
+            return None
+        last = [-frame.f_code.co_firstlineno]
+
+        def local_trace(frame, event, arg):
+            if event == "line":
+                arcs.add((last[0], frame.f_lineno))
+                last[0] = frame.f_lineno
+            return local_trace
+
+        return local_trace
+
+    sys.settrace(global_trace)
+
+
+def run(game_path: str, frames: int, seed: int, code: str | None = None, actions: list | None = None,
+        coverage: bool = False, profile: bool = False) -> None:
+    """
+    Run the game until the frame budget is used. Never returns (the process exits through finish()).
+    :param code: The injected game source (zygote mode); when None game_path is read from disk
+    :type code: str | None
+
+    :param actions: Scripted input sequence (coverage-guided mode), see install_input_script
+    :type actions: list | None
+
+    :param coverage: Report the executed line arcs of the game module
+    :type coverage: bool
+
+    :param profile: Report frame times, memory growth, sprite and font counts (see FrameProfiler)
+    :type profile: bool
+    """
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+    game_path = os.path.abspath(game_path)
+    sys.argv = [game_path]
+    sys.path.insert(0, os.path.dirname(game_path))
+
+    random.seed(seed)
+    # 注入的 monkey bot 從這個模組取得自己的亂數產生器
+    bot_module = types.ModuleType("_fuzz_harness")
+    bot_module.bot_random = random.Random(seed ^ BOT_SEED_SALT)
+    sys.modules["_fuzz_harness"] = bot_module
+
+    clock = VirtualClock(frames, seed)
+    install_virtual_time(clock)
+    if actions is not None:
+        install_input_script(clock, actions)
+    else:
+        install_event_recorder(clock)
+    if profile:
+        FrameProfiler().install(clock)
+
+    import runpy
+    if coverage:
+        install_coverage(clock, game_path)
+    try:
+        if code is None:
+            runpy.run_path(game_path, run_name="__main__")
+        else:
+            # 原始碼不落地: 登記到 linecache，traceback 仍可顯示程式碼行
+            import linecache
+            linecache.cache[game_path] = (len(code), None, code.splitlines(keepends=True), game_path)
+            exec(compile(code, game_path, "exec"), {"__name__": "__main__", "__file__": game_path,
+                                                     "__builtins__": __builtins__})
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            finish(clock, "crashed", f"SystemExit({e.code!r})")
+    except BaseException as e:
+        error = _game_traceback(e, game_path)
+        clock.crash_site = _crash_site(e, game_path)
+        sys.stderr.write(error)
+        finish(clock, "crashed", error)
+    finish(clock, "exited")
+
+
+def _game_traceback(error: BaseException, game_path: str) -> str:
+    """
+    The traceback without the harness / runpy frames, so the fixer only sees the game's own stack.
+    """
+    tb = error.__traceback__
+    while tb is not None and os.path.abspath(tb.tb_frame.f_code.co_filename) != game_path:
+        tb = tb.tb_next
+    return "".join(traceback.format_exception(type(error), error, tb or error.__traceback__))
+
+
+def _crash_site(error: BaseException, game_path: str) -> dict:
+    """
+    Exception type and the source of the innermost game line: stable across bot injection (line numbers are not).
+    """
+    import linecache
+    site = {"exception": type(error).__name__, "line": 0, "source": ""}
+    tb = error.__traceback__
+    while tb is not None:
+        if os.path.abspath(tb.tb_frame.f_code.co_filename) == game_path:
+            site["line"] = tb.tb_lineno
+            site["source"] = linecache.getline(game_path, tb.tb_lineno).strip()
+        tb = tb.tb_next
+    return site
+
+
+# --- Parent-side helpers ---
+def harness_command(game_path: str, frames: int, seed: int, actions: list | None = None,
+                    coverage: bool = False, profile: bool = False) -> list[str]:
+    """
+    The harness command line. A scripted input sequence is read from stdin ("--actions -"): traces of up to
+    MAX_TRACE_LENGTH actions would exceed the per-argument size limit of execve; send harness_input(actions).
+    """
+    command = [sys.executable, HARNESS_PATH, game_path, "--frames", str(frames), "--seed", str(seed)]
+    if actions is not None:
+        command += ["--actions", "-"]
+    if coverage:
+        command.append("--coverage")
+    if profile:
+        command.append("--profile")
+    return command
+
+
+def harness_input(actions: list | None) -> str | None:
+    """
+    The stdin of a harness_command run (the JSON action sequence), None without actions.
+    """
+    return None if actions is None else json.dumps(actions)
+
+
+def parse_harness_result(stdout: str) -> dict | None:
+    """
+    :return: The JSON result printed by the harness, or None when the process died before reporting
+    :rtype: dict | None
+    """
+    for line in reversed(stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            try:
+                return json.loads(line[len(RESULT_MARKER):])
+            except ValueError:
+                return None
+    return None
+
+
+def new_seed() -> int:
+    return random.SystemRandom().randrange(2 ** 31)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Headless time-accelerated fuzz harness")
+    parser.add_argument("game_path")
+    parser.add_argument("--frames", type=int, default=3600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--actions", default=None,
+                        help="Scripted input sequence: a JSON list, or - to read the JSON list from stdin")
+    parser.add_argument("--coverage", action="store_true")
+    parser.add_argument("--profile", action="store_true")
+    arguments = parser.parse_args()
+    if arguments.actions == "-":
+        scripted = json.load(sys.stdin)
+    else:
+        scripted = None if arguments.actions is None else json.loads(arguments.actions)
+    run(arguments.game_path, arguments.frames, arguments.seed, actions=scripted, coverage=arguments.coverage,
+        profile=arguments.profile)
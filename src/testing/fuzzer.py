@@ -1,8 +1,18 @@
+import ast
 import os
 import re
 import subprocess
 import sys
+import tempfile
 import textwrap
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from config import config
+from src.generation.file_utils import uses_game_runtime
+from src.testing.fuzz_harness import harness_command, harness_input, parse_harness_result, new_seed
+from src.testing.zygote import get_zygote
 
 
 def get_dynamic_fuzz_logic(game_file_path: str) -> str:
@@ -89,7 +99,11 @@ def inject_monkey_bot(code_content: str, bot_logic: str) -> str:
     # --- [INJECTED DYNAMIC MONKEY BOT START] ---
     if 'pygame' in globals():
         try:
-            import random as _monkey_random
+            try:
+                # Headless harness: the bot has its own seeded RNG, separate from the game's random
+                from _fuzz_harness import bot_random as _monkey_random
+            except ImportError:
+                import random as _monkey_random
             # Dynamic Logic from GDD
 {indented_logic}
         except Exception as _e:
@@ -103,6 +117,10 @@ def inject_monkey_bot(code_content: str, bot_logic: str) -> str:
     # Handle the indentation
     monkey_bot_code = textwrap.dedent(monkey_bot_code).strip()
 
+    # Scaffold games (game_runtime.Game) have no main loop of their own: run the bot as a frame hook
+    if uses_game_runtime(code_content):
+        return _inject_frame_hook(code_content, monkey_bot_code)
+
     # 4. Find injection point (Main Loop) and detect the indentation
     pattern = r"^([ \t]*)while\s+.*:"
     matches = list(re.finditer(pattern, code_content, re.MULTILINE))
@@ -128,43 +146,112 @@ def inject_monkey_bot(code_content: str, bot_logic: str) -> str:
     return code_content
 
 
-def run_fuzz_test(file_path: str, duration: int = 5) -> tuple[bool, str]:
+def _inject_frame_hook(code_content: str, monkey_bot_code: str) -> str:
+    """
+    Register the bot with game_runtime.add_frame_hook right after the last top-level import,
+    so it runs once per frame inside Game.run().
+    """
+    hook_body = "\n".join(["    " + line for line in monkey_bot_code.splitlines()])
+    hook_code = (
+        "# --- [INJECTED MONKEY BOT FRAME HOOK START] ---\n"
+        "def _monkey_bot_hook(_game):\n"
+        f"{hook_body}\n"
+        "\n"
+        "import game_runtime as _monkey_runtime\n"
+        "_monkey_runtime.add_frame_hook(_monkey_bot_hook)\n"
+        "# --- [INJECTED MONKEY BOT FRAME HOOK END] ---\n"
+    )
+
+    lines = code_content.splitlines(keepends=True)
+    insert_at = 0
+    try:
+        for node in ast.parse(code_content).body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                insert_at = node.end_lineno
+    except SyntaxError:
+        pass
+    if insert_at and not lines[insert_at - 1].endswith("\n"):
+        lines[insert_at - 1] += "\n"
+    return "".join(lines[:insert_at]) + hook_code + "".join(lines[insert_at:])
+
+
+@dataclass
+class FuzzReport:
+    passed: bool
+    message: str
+    seed: Optional[int] = None  # 失敗的 seed (可重現)，通過時為第一個 seed
+    runs: int = 1
+    actions: Optional[list] = None  # 造成 crash 的輸入序列 (coverage 模式的 action 序列 / 隨機模式記錄的 trace)
+    coverage: Optional[dict] = None  # Coverage-guided mode: lines / total / arcs / corpus
+    perf: Optional[dict] = None  # FUZZER_PROFILE: 第一個 seed 的效能量測 (fuzz_harness.FrameProfiler)
+    crash_frame: Optional[int] = None
+    crash_site: Optional[dict] = None  # exception / line / source of the innermost game frame
+
+    @classmethod
+    def crashed(cls, message: str, seed: int, runs: int, result: dict | None, actions: list | None = None,
+                coverage: dict | None = None) -> "FuzzReport":
+        result = result or {}
+        return cls(False, message, seed, runs, actions if actions is not None else result.get("trace"), coverage,
+                   crash_frame=result.get("frames"), crash_site=result.get("crash_site"))
+
+
+def run_fuzz_test(file_path: str, duration: int = 5, frames: int | None = None,
+                  seed: int | None = None) -> tuple[bool, str]:
     """
     Run the fuzz test
+    With FUZZER_HEADLESS the game runs in the headless harness on a virtual clock: the budget is
+    `frames` rendered frames (default FUZZER_FRAMES) and `duration` is only the wall-clock safety limit.
+    Otherwise the game runs in real time for `duration` seconds.
     :param file_path: The path to the game file
     :type file_path: str
 
-    :param duration: The duration of the fuzz test
+    :param duration: The duration of the fuzz test (seconds)
     :type duration: int
 
+    :param frames: The frame budget of the headless run
+    :type frames: int | None
+
+    :param seed: Seed of the game's and the bot's RNG (headless only, random when None)
+    :type seed: int | None
+
     :return: A tuple (success_flag, message)
     :rtype: tuple[bool, str]
     """
+    report = fuzz_game(file_path, duration, frames, seed)
+    return report.passed, report.message
+
+
+def fuzz_game(file_path: str, duration: int = 5, frames: int | None = None, seed: int | None = None,
+              instances: int | None = None) -> FuzzReport:
+    """
+    Like run_fuzz_test, with the seed that crashed. In headless mode `instances` (default FUZZER_INSTANCES)
+    seeded runs (seed, seed + 1, ...) are executed on a pool of FUZZER_WORKERS processes; the first crash
+    cancels the remaining runs.
+    """
     try:
         if not os.path.exists(file_path):
-            return False, "File not found"
-
-        with open(file_path, "r", encoding="utf-8") as f:
-            original_code = f.read()
+            return FuzzReport(False, "File not found")
 
-        bot_logic = get_dynamic_fuzz_logic(file_path)
+        # 5. Set environment variable (disable sound effects to avoid interference)
+        env = os.environ.copy()
+        env["SDL_AUDIODRIVER"] = "dummy"
 
-        fuzzed_code = inject_monkey_bot(original_code, bot_logic)
+        if config.FUZZER_HEADLESS:
+            frames = frames or config.FUZZER_FRAMES
+            seed = new_seed() if seed is None else seed
+            instances = max(1, instances or config.FUZZER_INSTANCES)
+            env["SDL_VIDEODRIVER"] = "dummy"
+            print(f"[Fuzzer] 正在對 {os.path.basename(file_path)} 進行 {instances} x {frames} frames "
+                  f"的無頭加速壓力測試 (seed={seed}..{seed + instances - 1})...")
+            return _run_seeds(file_path, [seed + i for i in range(instances)], frames, duration, env)
 
-        temp_file = file_path.replace(".py", "_fuzz_temp.py")
-        with open(temp_file, "w", encoding="utf-8") as f:
-            f.write(fuzzed_code)
+        temp_file = _write_fuzz_file(file_path)
 
         print(f"[Fuzzer] 正在對 {os.path.basename(file_path)} 進行 {duration} 秒的動態壓力測試...")
 
-        # 5. Set environment variable (disable sound effects to avoid interference)
-        env = os.environ.copy()
-        env["SDL_AUDIODRIVER"] = "dummy"
-
         # 6. Run the main_fuzz_temp.py
-        cmd = [sys.executable, temp_file]
         process = subprocess.Popen(
-            cmd,
+            [sys.executable, temp_file],
             stderr=subprocess.PIPE,
             stdout=subprocess.PIPE,
             text=True,
@@ -175,21 +262,209 @@ def run_fuzz_test(file_path: str, duration: int = 5) -> tuple[bool, str]:
             stdout, stderr = process.communicate(timeout=duration)
         except subprocess.TimeoutExpired:
             process.kill()
+            process.communicate()
             # if os.path.exists(temp_file):
             #     os.remove(temp_file)
-            return True, "Fuzz Test Passed (Survived random inputs)."
+            return FuzzReport(True, "Fuzz Test Passed (Survived random inputs).")
 
         if os.path.exists(temp_file):
             os.remove(temp_file)
 
         if process.returncode != 0:
-            error_msg = stderr
-            if "Traceback" in stderr:
-                error_msg = "Traceback" + stderr.split("Traceback")[-1]
-
-            return False, f"Runtime Logic Error (Crashed): {error_msg}"
+            return FuzzReport(False, f"Runtime Logic Error (Crashed): {_extract_traceback(stderr)}")
 
-        return True, "Fuzz Test Passed."
+        return FuzzReport(True, "Fuzz Test Passed.")
 
     except Exception as e:
-        return False, f"Fuzz Test Failed to Run: {str(e)}"
\ No newline at end of file
+        return FuzzReport(False, f"Fuzz Test Failed to Run: {str(e)}")
+
+
+def _fuzz_code(file_path: str) -> str:
+    with open(file_path, "r", encoding="utf-8") as f:
+        original_code = f.read()
+
+    bot_logic = get_dynamic_fuzz_logic(file_path)
+
+    return inject_monkey_bot(original_code, bot_logic)
+
+
+def _write_fuzz_file(file_path: str, fuzzed_code: str | None = None) -> str:
+    temp_file = file_path.replace(".py", "_fuzz_temp.py")
+    with open(temp_file, "w", encoding="utf-8") as f:
+        f.write(_fuzz_code(file_path) if fuzzed_code is None else fuzzed_code)
+    return temp_file
+
+
+class _SubprocessRun:
+    """
+    One harness run in a fresh interpreter. Output goes to temporary files (not pipes),
+    so a chatty game cannot block on a full pipe while we poll. Input (the action sequence) comes from a
+    temporary file as well.
+    """
+
+    def __init__(self, command: list[str], env: dict, stdin_data: str | None = None):
+        self.stdin_file = None
+        if stdin_data is not None:
+            self.stdin_file = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+            self.stdin_file.write(stdin_data)
+            self.stdin_file.seek(0)
+        self.stdout_file = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+        self.stderr_file = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+        self.process = subprocess.Popen(command, stdin=self.stdin_file, stdout=self.stdout_file,
+                                        stderr=self.stderr_file, text=True, env=env)
+
+    @property
+    def returncode(self) -> int | None:
+        return self.process.returncode
+
+    def poll(self) -> int | None:
+        return self.process.poll()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.wait()
+
+    def result(self) -> tuple[str, str]:
+        self.stdout_file.seek(0)
+        self.stderr_file.seek(0)
+        return self.stdout_file.read(), self.stderr_file.read()
+
+    def close(self) -> None:
+        if self.stdin_file is not None:
+            self.stdin_file.close()
+        self.stdout_file.close()
+        self.stderr_file.close()
+
+
+def _zygote_socket() -> str:
+    # 預設每個行程一個 socket (多個 Flask worker 各自擁有自己的 zygote)
+    return config.FUZZER_ZYGOTE_SOCKET or os.path.join(tempfile.gettempdir(), f"fuzz_zygote_{os.getpid()}.sock")
+
+
+class FuzzPool:
+    """
+    Starts headless harness runs of one game, at most FUZZER_WORKERS at a time.
+    With FUZZER_ZYGOTE the runs are forked from the preloaded zygote and the source is sent over its socket;
+    otherwise (or when the zygote is unavailable) each run is a new interpreter running a temp file.
+    """
+
+    def __init__(self, file_path: str, fuzzed_code: str, frames: int, env: dict):
+        self.file_path = file_path
+        self.fuzzed_code = fuzzed_code
+        self.frames = frames
+        self.env = env
+        self.game_path = os.path.abspath(file_path.replace(".py", "_fuzz_temp.py"))
+        self.zygote = get_zygote(_zygote_socket()) if config.FUZZER_ZYGOTE else None
+        self.workers = config.FUZZER_WORKERS or os.cpu_count() or 1
+        self.temp_file = None
+        self.running: dict = {}  # run -> caller tag (seed, input sequence, ...)
+
+    def launch(self, seed: int, tag=None, actions: list | None = None, coverage: bool = False,
+               profile: bool = False) -> None:
+        if self.zygote is not None:
+            try:
+                run = self.zygote.spawn(self.game_path, self.fuzzed_code, self.frames, seed, actions, coverage,
+                                        profile)
+                self.running[run] = seed if tag is None else tag
+                return
+            except OSError as e:
+                print(f"[Fuzzer] Zygote spawn failed, using a subprocess: {e}")
+        if self.temp_file is None:
+            self.temp_file = _write_fuzz_file(self.file_path, self.fuzzed_code)
+        command = harness_command(self.temp_file, self.frames, seed, actions, coverage, profile)
+        self.running[_SubprocessRun(command, self.env, harness_input(actions))] = seed if tag is None else tag
+
+    def has_capacity(self) -> bool:
+        return len(self.running) < self.workers
+
+    def finished(self) -> list[tuple[object, bool, str, dict | None]]:
+        """
+        :return: (tag, passed, message, harness result) of every run that ended since the last call
+        """
+        done = []
+        for run in list(self.running):
+            if run.poll() is None:
+                continue
+            tag = self.running.pop(run)
+            stdout, stderr = run.result()
+            run.close()
+            done.append((tag, *_headless_outcome(run.returncode, stdout, stderr)))
+        return done
+
+    def wait_interval(self) -> None:
+        time.sleep(0.005 if self.zygote is not None else 0.02)
+
+    def cancel_all(self) -> None:
+        for run in list(self.running):
+            run.kill()
+            self.running.pop(run)
+            run.close()
+
+    def close(self) -> None:
+        self.cancel_all()
+        if self.temp_file is not None and os.path.exists(self.temp_file):
+            os.remove(self.temp_file)
+
+
+def _run_seeds(file_path: str, seeds: list[int], frames: int, duration: float, env: dict) -> FuzzReport:
+    """
+    Run one harness job per seed on a FuzzPool within `duration` wall-clock seconds.
+    With FUZZER_PROFILE the first seed is also profiled (only one run pays the profiling overhead).
+    """
+    pool = FuzzPool(file_path, _fuzz_code(file_path), frames, env)
+    pending = list(seeds)
+    summaries = []
+    perf = None
+    deadline = time.monotonic() + duration
+
+    try:
+        while pending or pool.running:
+            while pending and pool.has_capacity():
+                run_seed = pending.pop(0)
+                pool.launch(run_seed, profile=config.FUZZER_PROFILE and run_seed == seeds[0])
+
+            for run_seed, passed, message, result in pool.finished():
+                if not passed:
+                    # 第一個 crash 出現就取消其餘的 worker
+                    pool.cancel_all()
+                    return FuzzReport.crashed(message, run_seed, len(summaries) + 1, result)
+                summaries.append(message)
+                if result is not None and "perf" in result:
+                    perf = result["perf"]
+
+            if time.monotonic() > deadline:
+                # 實際時間上限: 仍在執行的 seed 視為存活
+                survived = len(pool.running)
+                pool.cancel_all()
+                return FuzzReport(True, f"Fuzz Test Passed ({len(summaries)} seeds finished, {survived} survived "
+                                        f"until the {duration}s limit, {len(pending)} not started).",
+                                  seeds[0], len(summaries) + survived, perf=perf)
+            pool.wait_interval()
+    finally:
+        pool.close()
+
+    if len(summaries) == 1:
+        return FuzzReport(True, summaries[0], seeds[0], perf=perf)
+    return FuzzReport(True, f"Fuzz Test Passed ({len(summaries)} seeds {seeds[0]}..{seeds[-1]}, "
+                            f"{frames} frames each).", seeds[0], len(summaries), perf=perf)
+
+
+def _extract_traceback(stderr: str) -> str:
+    if "Traceback" in stderr:
+        return "Traceback" + stderr.split("Traceback")[-1]
+    return stderr
+
+
+def _headless_outcome(returncode: int, stdout: str, stderr: str) -> tuple[bool, str, dict | None]:
+    result = parse_harness_result(stdout)
+    if result is None:
+        # 行程在回報結果前就結束 (segfault / 被 kill)
+        return False, f"Runtime Logic Error (Crashed, exit code {returncode}): {_extract_traceback(stderr)}", None
+
+    summary = f"{result['frames']} frames, {result['virtual_time']}s game time in {result['wall_time']}s, seed={result['seed']}"
+    if result["status"] == "crashed":
+        return False, f"Runtime Logic Error (Crashed at frame {result['frames']}, seed={result['seed']}): " \
+                      f"{_extract_traceback(result['error'])}", result
+    if result["status"] == "exited":
+        return True, f"Fuzz Test Passed (game exited by itself after {summary}).", result
+    return True, f"Fuzz Test Passed ({summary}).", result
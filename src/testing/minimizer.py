@@ -0,0 +1,198 @@
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from config import config
+from src.testing.fuzzer import FuzzPool, FuzzReport
+
+# 重播時在 crash frame 之後多跑的 frame 數 (較少的輸入也可能稍晚才 crash)
+REPLAY_EXTRA_FRAMES = 60
+
+
+@dataclass
+class CrashRepro:
+    """
+    A minimal input sequence that deterministically reproduces a fuzz crash:
+    the original game code (no monkey bot) replayed in the harness with this seed and these actions.
+    """
+    seed: int
+    actions: list
+    frames: int
+    crash_site: dict
+    original_length: int = 0
+    runs: int = 0  # Harness runs used by the minimization
+    message: str = ""
+
+    def describe(self) -> str:
+        site = self.crash_site or {}
+        lines = [f"Minimal reproduction (seed={self.seed}, {len(self.actions)} of {self.original_length} inputs, "
+                 f"{site.get('exception', 'crash')} at line {site.get('line', '?')}: `{site.get('source', '')}`):"]
+        lines += [f"  frame {action['frame']}: {describe_action(action)}" for action in self.actions]
+        if not self.actions:
+            lines.append("  (no input needed: the game crashes on its own)")
+        return "\n".join(lines)
+
+
+def describe_action(action: dict) -> str:
+    if "post" in action:
+        attrs = action.get("attrs", {})
+        if "key_name" in action:
+            return f"{action['post']} {action['key_name']}"
+        if "pos" in attrs:
+            return f"{action['post']} pos={tuple(attrs['pos'])} button={attrs.get('button', '-')}"
+        return action["post"]
+    if "key" in action:
+        return f"press {action['key']} for {action.get('hold', 1)} frame(s)"
+    if "click" in action:
+        return f"click {tuple(action['click'])}"
+    return str(action)
+
+
+def same_crash(site: dict | None, expected: dict | None) -> bool:
+    """
+    Same exception type at the same source line (line numbers shift between injected and original code).
+    """
+    if not site or not expected:
+        return False
+    return site.get("exception") == expected.get("exception") and site.get("source") == expected.get("source")
+
+
+def ddmin(items: list, test_many: Callable[[list[list]], list[bool]], max_tests: int) -> list:
+    """
+    Zeller's delta debugging: the smallest subsequence (1-minimal within the budget) for which the test still fails.
+    test_many runs one test per candidate (concurrently) and returns True where the failure is reproduced.
+    :param items: A failing input sequence
+    :type items: list
+
+    :param max_tests: Budget of tests; the best sequence found so far is returned when it is used up
+    :type max_tests: int
+
+    :rtype: list
+    """
+    granularity = 2
+    tests = 0
+
+    def run(candidates: list[list]) -> list[bool]:
+        # 每一次測試前都檢查預算: 超出預算的候選不執行 (視為未重現)
+        nonlocal tests
+        candidates = candidates[:max(0, max_tests - tests)]
+        tests += len(candidates)
+        return test_many(candidates) if candidates else []
+
+    while len(items) >= 2 and tests < max_tests:
+        size = math.ceil(len(items) / granularity)
+        subsets = [items[i:i + size] for i in range(0, len(items), size)]
+
+        results = run(subsets)
+        if any(results):
+            items = subsets[results.index(True)]
+            granularity = 2
+            continue
+
+        if granularity > 2 and tests < max_tests:
+            complements = [[item for j, subset in enumerate(subsets) if j != i for item in subset]
+                           for i in range(len(subsets))]
+            results = run(complements)
+            if any(results):
+                items = complements[results.index(True)]
+                granularity = max(granularity - 1, 2)
+                continue
+
+        if granularity >= len(items):
+            break
+        granularity = min(len(items), granularity * 2)
+
+    if len(items) == 1 and any(run([[]])):
+        return []
+    return items
+
+
+class _Replayer:
+    """
+    Replays action sequences of one crash on a FuzzPool (original code, fixed seed and frame budget).
+    """
+
+    def __init__(self, file_path: str, seed: int, frames: int, crash_site: dict | None, deadline: float):
+        with open(file_path, "r", encoding="utf-8") as f:
+            code = f.read()
+        env = os.environ.copy()
+        env["SDL_AUDIODRIVER"] = "dummy"
+        env["SDL_VIDEODRIVER"] = "dummy"
+        self.pool = FuzzPool(file_path, code, frames, env)
+        self.seed = seed
+        self.crash_site = crash_site
+        self.deadline = deadline
+        self.runs = 0
+        self.last_message = ""
+
+    def run_many(self, candidates: list[list]) -> list[bool]:
+        """
+        :return: For every candidate, whether it reproduces the crash (False once the deadline passed)
+        """
+        reproduced = [False] * len(candidates)
+        pending = list(enumerate(candidates))
+        while (pending or self.pool.running) and time.monotonic() < self.deadline:
+            while pending and self.pool.has_capacity():
+                index, actions = pending.pop(0)
+                self.pool.launch(self.seed, tag=index, actions=actions)
+                self.runs += 1
+            for index, passed, message, result in self.pool.finished():
+                site = (result or {}).get("crash_site")
+                if not passed and (self.crash_site is None or same_crash(site, self.crash_site)):
+                    reproduced[index] = True
+                    self.last_message = message
+            self.pool.wait_interval()
+        self.pool.cancel_all()
+        return reproduced
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+def minimize_crash(file_path: str, report: FuzzReport, max_runs: int | None = None,
+                   duration: float | None = None) -> CrashRepro | None:
+    """
+    Delta-debug the input sequence of a crashed fuzz run down to a minimal reproducing sequence.
+    The full sequence is replayed first (original code, same seed); when it does not reproduce the same crash
+    (e.g. the crash depended on something the trace does not capture) None is returned.
+    :param report: A failed FuzzReport with actions, seed, crash_frame and crash_site
+    :type report: FuzzReport
+
+    :rtype: CrashRepro | None
+    """
+    if report.passed or report.actions is None or report.seed is None or not report.crash_site:
+        return None
+
+    max_runs = max_runs or config.FUZZER_MINIMIZE_MAX_RUNS
+    duration = duration or config.FUZZER_MINIMIZE_TIME
+    frames = (report.crash_frame or config.FUZZER_FRAMES) + REPLAY_EXTRA_FRAMES
+    replayer = _Replayer(file_path, report.seed, frames, report.crash_site, time.monotonic() + duration)
+    try:
+        actions = list(report.actions)
+        if not replayer.run_many([actions])[0]:
+            print("[Minimizer] 輸入序列無法穩定重現 crash，略過最小化")
+            return None
+        message = replayer.last_message
+        minimal = ddmin(actions, replayer.run_many, max_runs)
+        if replayer.last_message:
+            message = replayer.last_message
+        print(f"[Minimizer] {len(actions)} -> {len(minimal)} inputs ({replayer.runs} replays)")
+        return CrashRepro(report.seed, minimal, frames, report.crash_site, len(actions), replayer.runs, message)
+    finally:
+        replayer.close()
+
+
+def replay_crash(file_path: str, repro: CrashRepro, duration: float = 30) -> tuple[bool, str]:
+    """
+    Deterministically replay a minimal reproduction against the (fixed) code.
+    :return: (whether the game still crashes, the crash message); any crash counts, not only the original one
+    :rtype: tuple[bool, str]
+    """
+    replayer = _Replayer(file_path, repro.seed, repro.frames, None, time.monotonic() + duration)
+    try:
+        crashed = replayer.run_many([repro.actions])[0]
+        return crashed, replayer.last_message
+    finally:
+        replayer.close()
@@ -0,0 +1,205 @@
+import difflib
+import re
+from dataclasses import dataclass
+
+SEARCH_REPLACE_PATTERN = re.compile(
+    r"^<{5,9} ?SEARCH[^\n]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} ?REPLACE[^\n]*$",
+    re.DOTALL | re.MULTILINE
+)
+HUNK_HEADER_PATTERN = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+
+class PatchError(Exception):
+    """
+    Raised when a patch cannot be parsed or one of its hunks cannot be located in the code.
+    """
+
+
+@dataclass
+class PatchHunk:
+    search: str
+    replace: str
+    # 1-based line hint from a unified diff header (None for SEARCH/REPLACE blocks)
+    line_hint: int | None = None
+
+
+def parse_search_replace(text: str) -> list[PatchHunk]:
+    """
+    Parse aider-style blocks:
+        <<<<<<< SEARCH
+        old lines
+        =======
+        new lines
+        >>>>>>> REPLACE
+    """
+    return [PatchHunk(search=m.group(1), replace=m.group(2)) for m in SEARCH_REPLACE_PATTERN.finditer(text)]
+
+
+def parse_unified_diff(text: str) -> list[PatchHunk]:
+    """
+    Parse the hunks of a unified diff into search/replace pairs
+    (context + removed lines -> search, context + added lines -> replace).
+    Line numbers in the headers are only used as hints, LLMs rarely get them right.
+    """
+    hunks: list[PatchHunk] = []
+    search: list[str] | None = None
+    replace: list[str] = []
+    line_hint = None
+
+    def flush() -> None:
+        if search is not None and (search or replace):
+            hunks.append(PatchHunk("".join(search), "".join(replace), line_hint))
+
+    for line in text.splitlines(keepends=True):
+        header = HUNK_HEADER_PATTERN.match(line)
+        if header:
+            flush()
+            search, replace, line_hint = [], [], int(header.group(1))
+            continue
+        if search is None or line.startswith(("---", "+++", "```")):
+            continue
+        if line.startswith("-"):
+            search.append(line[1:])
+        elif line.startswith("+"):
+            replace.append(line[1:])
+        elif line.startswith(" "):
+            search.append(line[1:])
+            replace.append(line[1:])
+        elif line.strip() == "":
+            search.append("\n")
+            replace.append("\n")
+        elif line.startswith("\\"):
+            # "\ No newline at end of file"
+            continue
+        else:
+            flush()
+            search = None
+    flush()
+    return hunks
+
+
+def parse_patch(text: str) -> list[PatchHunk]:
+    """
+    :return: The hunks of the LLM response, SEARCH/REPLACE blocks first, unified diff otherwise
+    :rtype: list[PatchHunk]
+    """
+    hunks = parse_search_replace(text)
+    if hunks:
+        return hunks
+    return parse_unified_diff(text)
+
+
+def _indent_of(lines: list[str]) -> str:
+    for line in lines:
+        if line.strip():
+            return line[:len(line) - len(line.lstrip())]
+    return ""
+
+
+def _reindent(lines: list[str], old_indent: str, new_indent: str) -> list[str]:
+    if old_indent == new_indent:
+        return lines
+    result = []
+    for line in lines:
+        if line.strip() and line.startswith(old_indent):
+            result.append(new_indent + line[len(old_indent):])
+        elif line.strip():
+            result.append(new_indent + line.lstrip())
+        else:
+            result.append(line)
+    return result
+
+
+def _find_block(code_lines: list[str], search_lines: list[str], threshold: float,
+                line_hint: int | None) -> tuple[int, int]:
+    """
+    Locate the search lines in the code: exact match, then whitespace-insensitive match,
+    then the most similar window (difflib ratio >= threshold).
+    :return: (start, end) line indexes of the matched block
+    :rtype: tuple[int, int]
+    """
+    size = len(search_lines)
+
+    def candidates(key):
+        wanted = [key(line) for line in search_lines]
+        keys = [key(line) for line in code_lines]
+        return [i for i in range(len(code_lines) - size + 1) if keys[i:i + size] == wanted]
+
+    def pick(matches: list[int]) -> int:
+        # 多處相同時以 diff header 的行號為準
+        if line_hint is None:
+            return matches[0]
+        return min(matches, key=lambda i: abs(i + 1 - line_hint))
+
+    for key in (lambda line: line.rstrip(), lambda line: line.strip()):
+        matches = candidates(key)
+        if len(matches) == 1 or (matches and line_hint is not None):
+            return pick(matches), pick(matches) + size
+        if matches:
+            raise PatchError(f"Search block matches {len(matches)} places:\n{''.join(search_lines)}")
+
+    # Fuzzy: 比對每個長度相近的區塊，取最相似者
+    stripped_search = "\n".join(line.strip() for line in search_lines)
+    best_ratio, best_span = 0.0, None
+    for window in {size, size - 1, size + 1}:
+        if window <= 0:
+            continue
+        for start in range(0, len(code_lines) - window + 1):
+            candidate = "\n".join(line.strip() for line in code_lines[start:start + window])
+            matcher = difflib.SequenceMatcher(None, stripped_search, candidate, autojunk=False)
+            if matcher.real_quick_ratio() < best_ratio or matcher.quick_ratio() < best_ratio:
+                continue
+            ratio = matcher.ratio()
+            if ratio > best_ratio:
+                best_ratio, best_span = ratio, (start, start + window)
+
+    if best_span is None or best_ratio < threshold:
+        raise PatchError(f"Search block not found (best similarity {best_ratio:.2f}):\n{''.join(search_lines)}")
+    return best_span
+
+
+def apply_hunk(code: str, hunk: PatchHunk, threshold: float = 0.85) -> str:
+    """
+    Apply one hunk with fuzzy context matching. The replacement is re-indented to the
+    indentation of the matched block.
+    """
+    if not hunk.search.strip():
+        # 空的 search 代表新增到檔案結尾
+        return code.rstrip("\n") + "\n" + hunk.replace
+
+    code_lines = code.splitlines(keepends=True)
+    if code_lines and not code_lines[-1].endswith("\n"):
+        code_lines[-1] += "\n"
+    search_lines = hunk.search.splitlines(keepends=True)
+    replace_lines = hunk.replace.splitlines(keepends=True)
+    if replace_lines and not replace_lines[-1].endswith("\n"):
+        replace_lines[-1] += "\n"
+
+    start, end = _find_block(code_lines, search_lines, threshold, hunk.line_hint)
+    replace_lines = _reindent(replace_lines, _indent_of(search_lines), _indent_of(code_lines[start:end]))
+    return "".join(code_lines[:start] + replace_lines + code_lines[end:])
+
+
+def apply_patch(code: str, patch_text: str, threshold: float = 0.85) -> str:
+    """
+    Apply every hunk of an LLM patch response (SEARCH/REPLACE blocks or a unified diff) to the code.
+    :param code: The original code
+    :type code: str
+
+    :param patch_text: The LLM response containing the patch
+    :type patch_text: str
+
+    :param threshold: Minimum difflib similarity of a fuzzy context match
+    :type threshold: float
+
+    :return: The patched code
+    :rtype: str
+
+    :raises PatchError: When no hunk is found or a hunk cannot be located
+    """
+    hunks = parse_patch(patch_text)
+    if not hunks:
+        raise PatchError("No SEARCH/REPLACE block or unified diff hunk in the response")
+    for hunk in hunks:
+        code = apply_hunk(code, hunk, threshold)
+    return code
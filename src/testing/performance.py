@@ -0,0 +1,60 @@
+from config import config
+
+
+def performance_violations(perf: dict | None) -> list[str]:
+    """
+    Compare the profile of a fuzz run (fuzz_harness.FrameProfiler.report) with the FUZZER_PERF_* budgets.
+    :return: One line per exceeded budget, with the likely cause; empty when the game is within budget
+    :rtype: list[str]
+    """
+    if not perf or not perf.get("frames_measured"):
+        return []
+
+    violations = []
+    frame_ms = perf["frame_ms"]
+    if frame_ms["p95"] > config.FUZZER_PERF_P95_FRAME_MS:
+        violations.append(f"Frame time p95 {frame_ms['p95']:.1f} ms exceeds {config.FUZZER_PERF_P95_FRAME_MS:.1f} ms "
+                          f"(effective {perf['fps']:.0f} FPS): too much work per frame "
+                          f"(nested loops over all objects, per-frame image loading / scaling / font rendering).")
+
+    fonts = perf.get("fonts_created_in_game", 0)
+    if fonts > config.FUZZER_PERF_MAX_FONTS:
+        per_frame = fonts / perf["frames_measured"]
+        violations.append(f"pygame.font.Font / SysFont was created {fonts} times during gameplay "
+                          f"({per_frame:.2f} per frame): create fonts once at start-up and reuse them "
+                          f"(or use game_runtime.get_font / draw_text).")
+
+    sprites = perf["sprites"]
+    if sprites["max"] > config.FUZZER_PERF_MAX_SPRITES:
+        violations.append(f"{sprites['max']} live sprites (started with {sprites['start']}, "
+                          f"{perf['grouped_sprites_max']} in groups at most): sprites that leave the screen or "
+                          f"are destroyed are never removed (call sprite.kill() / remove them from their lists).")
+
+    growth_mb = perf["memory_growth_kb"] / 1024
+    if growth_mb > config.FUZZER_PERF_MAX_MEMORY_GROWTH_MB:
+        violations.append(f"Memory grew by {growth_mb:.1f} MB during gameplay "
+                          f"(budget {config.FUZZER_PERF_MAX_MEMORY_GROWTH_MB} MB): lists / dicts / surfaces "
+                          f"that only ever grow.")
+    return violations
+
+
+def format_performance(perf: dict | None) -> str:
+    """
+    A one-line summary of a profile, e.g. for the SSE log.
+    """
+    if not perf or not perf.get("frames_measured"):
+        return ""
+    frame_ms = perf["frame_ms"]
+    return (f"{perf['fps']:.0f} FPS, frame p50/p95/p99/max {frame_ms['p50']:.1f}/{frame_ms['p95']:.1f}/"
+            f"{frame_ms['p99']:.1f}/{frame_ms['max']:.1f} ms, memory +{perf['memory_growth_kb'] / 1024:.1f} MB, "
+            f"sprites {perf['sprites']['start']}->{perf['sprites']['end']} (max {perf['sprites']['max']}), "
+            f"fonts created in game {perf.get('fonts_created_in_game', 0)}")
+
+
+def performance_report(perf: dict, violations: list[str]) -> str:
+    """
+    The compact report handed to run_fix as a "performance" bug.
+    """
+    lines = [f"Performance budget exceeded ({format_performance(perf)}):"]
+    lines += [f"- {violation}" for violation in violations]
+    return "\n".join(lines)
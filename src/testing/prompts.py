@@ -38,6 +38,11 @@ Analyze the following code for LOGIC ERRORS. Do NOT hallucinate checks that aren
 【CODE】:
 {code}
 
+【NOTE】:
+If the code subclasses `Game` from `game_runtime`, the runtime already provides the game loop, `pygame.display.flip()`,
+the clock, the START/PLAYING/GAME_OVER screens and restart. Do NOT report them as missing.
+`grid_get(grid, r, c)` is a None-safe grid access.
+
 【CHECKLIST】:
 1. **Grid Safety (CRITICAL)**:
    - Search for `grid[x][y].value` or `cell.attr`. 
@@ -78,4 +83,64 @@ The code has logical issues (e.g., crashes on empty cells, objects not moving).
    - Ensure `update()` updates position.
    - Ensure Mouse Drag calculates vector correctly.
 3. Output the FULL corrected code in ```python ... ``` block.
-"""
\ No newline at end of file
+"""
+
+# Patch Fixer Prompt (FIXER_MODE=patch): 只輸出需要修改的區塊，而不是整份程式碼
+PATCH_FIXER_PROMPT = """
+You are a Python Expert fixing a Pygame script.
+
+【CODE】:
+```python
+{code}
+```
+
+【ERROR MESSAGE】:
+{error}
+
+【GDD】:
+{gdd}
+
+【TASK】:
+1. Find the root cause of the error.
+   - NoneType attribute errors: add an `if ... is not None` check, do NOT just try/except.
+   - TypeError ... missing argument in update(): define `def update(self, *args):`.
+2. Output ONLY the changes as one or more SEARCH/REPLACE blocks:
+
+<<<<<<< SEARCH
+(exact lines copied from the CODE, with a few unchanged lines of context)
+=======
+(the corrected lines)
+>>>>>>> REPLACE
+
+RULES:
+- The SEARCH part must match the current code exactly, including indentation.
+- Keep every block small; use several blocks for changes in different places.
+- Do NOT output the full file.
+"""
+
+# Performance Fixer Prompt (fuzz 時的效能量測超出預算)
+PERFORMANCE_FIXER_PROMPT = """
+You are a Python Game Developer optimizing a Pygame script.
+The game runs without crashing, but profiling during an automated play session exceeded the performance budget
+(the game must hold 60 FPS).
+
+【PERFORMANCE REPORT】
+{error}
+
+【GDD】
+{gdd}
+
+【CODE】:
+{code}
+
+【TASK】:
+1. Fix every problem in the report, keeping the gameplay exactly the same:
+   - **Fonts created per frame**: create each `pygame.font.Font` / `SysFont` ONCE (at start-up or in `__init__`)
+     and reuse it. With game_runtime use `get_font(size)` / `draw_text(...)`.
+   - **Sprites never removed**: call `sprite.kill()` when a sprite leaves the screen or is destroyed,
+     and remove it from any plain Python lists.
+   - **Memory growth**: lists / dicts / surfaces that only grow; cap or clear them.
+   - **Slow frames**: load / scale images once, avoid nested loops over every object each frame,
+     use `pygame.sprite.spritecollide` / `groupcollide` instead of manual O(n^2) checks.
+2. Output the FULL corrected code in ```python ... ``` block.
+"""
@@ -0,0 +1,323 @@
+import ast
+import builtins
+import difflib
+import importlib
+import os
+from dataclasses import dataclass
+
+# 常用但容易忘記 import 的模組
+COMMON_MODULES = ("pygame", "random", "math", "sys", "os", "time", "json", "subprocess", "pymunk")
+
+MODULE_DUNDERS = {"__name__", "__file__", "__doc__", "__builtins__", "__spec__", "__loader__", "__package__"}
+
+# 這些 base class 的子類別會被 Group.update(*args) 呼叫 (SafeSprite 已自帶保護)
+SPRITE_BASES = ("Sprite", "DirtySprite")
+# pygame.sprite 的 Group 類別: 只有對這些物件 (或已知的 sprite) 呼叫 .update(...) 才會轉給 Sprite.update
+GROUP_CLASSES = ("Group", "RenderPlain", "RenderClear", "RenderUpdates", "OrderedUpdates", "LayeredUpdates",
+                 "LayeredDirty", "GroupSingle")
+
+EXIT_CALLS = ("sys.exit", "exit", "quit", "os._exit")
+
+
+@dataclass
+class Diagnostic:
+    rule: str
+    line: int
+    message: str
+    severity: str = "error"  # error, warning
+    col: int = 0
+
+    def format(self) -> str:
+        return f"line {self.line}: [{self.rule}] {self.message}"
+
+
+def _load_module(name: str):
+    """
+    Import a module for attribute checks (e.g. pygame), or None when it is not installed here.
+    """
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    try:
+        return importlib.import_module(name)
+    except Exception:
+        return None
+
+
+def _dotted_name(node: ast.AST) -> str | None:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+class _Analyzer:
+    def __init__(self, tree: ast.Module):
+        self.tree = tree
+        self.diagnostics: list[Diagnostic] = []
+        self.bound: set[str] = set(dir(builtins)) | MODULE_DUNDERS
+        self.module_aliases: dict[str, str] = {}  # local name -> imported module
+        self.imported_modules: set[str] = set()  # import pygame.midi -> "pygame", "pygame.midi"
+        self.unresolved_star_import = False
+
+    def report(self, rule: str, node: ast.AST, message: str, severity: str = "error") -> None:
+        self.diagnostics.append(Diagnostic(rule, getattr(node, "lineno", 0), message, severity,
+                                           getattr(node, "col_offset", 0)))
+
+    # --- Bindings ---
+    def collect_bindings(self) -> None:
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+                self.bound.add(node.id)
+            elif isinstance(node, ast.arg):
+                self.bound.add(node.arg)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.bound.add(node.name)
+            elif isinstance(node, ast.ExceptHandler) and node.name:
+                self.bound.add(node.name)
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                self.bound.update(node.names)
+            elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+                self.bound.add(node.name)
+            elif isinstance(node, ast.MatchMapping) and node.rest:
+                self.bound.add(node.rest)
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    local = alias.asname or alias.name.split(".")[0]
+                    self.bound.add(local)
+                    parts = alias.name.split(".")
+                    self.imported_modules.update(".".join(parts[:i]) for i in range(1, len(parts) + 1))
+                    self.module_aliases[local] = alias.name if alias.asname else alias.name.split(".")[0]
+            elif isinstance(node, ast.ImportFrom):
+                for alias in node.names:
+                    if alias.name == "*":
+                        self._bind_star_import(node.module)
+                        continue
+                    self.bound.add(alias.asname or alias.name)
+                    if node.module:
+                        self.module_aliases.setdefault(alias.asname or alias.name, f"{node.module}.{alias.name}")
+
+    def _bind_star_import(self, module_name: str | None) -> None:
+        module = _load_module(module_name) if module_name else None
+        if module is None:
+            # 無法得知 import * 帶入了哪些名稱，關閉 undefined-name 規則
+            self.unresolved_star_import = True
+            return
+        names = getattr(module, "__all__", None) or [n for n in dir(module) if not n.startswith("_")]
+        self.bound.update(names)
+
+    # --- Rules ---
+    def check_undefined_names(self) -> None:
+        if self.unresolved_star_import:
+            return
+        seen: set[str] = set()
+        for node in ast.walk(self.tree):
+            if not isinstance(node, ast.Name) or not isinstance(node.ctx, ast.Load):
+                continue
+            if node.id in self.bound or node.id in seen:
+                continue
+            seen.add(node.id)
+            if node.id in COMMON_MODULES:
+                self.report("missing-import", node, f"Module '{node.id}' is used but never imported "
+                                                    f"(add `import {node.id}`)")
+                continue
+            suggestion = difflib.get_close_matches(node.id, self.bound, n=1, cutoff=0.8)
+            hint = f" (did you mean '{suggestion[0]}'?)" if suggestion else ""
+            self.report("undefined-name", node, f"Name '{node.id}' is not defined{hint}")
+
+    def check_module_attributes(self) -> None:
+        """
+        Misspelled attributes of imported modules, e.g. pygame.K_SPACEBAR or pygame.draw.rectangle.
+        Only modules importable in this process are checked.
+        """
+        cache: dict[str, object] = {}
+        reported: set[tuple[str, int]] = set()  # (attribute path, line): pygame.midi.init 與 pygame.midi 只報一次
+        for node in ast.walk(self.tree):
+            if not isinstance(node, ast.Attribute) or not isinstance(node.ctx, ast.Load):
+                continue
+            dotted = _dotted_name(node)
+            if dotted is None:
+                continue
+            root, *attrs = dotted.split(".")
+            module_name = self.module_aliases.get(root)
+            if module_name is None or module_name.split(".")[0] not in COMMON_MODULES:
+                continue
+            if module_name not in cache:
+                cache[module_name] = _resolve(module_name)
+            obj = cache[module_name]
+            path = root
+            module_path = module_name
+            for attr in attrs:
+                if obj is None or not _is_module(obj):
+                    break
+                if not hasattr(obj, attr) and f"{module_path}.{attr}" in self.imported_modules:
+                    # 明確 import 的子模組 (import pygame.midi): 父模組在這裡可能還沒有這個屬性
+                    obj = _load_module(f"{module_path}.{attr}")
+                elif not hasattr(obj, attr):
+                    key = (f"{path}.{attr}", node.lineno)
+                    if key not in reported:
+                        reported.add(key)
+                        candidates = [n for n in dir(obj) if not n.startswith("__")]
+                        suggestion = difflib.get_close_matches(attr, candidates, n=1, cutoff=0.7)
+                        hint = f" (did you mean '{path}.{suggestion[0]}'?)" if suggestion else ""
+                        self.report("unknown-attribute", node, f"'{path}' has no attribute '{attr}'{hint}")
+                    break
+                else:
+                    obj = getattr(obj, attr)
+                path = f"{path}.{attr}"
+                module_path = f"{module_path}.{attr}"
+
+    def check_update_signatures(self) -> None:
+        """
+        Sprite subclasses whose update() cannot take the arguments passed by .update(...) calls on sprite groups
+        (or on sprites) of the code. Calls on anything else (dict.update, pygame.display.update, ...) are ignored.
+        """
+        sprite_classes = {node.name for node in ast.walk(self.tree)
+                          if isinstance(node, ast.ClassDef) and _base_names(node) & set(SPRITE_BASES)}
+        group_classes = set(GROUP_CLASSES) | {node.name for node in ast.walk(self.tree)
+                                              if isinstance(node, ast.ClassDef) and _base_names(node) & set(GROUP_CLASSES)}
+
+        # 被指定為 Group / sprite 實例的名稱 (all_sprites = pygame.sprite.Group(), self.player = Player(...))
+        receivers: set[str] = set()
+        for node in ast.walk(self.tree):
+            if isinstance(node, (ast.Assign, ast.AnnAssign)) and isinstance(node.value, ast.Call):
+                created = (_dotted_name(node.value.func) or "").split(".")[-1]
+                if created in group_classes or created in sprite_classes:
+                    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                    receivers.update(_receiver_name(target) for target in targets)
+        receivers.discard(None)
+
+        max_args = 0
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "update" \
+                    and _receiver_name(node.func.value) in receivers:
+                if any(isinstance(arg, ast.Starred) for arg in node.args):
+                    max_args = max(max_args, 99)
+                else:
+                    max_args = max(max_args, len(node.args))
+        if max_args == 0:
+            return
+
+        for node in ast.walk(self.tree):
+            if not isinstance(node, ast.ClassDef) or node.name not in sprite_classes:
+                continue
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name == "update":
+                    if item.args.vararg is not None:
+                        continue
+                    accepted = len(item.args.posonlyargs) + len(item.args.args) - 1
+                    if accepted < max_args:
+                        self.report("update-signature", item,
+                                    f"{node.name}.update() accepts {accepted} argument(s) but update() is called "
+                                    f"with {max_args if max_args < 99 else 'variadic'} argument(s); "
+                                    f"define `def update(self, *args):`")
+
+    def check_unreachable(self) -> None:
+        """
+        Statements after return / raise / break / continue / sys.exit() in the same block, and a main() that is never called.
+        A game loop (while) that can never be reached is an error, other dead code a warning.
+        """
+        for node in ast.walk(self.tree):
+            for field in ("body", "orelse", "finalbody"):
+                block = getattr(node, field, None)
+                if not isinstance(block, list):
+                    continue
+                for index, statement in enumerate(block[:-1]):
+                    if _terminates(statement):
+                        dead = block[index + 1:]
+                        has_loop = any(isinstance(n, ast.While) for stmt in dead for n in ast.walk(stmt))
+                        self.report("unreachable-code", dead[0],
+                                    "The game loop is unreachable (it follows "
+                                    f"line {statement.lineno} which always exits)" if has_loop else
+                                    f"Unreachable code after line {statement.lineno}",
+                                    "error" if has_loop else "warning")
+                        break
+
+        top_level_functions = {n.name for n in self.tree.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))}
+        entry = "main" if "main" in top_level_functions else None
+        if entry is None:
+            return
+        called = any(isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id == entry
+                     for n in ast.walk(self.tree))
+        referenced = any(isinstance(n, ast.Name) and n.id == entry and isinstance(n.ctx, ast.Load)
+                         for n in ast.walk(self.tree))
+        if not called and not referenced:
+            main_def = next(n for n in self.tree.body if getattr(n, "name", None) == entry)
+            self.report("unreachable-main", main_def,
+                        "main() is defined but never called (add `if __name__ == \"__main__\": main()`)")
+
+
+def _resolve(module_name: str):
+    module = _load_module(module_name)
+    if module is not None:
+        return module
+    # "pygame.sprite.Sprite" 之類的 from-import: 解析到父模組的屬性
+    parent, _, attr = module_name.rpartition(".")
+    if not parent:
+        return None
+    parent_module = _load_module(parent)
+    return getattr(parent_module, attr, None) if parent_module is not None else None
+
+
+def _base_names(node: ast.ClassDef) -> set[str]:
+    return {(_dotted_name(base) or "").split(".")[-1] for base in node.bases}
+
+
+def _receiver_name(node: ast.AST) -> str | None:
+    """
+    all_sprites / self.all_sprites / game.all_sprites -> "all_sprites"
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _is_module(obj) -> bool:
+    return type(obj).__name__ == "module"
+
+
+def _terminates(statement: ast.stmt) -> bool:
+    if isinstance(statement, (ast.Return, ast.Raise, ast.Break, ast.Continue)):
+        return True
+    if isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Call):
+        return _dotted_name(statement.value.func) in EXIT_CALLS
+    return False
+
+
+def analyze_code(code: str) -> list[Diagnostic]:
+    """
+    Run every static rule on the code (milliseconds, no LLM, no subprocess):
+    undefined-name, missing-import, unknown-attribute (e.g. misspelled pygame constants),
+    update-signature, unreachable-code and unreachable-main.
+    A syntax error is returned as a single "syntax" diagnostic.
+    :param code: The game source code
+    :type code: str
+
+    :return: The findings, sorted by line
+    :rtype: list[Diagnostic]
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return [Diagnostic("syntax", e.lineno or 0, str(e.msg), "error", e.offset or 0)]
+
+    analyzer = _Analyzer(tree)
+    analyzer.collect_bindings()
+    analyzer.check_undefined_names()
+    analyzer.check_module_attributes()
+    analyzer.check_update_signatures()
+    analyzer.check_unreachable()
+    return sorted(analyzer.diagnostics, key=lambda d: (d.line, d.col))
+
+
+def analyze_file(file_path: str) -> list[Diagnostic]:
+    with open(file_path, "r", encoding="utf-8") as f:
+        return analyze_code(f.read())
+
+
+def format_diagnostics(diagnostics: list[Diagnostic]) -> str:
+    return "\n".join(d.format() for d in diagnostics)
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Optional
+
+from config import config
+from src.testing.fuzzer import get_dynamic_fuzz_logic
+
+
+@dataclass
+class VerificationResult:
+    check: str  # syntax, logic_review, fuzz:<FUZZER_MODE>
+    passed: bool
+    message: str
+    seed: Optional[int] = None
+    duration: float = 0.0
+    created_at: float = 0.0
+
+
+# 影響 fuzz / 效能結果的設定: 改變任何一個都要重新驗證
+FUZZ_SETTINGS = ("FUZZER_HEADLESS", "FUZZER_MODE", "FUZZER_FRAMES", "FUZZER_INSTANCES", "FUZZER_COVERAGE_RUNS",
+                 "FUZZER_COVERAGE_FRAMES", "FUZZER_PROFILE", "FUZZER_PERF_P95_FRAME_MS", "FUZZER_PERF_MAX_FONTS",
+                 "FUZZER_PERF_MAX_SPRITES", "FUZZER_PERF_MAX_MEMORY_GROWTH_MB", "FUZZER_RUNNING_TIME")
+HARNESS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fuzz_harness.py")
+
+
+def verification_key(file_path: str) -> str:
+    """
+    SHA-256 of every input a verification result depends on: the game code, the fuzz logic the fuzzer would
+    use for it, the game_runtime copy next to it (when there is one), the fuzz harness and the fuzz settings
+    (frame budget, seed count, performance budgets, ...).
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        digest.update(f.read())
+    digest.update(b"\0")
+    digest.update(get_dynamic_fuzz_logic(file_path).encode("utf-8"))
+    for path in (os.path.join(os.path.dirname(file_path), "game_runtime.py"), HARNESS_PATH):
+        digest.update(b"\0")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    digest.update(b"\0")
+    digest.update(json.dumps({name: getattr(config, name, None) for name in FUZZ_SETTINGS},
+                             sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class VerificationCache:
+    """
+    Persistent memo of run_fix_loop verifications (SQLite, WAL, shared by every worker):
+    (code hash, check) -> verdict, message, fuzz seed and duration.
+    Unchanged code never pays for the same LLM review or fuzz run twice, also across /fix_stream reconnects.
+    Results older than ttl seconds are misses (ttl <= 0 disables expiry); beyond max_entries the oldest are removed.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: int = 0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT NOT NULL, check_name TEXT NOT NULL, passed INTEGER NOT NULL, message TEXT NOT NULL, "
+                "seed INTEGER, duration REAL NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (key, check_name))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_created ON results(created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def get(self, key: str, check: str) -> VerificationResult | None:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT passed, message, seed, duration, created_at FROM results WHERE key = ? AND check_name = ?",
+                (key, check)
+            ).fetchone()
+        if row is not None and self.ttl > 0 and time.time() - row[4] > self.ttl:
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            return None
+        return VerificationResult(check, bool(row[0]), row[1], row[2], row[3], row[4])
+
+    def put(self, key: str, result: VerificationResult) -> None:
+        """
+        Store a result and remove the expired ones and the oldest ones over max_entries.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO results(key, check_name, passed, message, seed, duration, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, result.check, int(result.passed), result.message, result.seed, result.duration, now)
+            )
+            if self.ttl > 0:
+                conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl,))
+            if self.max_entries > 0:
+                conn.execute(
+                    "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY created_at DESC "
+                    "LIMIT -1 OFFSET ?)", (self.max_entries,)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            # BEGIN 本身失敗 (例如 database is locked) 時沒有交易可以 ROLLBACK，不要蓋掉原本的錯誤
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def clear(self) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM results")
+
+
+_verification_cache: VerificationCache | None = None
+_verification_cache_lock = threading.Lock()
+
+
+def get_verification_cache() -> VerificationCache | None:
+    """
+    Return the process-wide verification cache, or None when VERIFY_CACHE_ENABLED is off.
+    """
+    global _verification_cache
+    if not config.VERIFY_CACHE_ENABLED:
+        return None
+    with _verification_cache_lock:
+        if _verification_cache is None:
+            _verification_cache = VerificationCache(config.VERIFY_CACHE_PATH, config.VERIFY_CACHE_MAX_ENTRIES,
+                                                    config.VERIFY_CACHE_TTL)
+        return _verification_cache
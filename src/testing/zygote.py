@@ -0,0 +1,326 @@
+"""
+Fork server ("zygote") for fuzz runs.
+
+A long-lived process that has already imported Python, pygame, pymunk and the fuzz harness with the dummy
+SDL drivers selected. Every fuzz job connects over a Unix socket, sends the injected game source as one JSON
+line and the zygote forks a child that runs it in the harness: no interpreter start-up, no pygame import,
+no temp file. The connection then carries:
+    PID_MARKER<pid>          sent by the zygote right after the fork (used to kill the job)
+    ... child stdout/stderr ...
+    EXIT_MARKER<exit code>   sent by the zygote once the child has been reaped
+
+Server side: run as a script (python zygote.py <socket path>), standard library imports only at module level.
+Client side: Zygote / ZygoteRun, used by the fuzzer when FUZZER_ZYGOTE is enabled.
+"""
+import json
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+PID_MARKER = "__ZYGOTE_PID__"
+EXIT_MARKER = "__ZYGOTE_EXIT__"
+READY_LINE = "ZYGOTE_READY"
+ZYGOTE_PATH = os.path.abspath(__file__)
+PRELOAD_MODULES = ("pygame", "pymunk")
+# 超過這個時間仍未送完 request 的連線會被關閉 (秒)
+REQUEST_TIMEOUT = 30.0
+
+
+# --- Server ---
+def serve(socket_path: str) -> None:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+    sys.path.insert(0, os.path.dirname(ZYGOTE_PATH))
+    import fuzz_harness  # noqa: F401  (preloaded for the children)
+    for name in PRELOAD_MODULES:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(64)
+    listener.setblocking(False)
+
+    parent_pid = os.getppid()
+    children: dict = {}  # pid -> connection
+    pending: dict = {}  # connection -> [received bytes, accepted at]
+    print(READY_LINE, flush=True)
+
+    try:
+        # 單執行緒 select 迴圈: fork 時不會有其他執行緒持有鎖。
+        # 連線與 listener 都是 non-blocking，收到完整的一行 request 才 fork，慢的 client 不會擋住其他工作
+        while os.getppid() == parent_pid:
+            readable, _, _ = select.select([listener, *pending], [], [], 0.01)
+            for sock in readable:
+                if sock is listener:
+                    _accept(listener, pending)
+                    continue
+                request = _read_request(sock, pending)
+                if request is None:
+                    continue
+                pid = os.fork()
+                if pid == 0:
+                    listener.close()
+                    for other in [*children.values(), *pending]:
+                        other.close()
+                    _run_child(sock, request, fuzz_harness)
+                try:
+                    sock.sendall(f"{PID_MARKER}{pid}\n".encode("utf-8"))
+                except OSError:
+                    pass
+                children[pid] = sock
+            _drop_stalled(pending)
+            _reap(children)
+    finally:
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+        for conn in pending:
+            conn.close()
+        listener.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def _accept(listener: socket.socket, pending: dict) -> None:
+    try:
+        conn, _ = listener.accept()
+    except (BlockingIOError, InterruptedError):
+        return
+    conn.setblocking(False)
+    pending[conn] = [b"", time.monotonic()]
+
+
+def _read_request(conn: socket.socket, pending: dict) -> dict | None:
+    """
+    Read what has arrived on a pending connection (never blocks).
+    :return: The request once its whole line has arrived, None while it is incomplete or when it was invalid
+    """
+    try:
+        chunk = conn.recv(65536)
+    except (BlockingIOError, InterruptedError):
+        return None
+    except OSError:
+        chunk = b""
+    if not chunk:
+        pending.pop(conn, None)
+        conn.close()
+        return None
+
+    entry = pending[conn]
+    entry[0] += chunk
+    if b"\n" not in entry[0]:
+        return None
+    del pending[conn]
+    try:
+        request = json.loads(entry[0].split(b"\n", 1)[0].decode("utf-8"))
+    except ValueError:
+        conn.close()
+        return None
+    # 子行程把連線當成 stdout / stderr 使用
+    conn.setblocking(True)
+    return request
+
+
+def _drop_stalled(pending: dict) -> None:
+    now = time.monotonic()
+    for conn, (_, accepted_at) in list(pending.items()):
+        if now - accepted_at > REQUEST_TIMEOUT:
+            del pending[conn]
+            conn.close()
+
+
+def _reap(children: dict) -> None:
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        conn = children.pop(pid, None)
+        if conn is None:
+            continue
+        try:
+            conn.sendall(f"\n{EXIT_MARKER}{os.waitstatus_to_exitcode(status)}\n".encode("utf-8"))
+        except OSError:
+            pass
+        conn.close()
+
+
+def _run_child(conn: socket.socket, request: dict, fuzz_harness) -> None:
+    try:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(conn.fileno(), 1)
+        os.dup2(conn.fileno(), 2)
+        conn.close()
+        fuzz_harness.run(request["path"], int(request["frames"]), int(request["seed"]), code=request["code"],
+                         actions=request.get("actions"), coverage=bool(request.get("coverage")),
+                         profile=bool(request.get("profile")))
+    finally:
+        os._exit(1)
+
+
+# --- Client ---
+class ZygoteRun:
+    """
+    One fuzz job forked by the zygote, with the same poll / kill interface as a subprocess.
+    """
+
+    def __init__(self, conn: socket.socket):
+        self.conn = conn
+        self.conn.setblocking(False)
+        self.buffer = b""
+        self.pid = None
+        self.returncode = None
+
+    def _read(self) -> bool:
+        """
+        :return: True once the zygote closed the connection
+        """
+        while True:
+            try:
+                chunk = self.conn.recv(65536)
+            except BlockingIOError:
+                return False
+            except OSError:
+                return True
+            if not chunk:
+                return True
+            self.buffer += chunk
+            if self.pid is None:
+                text = self.buffer.decode("utf-8", errors="replace")
+                if PID_MARKER in text:
+                    line = text.split(PID_MARKER, 1)[1].split("\n", 1)[0]
+                    if line.strip().isdigit():
+                        self.pid = int(line)
+
+    def poll(self) -> int | None:
+        if self.returncode is not None:
+            return self.returncode
+        if not self._read():
+            return None
+        self.conn.close()
+        text = self.buffer.decode("utf-8", errors="replace")
+        code = text.rsplit(EXIT_MARKER, 1)[1].split("\n", 1)[0].strip() if EXIT_MARKER in text else ""
+        self.returncode = int(code) if code.lstrip("-").isdigit() else -1
+        return self.returncode
+
+    def wait(self, timeout: float = 5.0) -> int | None:
+        deadline = time.monotonic() + timeout
+        while self.poll() is None and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return self.returncode
+
+    def kill(self) -> None:
+        if self.pid is None:
+            self._read()
+        if self.pid is not None and self.returncode is None:
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    def result(self) -> tuple[str, str]:
+        # stdout 與 stderr 在同一條連線上 (合併輸出)
+        text = self.output()
+        return text, text
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def output(self) -> str:
+        text = self.buffer.decode("utf-8", errors="replace")
+        lines = [line for line in text.split("\n") if not line.startswith((PID_MARKER, EXIT_MARKER))]
+        return "\n".join(lines)
+
+
+class Zygote:
+    """
+    Handle of a zygote server process owned by this process (started lazily, stopped at exit).
+    """
+
+    def __init__(self, socket_path: str, startup_timeout: float = 30.0):
+        self.socket_path = socket_path
+        env = os.environ.copy()
+        env["SDL_VIDEODRIVER"] = "dummy"
+        env["SDL_AUDIODRIVER"] = "dummy"
+        self.process = subprocess.Popen([sys.executable, ZYGOTE_PATH, socket_path], stdout=subprocess.PIPE,
+                                        stdin=subprocess.DEVNULL, text=True, env=env)
+        ready, _, _ = select.select([self.process.stdout], [], [], startup_timeout)
+        if not ready or self.process.stdout.readline().strip() != READY_LINE:
+            self.stop()
+            raise RuntimeError("Zygote did not start")
+
+    def alive(self) -> bool:
+        return self.process.poll() is None and os.path.exists(self.socket_path)
+
+    def spawn(self, game_path: str, code: str, frames: int, seed: int, actions: list | None = None,
+              coverage: bool = False, profile: bool = False) -> ZygoteRun:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(self.socket_path)
+        request = {"path": game_path, "code": code, "frames": frames, "seed": seed, "actions": actions,
+                   "coverage": coverage, "profile": profile}
+        conn.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        return ZygoteRun(conn)
+
+    def stop(self) -> None:
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def supported() -> bool:
+    return hasattr(os, "fork") and hasattr(socket, "AF_UNIX")
+
+
+_zygote: Zygote | None = None
+_zygote_failed = False
+_zygote_lock = threading.Lock()
+
+
+def get_zygote(socket_path: str) -> Zygote | None:
+    """
+    The process-wide zygote, started on first use. None when fork / Unix sockets are unavailable
+    or the zygote failed to start (callers fall back to one subprocess per run).
+    """
+    global _zygote, _zygote_failed
+    if not supported():
+        return None
+    with _zygote_lock:
+        if _zygote is not None and not _zygote.alive():
+            _zygote.stop()
+            _zygote = None
+        if _zygote is None and not _zygote_failed:
+            try:
+                _zygote = Zygote(socket_path)
+                import atexit
+                atexit.register(_zygote.stop)
+            except (OSError, RuntimeError) as e:
+                print(f"[Fuzzer] Zygote unavailable, using subprocesses: {e}")
+                _zygote_failed = True
+        return _zygote
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1])
@@ -1,7 +1,42 @@
-import openai
+import asyncio
+import json
+import queue
+import threading
+import time
+from typing import Any, Callable, Generator, Iterator, Optional
+
 import requests
 from config import config
-import os
+from src.llm.cache import get_response_cache, make_cache_key
+from src.llm.clients import registry
+from src.llm.hedging import HedgeCandidate, hedge_stats, hedged_race
+from src.llm.metrics import (bind_record, current_record, estimate_tokens, note_finish_reason, note_first_token,
+                             note_usage, track_llm_call)
+from src.llm.rate_limit import ProviderThrottled, get_rate_limiter, raise_if_throttled, reservation
+from src.llm.replay import REPLAY_PROVIDER, acall_replay, call_replay, record_response, replay_mode, stream_replay
+
+# call_llm 以字串回傳錯誤，這些前綴用來辨識錯誤回應 (錯誤不會被快取)
+LLM_ERROR_PREFIXES = (
+    "Error:",
+    "Gemini API Error:",
+    "Ollama Error:",
+    "LLM Call Error",
+    "Configuration Error:",
+)
+
+
+def is_llm_error(response: str | None) -> bool:
+    """
+    Whether a call_llm/acall_llm return value is one of its error strings.
+    """
+    return not response or response.startswith(LLM_ERROR_PREFIXES)
+
+
+class LLMStreamError(str):
+    """
+    The error string a stream function yields as its last chunk. Marked with its own type so that an error after
+    some tokens were already streamed is not mistaken for (and joined to) the generated text.
+    """
 
 
 def get_client_config(provider: str) -> dict | None:
@@ -35,6 +70,93 @@ def get_client_config(provider: str) -> dict | None:
     return None
 
 
+def _gemini_generation_config(temperature: float, max_tokens: int) -> dict:
+    return {
+        "temperature": temperature,
+        "top_p": 0.95,
+        "max_output_tokens": max_tokens,
+        "response_mime_type": "text/plain",
+    }
+
+
+def _note_openai_usage(response) -> None:
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        note_usage(usage.prompt_tokens, usage.completion_tokens)
+    if getattr(response, "choices", None):
+        note_finish_reason(response.choices[0].finish_reason)
+
+
+def _note_gemini_usage(response) -> None:
+    try:
+        usage = response.usage_metadata
+        note_usage(usage.prompt_token_count, usage.candidates_token_count)
+        note_finish_reason(response.candidates[0].finish_reason.name)
+    except (AttributeError, IndexError):
+        pass
+
+
+def _note_ollama_usage(result: dict) -> None:
+    note_usage(result.get("prompt_eval_count"), result.get("eval_count"))
+    note_finish_reason(result.get("done_reason"))
+
+
+def _ollama_chat_url() -> str:
+    """
+    清理 URL，確保指向原生的 /api/chat
+    """
+    base_url = config.OLLAMA_BASE_URL
+    if not base_url:
+        base_url = "http://localhost:11434"
+
+    api_url = base_url.rstrip("/")
+    # 如果原本設定包含 /v1 (為了相容 OpenAI)，要把它拿掉改成原生路徑
+    if api_url.endswith("/v1"):
+        api_url = api_url[:-3]
+    return f"{api_url}/api/chat"
+
+
+def ollama_keep_alive() -> str | int:
+    """
+    Ollama 的 keep_alive 可以是 duration 字串 ("30m") 或秒數 (-1 = 永久常駐)
+    """
+    value = str(config.OLLAMA_KEEP_ALIVE).strip()
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def ollama_num_ctx(system_prompt: str, user_prompt: str, max_tokens: int = 8192) -> int:
+    """
+    依 prompt 的 token 數 (加上輸出保留量) 挑選最小可用的 num_ctx bucket。
+    固定的 bucket 讓伺服器不會因為每次 num_ctx 不同而重新載入模型。
+    """
+    needed = estimate_tokens(system_prompt + user_prompt) + min(max_tokens, config.OLLAMA_COMPLETION_RESERVE)
+    buckets = sorted(config.OLLAMA_NUM_CTX_BUCKETS) or [8192]
+    for bucket in buckets:
+        if needed <= bucket:
+            return bucket
+    return buckets[-1]
+
+
+def _ollama_payload(system_prompt: str, user_prompt: str, model: str, temperature: float,
+                    num_ctx: int, stream: bool) -> dict:
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        "stream": stream,
+        "keep_alive": ollama_keep_alive(),
+        "options": {
+            "num_ctx": num_ctx,
+            "temperature": temperature
+        }
+    }
+
+
 def call_google_gemini(
         system_prompt: str,
         user_prompt: str,
@@ -55,28 +177,54 @@ def call_google_gemini(
         return "Error: 未設定 GOOGLE_API_KEY"
 
     try:
-        genai.configure(api_key=api_key)
+        generation_config: dict = _gemini_generation_config(temperature, max_tokens)
 
-        generation_config: dict = {
-            "temperature": temperature,
-            "top_p": 0.95,
-            "max_output_tokens": max_tokens,
-            "response_mime_type": "text/plain",
-        }
-
-        # System instructions
-        gemini_model = genai.GenerativeModel(
-            model_name=model,
-            generation_config=generation_config,
-            system_instruction=system_prompt
-        )
+        # System instructions (model is cached per system prompt)
+        gemini_model = registry.get_gemini_model(api_key, model, system_prompt)
 
-        response = gemini_model.generate_content(user_prompt)
+        response = gemini_model.generate_content(user_prompt, generation_config=generation_config)
+        _note_gemini_usage(response)
         return response.text
     except Exception as e:
+        raise_if_throttled(e, "google")
         return f"Gemini API Error: {str(e)}"
 
 
+def stream_google_gemini(
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int = 8192
+) -> Iterator[str]:
+    """
+    Gemini 的串流版本，逐段 yield 生成的文字。錯誤訊息會以最後一段文字 yield 出來。
+    """
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        yield LLMStreamError("Error: 請安裝 google-generativeai 套件 (pip install google-generativeai)")
+        return
+
+    api_key: str = config.GOOGLE_API_KEY
+    if not api_key:
+        yield LLMStreamError("Error: 未設定 GOOGLE_API_KEY")
+        return
+
+    try:
+        generation_config: dict = _gemini_generation_config(temperature, max_tokens)
+        gemini_model = registry.get_gemini_model(api_key, model, system_prompt)
+
+        response = gemini_model.generate_content(user_prompt, generation_config=generation_config, stream=True)
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+        _note_gemini_usage(response)
+    except Exception as e:
+        raise_if_throttled(e, "google")
+        yield LLMStreamError(f"Gemini API Error: {str(e)}")
+
+
 def call_ollama(
         system_prompt: str,
         user_prompt: str,
@@ -87,46 +235,21 @@ def call_ollama(
 
     print(f"Run ollama (Native API): {model}")
 
-    base_url = config.OLLAMA_BASE_URL
-    if not base_url:
-        base_url = "http://localhost:11434"
-
-    # 清理 URL，確保指向 /api/chat
-    api_url = base_url.rstrip("/")
-    # 如果原本設定包含 /v1 (為了相容 OpenAI)，要把它拿掉改成原生路徑
-    if api_url.endswith("/v1"):
-        api_url = api_url[:-3]
-    api_url = f"{api_url}/api/chat"
+    api_url = _ollama_chat_url()
 
     # 設定 Request Body
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        "stream": False,
-        "options": {
-            "num_ctx": num_ctx,
-            "temperature": temperature
-        }
-    }
+    payload = _ollama_payload(system_prompt, user_prompt, model, temperature, num_ctx, stream=False)
 
-    headers = {
-        "Content-Type": "application/json"
-    }
-
-    if config.OLLAMA_API_KEY:
-        headers["Authorization"] = f"Bearer {config.OLLAMA_API_KEY}"
+    # Session 已帶上 Content-Type 與 Authorization headers
+    session = registry.get_ollama_session(api_url, config.OLLAMA_API_KEY)
 
     response = ""
 
 
     try:
-        response = requests.post(
+        response = session.post(
             api_url,
             json=payload,
-            headers=headers,  # 帶上 headers
             timeout=300
         )
 
@@ -137,29 +260,308 @@ def call_ollama(
         response.raise_for_status()
 
         result = response.json()
+        _note_ollama_usage(result)
         return result["message"]["content"]
 
     except requests.exceptions.RequestException as e:
+        raise_if_throttled(e, "ollama")
         print(f"[Ollama Error] Connection failed: {e}")
         return f"Ollama Error: {str(e)}"
     except KeyError:
         return f"Ollama Error: Unexpected response format. {response.text}"
 
 
+def stream_ollama(
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        temperature: float,
+        num_ctx: int = 4096
+) -> Iterator[str]:
+    """
+    Ollama 原生 API 的串流版本 ("stream": True)，每一行 NDJSON 是一段 token delta。
+    """
+    print(f"Run ollama (Native API, stream): {model}")
+
+    api_url = _ollama_chat_url()
+    payload = _ollama_payload(system_prompt, user_prompt, model, temperature, num_ctx, stream=True)
+    session = registry.get_ollama_session(api_url, config.OLLAMA_API_KEY)
+
+    try:
+        with session.post(api_url, json=payload, timeout=300, stream=True) as response:
+            if response.status_code == 401:
+                yield LLMStreamError("Ollama Error: 401 Unauthorized. 請檢查 API Key 是否正確。")
+                return
+
+            response.raise_for_status()
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    yield LLMStreamError(f"Ollama Error: {chunk['error']}")
+                    return
+                delta = chunk.get("message", {}).get("content", "")
+                if delta:
+                    yield delta
+                if chunk.get("done"):
+                    _note_ollama_usage(chunk)
+                    return
+
+    except requests.exceptions.RequestException as e:
+        raise_if_throttled(e, "ollama")
+        print(f"[Ollama Error] Connection failed: {e}")
+        yield LLMStreamError(f"Ollama Error: {str(e)}")
+    except ValueError as e:
+        yield LLMStreamError(f"Ollama Error: Unexpected response format. {str(e)}")
+
+
+def warmup_ollama() -> None:
+    """
+    預先載入 OLLAMA_MODEL_NAME (以及 Ollama embedding 模型)，並用 keep_alive 讓它常駐。
+    Ollama 收到沒有 messages 的請求時只會載入模型，不會生成任何內容。
+    """
+    api_url = _ollama_chat_url()
+    session = registry.get_ollama_session(api_url, config.OLLAMA_API_KEY)
+    keep_alive = ollama_keep_alive()
+
+    try:
+        print(f"[Ollama Warmup] Loading {config.OLLAMA_MODEL_NAME} (num_ctx={config.OLLAMA_WARMUP_NUM_CTX})...")
+        response = session.post(api_url, json={
+            "model": config.OLLAMA_MODEL_NAME,
+            "messages": [],
+            "keep_alive": keep_alive,
+            "options": {"num_ctx": config.OLLAMA_WARMUP_NUM_CTX}
+        }, timeout=300)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"[Ollama Warmup] Failed to load {config.OLLAMA_MODEL_NAME}: {e}")
+
+    if (config.LLM_EMBEDDING_PROVIDER or "").lower() != "ollama" or not config.LLM_EMBEDDING_MODEL_TYPE:
+        return
+
+    from src.rag_service.rag import RagConfig, create_embedding_function
+
+    rag_config = RagConfig()
+    try:
+        print(f"[Ollama Warmup] Loading embedding model {rag_config.model_type}...")
+        embedding_function = create_embedding_function(
+            rag_config.provider,
+            rag_config.base_url,
+            rag_config.base_port,
+            rag_config.model_type,
+            rag_config.embedding_token
+        )
+        embedding_function(["warmup"])
+    except Exception as e:
+        print(f"[Ollama Warmup] Failed to load embedding model {rag_config.model_type}: {e}")
+
+
 def call_llm(
         system_prompt: str,
         user_prompt: str,
         provider: str = "openai",
         model: str = "gpt-4o-mini",
         temperature: float = 0.7,
-        max_tokens: int = 8192
+        max_tokens: int = 8192,
+        on_token: Optional[Callable[[str], None]] = None,
+        use_cache: bool = True,
+        hedge: Optional[bool] = None,
+        stage: str = "unknown"
 ) -> str:
     """
     [統一入口] 支援多種 LLM Provider
-    Provider: 'openai', 'groq', 'google', 'ollama', 'mistral', 'deepseek'
+    Provider: 'openai', 'groq', 'google', 'ollama', 'mistral', 'deepseek', 'replay'
+    如果有傳入 on_token，會改用串流模式，每收到一段 token 就呼叫 on_token(delta)，最後仍回傳完整文字。
+    LLM_CACHE_ENABLED 開啟時會先查詢回應快取；use_cache=False 可跳過單次呼叫的快取。
+    hedge: None = 依照 LLM_HEDGE_PROVIDER 設定；False = 不對沖；True = 強制對沖 (需有設定備援 provider)。
+    stage: 呼叫所屬的 pipeline 階段 (ceo, cpo, art, programmer, fuzzer_logic, logic_review, fixer)，用於 /metrics 統計。
+    LLM_REPLAY_MODE=record 會把成功的回應錄進 replay corpus；=replay 則所有呼叫都改由 'replay' provider 回放 (不需網路)。
     """
+    if replay_mode() == "replay":
+        provider = REPLAY_PROVIDER
+    with track_llm_call(stage, provider, model, system_prompt + user_prompt) as record:
+        cache = get_response_cache() if use_cache and provider != REPLAY_PROVIDER else None
+        cache_key = ""
+        if cache is not None:
+            cache_key = make_cache_key(provider, model, system_prompt, user_prompt, temperature, max_tokens)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                if on_token is not None:
+                    on_token(cached)
+                record.status = "cached"
+                record.response = cached
+                record_response(system_prompt, user_prompt, temperature, max_tokens, record, cached)
+                return cached
+
+        if _should_hedge(provider, model, hedge, on_token):
+            response = _call_llm_hedged(system_prompt, user_prompt, provider, model, temperature, max_tokens)
+        else:
+            response = _call_llm_uncached(system_prompt, user_prompt, provider, model, temperature, max_tokens,
+                                          on_token)
+
+        record.response = response
+        if is_llm_error(response):
+            record.status = "error"
+            return response
+        if cache is not None:
+            cache.put(cache_key, response)
+        record_response(system_prompt, user_prompt, temperature, max_tokens, record, response)
+        return response
+
+
+def _should_hedge(provider: str, model: str, hedge: Optional[bool], on_token) -> bool:
+    """
+    對沖只用在非串流呼叫，且備援 provider/model 必須與主要的不同。
+    """
+    if hedge is False or on_token is not None or provider.lower() == REPLAY_PROVIDER:
+        return False
+    hedge_provider = config.LLM_HEDGE_PROVIDER
+    if not hedge_provider:
+        return False
+    hedge_model = config.LLM_HEDGE_MODEL or model
+    return (hedge_provider.lower(), hedge_model) != (provider.lower(), model)
+
+
+def _call_llm_hedged(
+        system_prompt: str,
+        user_prompt: str,
+        provider: str,
+        model: str,
+        temperature: float,
+        max_tokens: int
+) -> str:
+    """
+    同時 (或延遲 LLM_HEDGE_DELAY 秒後) 向備援 provider 送出同一個 prompt，取最先成功的回應並取消另一個請求。
+    """
+    from src.llm import event_loop
+
+    record = current_record()
+    hedge_provider = config.LLM_HEDGE_PROVIDER
+    hedge_model = config.LLM_HEDGE_MODEL or model
+
+    primary = HedgeCandidate(provider, model, lambda: _acall_llm_uncached(
+        system_prompt, user_prompt, provider, model, temperature, max_tokens))
+    backup = HedgeCandidate(hedge_provider, hedge_model, lambda: _acall_llm_uncached(
+        system_prompt, user_prompt, hedge_provider, hedge_model, temperature, max_tokens))
+
+    result = event_loop.run_sync(bind_record(record, hedged_race(primary, backup, config.LLM_HEDGE_DELAY,
+                                                                 is_llm_error)))
+    hedge_stats.record(result)
+    print(f"[LLM Hedge] Winner: {result.winner.label} ({result.elapsed:.2f}s, hedged={result.hedged})")
+    return result.response
+
+
+def _call_llm_uncached(
+        system_prompt: str,
+        user_prompt: str,
+        provider: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        on_token: Optional[Callable[[str], None]]
+) -> str:
+    """
+    經過 Provider 的 rate limiter 後送出請求；遇到 429/5xx 時依 Retry-After 或指數退避重試 (最多 LLM_MAX_RETRIES 次)。
+    串流模式下只要已經有 token 送出就不再重試。
+    """
+    limiter = get_rate_limiter(provider)
+    reserved_tokens = reservation(estimate_tokens(system_prompt + user_prompt), max_tokens)
+    throttled_error: ProviderThrottled | None = None
+
+    for attempt in range(config.LLM_MAX_RETRIES + 1):
+        limiter.acquire(reserved_tokens)
+        chunks: list[str] = []
+        try:
+            if on_token is not None:
+                response = _stream_to_callback(system_prompt, user_prompt, provider, model, temperature, max_tokens,
+                                               on_token, chunks)
+            else:
+                response = _dispatch_llm(system_prompt, user_prompt, provider, model, temperature, max_tokens)
+        except ProviderThrottled as e:
+            limiter.release(reserved_tokens, throttled=True, retry_after=e.retry_after)
+            throttled_error = e
+            if chunks:
+                break
+            if attempt < config.LLM_MAX_RETRIES:
+                wait = limiter.backoff(attempt, e.retry_after)
+                print(f"[Rate Limit] {provider} returned {e.status}, retrying in {wait:.1f}s "
+                      f"(attempt {attempt + 1}/{config.LLM_MAX_RETRIES})")
+                time.sleep(wait)
+            continue
+        except BaseException:
+            limiter.release(reserved_tokens)
+            raise
+
+        limiter.release(reserved_tokens, used_tokens=_used_tokens(system_prompt, user_prompt, response))
+        return response
+
+    error_message = f"LLM Call Error ({provider}): {str(throttled_error)}"
+    if on_token is not None:
+        on_token(_discard_notice(provider, chunks, error_message))
+    return error_message
+
+
+def _used_tokens(system_prompt: str, user_prompt: str, response: str) -> int:
+    record = current_record()
+    prompt_tokens = record.prompt_tokens if record and record.prompt_tokens is not None else \
+        estimate_tokens(system_prompt + user_prompt)
+    completion_tokens = record.completion_tokens if record and record.completion_tokens is not None else \
+        estimate_tokens(response)
+    return prompt_tokens + completion_tokens
+
+
+def _stream_to_callback(
+        system_prompt: str,
+        user_prompt: str,
+        provider: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        on_token: Callable[[str], None],
+        chunks: list[str]
+) -> str:
+    """
+    Forward every delta to on_token and return the joined text. When the stream fails (an LLMStreamError chunk),
+    only the error string is returned, never the partial text joined with it, so it is not cached or recorded.
+    """
+    for delta in call_llm_stream(system_prompt, user_prompt, provider, model, temperature, max_tokens):
+        if isinstance(delta, LLMStreamError):
+            on_token(_discard_notice(provider, chunks, str(delta)))
+            return str(delta)
+        if not chunks:
+            note_first_token()
+        chunks.append(delta)
+        on_token(delta)
+    return "".join(chunks)
+
+
+def _discard_notice(provider: str, chunks: list[str], error_message: str) -> str:
+    """
+    The error token sent to on_token; says so when already streamed tokens are being discarded.
+    """
+    if not chunks:
+        return error_message
+    streamed = sum(len(chunk) for chunk in chunks)
+    print(f"[LLM Stream Error] {provider}: stream failed after {streamed} chars, partial output discarded")
+    return f"\n{error_message} (partial output of {streamed} chars discarded)"
+
+
+def _dispatch_llm(
+        system_prompt: str,
+        user_prompt: str,
+        provider: str,
+        model: str,
+        temperature: float,
+        max_tokens: int
+) -> str:
     provider = provider.lower()
 
+    # --- Case 0: Replay (錄製的回應，不需網路) ---
+    if provider == REPLAY_PROVIDER:
+        return call_replay(system_prompt, user_prompt, temperature, max_tokens)
+
     # --- Case 1: Google Gemini ---
     if provider in ["google", "gemini"]:
         if model.startswith("gpt"):
@@ -168,7 +570,8 @@ def call_llm(
 
     # --- Case 2: Ollama (Local) ---
     if provider == "ollama":
-        return call_ollama(system_prompt, user_prompt, model, temperature, num_ctx=8192)
+        return call_ollama(system_prompt, user_prompt, model, temperature,
+                           num_ctx=ollama_num_ctx(system_prompt, user_prompt, max_tokens))
 
     # --- Case 3: OpenAI Compatible APIs (OpenAI, Groq, Mistral, DeepSeek) ---
     openai_config = get_client_config(provider)
@@ -182,8 +585,8 @@ def call_llm(
         return f"Error: 請在 .env 設定 {provider.upper()}_API_KEY"
 
     try:
-        # 初始化 OpenAI Client
-        client = openai.OpenAI(api_key=api_key, base_url=base_url)
+        # 取得共用的 OpenAI Client (keep-alive connection pool)
+        client = registry.get_openai_client(provider, api_key, base_url)
 
         response = client.chat.completions.create(
             model=model,
@@ -192,14 +595,363 @@ def call_llm(
                 {"role": "user", "content": user_prompt}
             ],
             temperature=temperature,
-            timeout=600,  # 強制設定 600秒 超時
+            timeout=config.LLM_TIMEOUT,  # 預設 600秒 超時
             max_tokens=max_tokens  # 強制設定最大 Token 數
         )
+        _note_openai_usage(response)
         return response.choices[0].message.content
 
     except KeyError as e:
         print(f"[LLM Config Error] Missing key: {e}")
         return f"Configuration Error: Missing key {str(e)}"
     except Exception as e:
+        raise_if_throttled(e, provider)
         print(f"[LLM Call Error] Provider: {provider}, Error: {e}")
-        return f"LLM Call Error ({provider}): {str(e)}"
\ No newline at end of file
+        return f"LLM Call Error ({provider}): {str(e)}"
+
+
+def call_llm_stream(
+        system_prompt: str,
+        user_prompt: str,
+        provider: str = "openai",
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.7,
+        max_tokens: int = 8192
+) -> Iterator[str]:
+    """
+    [統一串流入口] 與 call_llm 相同的 Provider 路由，但逐段 yield token delta。
+    錯誤時以 LLMStreamError 錯誤字串表示 (作為唯一/最後一段 yield 出來)；已經送出部分 token 後才失敗時，
+    呼叫端必須捨棄部分輸出，只回傳錯誤字串 (見 _stream_to_callback)。
+    """
+    provider = provider.lower()
+
+    # --- Case 0: Replay (錄製的回應，不需網路) ---
+    if provider == REPLAY_PROVIDER:
+        yield from stream_replay(system_prompt, user_prompt, temperature, max_tokens)
+        return
+
+    # --- Case 1: Google Gemini ---
+    if provider in ["google", "gemini"]:
+        if model.startswith("gpt"):
+            model = "gemini-2.5-flash"
+        yield from stream_google_gemini(system_prompt, user_prompt, model, temperature, max_tokens=max_tokens)
+        return
+
+    # --- Case 2: Ollama (Local) ---
+    if provider == "ollama":
+        yield from stream_ollama(system_prompt, user_prompt, model, temperature,
+                                 num_ctx=ollama_num_ctx(system_prompt, user_prompt, max_tokens))
+        return
+
+    # --- Case 3: OpenAI Compatible APIs (OpenAI, Groq, Mistral, DeepSeek) ---
+    openai_config = get_client_config(provider)
+    if not openai_config:
+        yield LLMStreamError(f"Error: 不支援的 Provider '{provider}'")
+        return
+
+    api_key = openai_config.get("api_key")
+    base_url = openai_config.get("base_url")
+
+    if not api_key:
+        yield LLMStreamError(f"Error: 請在 .env 設定 {provider.upper()}_API_KEY")
+        return
+
+    try:
+        client = registry.get_openai_client(provider, api_key, base_url)
+
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temperature,
+            timeout=config.LLM_TIMEOUT,
+            max_tokens=max_tokens,
+            stream=True,
+            # 只有 OpenAI 確定支援 stream_options，其他相容服務改用本地估算
+            **({"stream_options": {"include_usage": True}} if provider == "openai" else {})
+        )
+        for chunk in stream:
+            if chunk.usage is not None:
+                note_usage(chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+            if not chunk.choices:
+                continue
+            note_finish_reason(chunk.choices[0].finish_reason)
+            if chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    except Exception as e:
+        raise_if_throttled(e, provider)
+        print(f"[LLM Call Error] Provider: {provider}, Error: {e}")
+        yield LLMStreamError(f"LLM Call Error ({provider}): {str(e)}")
+
+
+async def acall_google_gemini(
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int = 8192
+) -> str:
+    """
+    call_google_gemini 的 asyncio 版本 (generate_content_async)
+    """
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        return "Error: 請安裝 google-generativeai 套件 (pip install google-generativeai)"
+
+    api_key: str = config.GOOGLE_API_KEY
+    if not api_key:
+        return "Error: 未設定 GOOGLE_API_KEY"
+
+    try:
+        generation_config: dict = _gemini_generation_config(temperature, max_tokens)
+        gemini_model = registry.get_gemini_model(api_key, model, system_prompt)
+
+        response = await gemini_model.generate_content_async(user_prompt, generation_config=generation_config)
+        _note_gemini_usage(response)
+        return response.text
+    except Exception as e:
+        raise_if_throttled(e, "google")
+        return f"Gemini API Error: {str(e)}"
+
+
+async def acall_ollama(
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        temperature: float,
+        num_ctx: int = 4096
+) -> str:
+    """
+    call_ollama 的 asyncio 版本 (httpx.AsyncClient)
+    """
+    import httpx
+
+    print(f"Run ollama (Native API, async): {model}")
+
+    api_url = _ollama_chat_url()
+    payload = _ollama_payload(system_prompt, user_prompt, model, temperature, num_ctx, stream=False)
+    client = registry.get_async_ollama_client(api_url, config.OLLAMA_API_KEY)
+
+    response = None
+
+    try:
+        response = await client.post(api_url, json=payload, timeout=300)
+
+        if response.status_code == 401:
+            return "Ollama Error: 401 Unauthorized. 請檢查 API Key 是否正確。"
+
+        response.raise_for_status()
+
+        result = response.json()
+        _note_ollama_usage(result)
+        return result["message"]["content"]
+
+    except httpx.HTTPError as e:
+        raise_if_throttled(e, "ollama")
+        print(f"[Ollama Error] Connection failed: {e}")
+        return f"Ollama Error: {str(e)}"
+    except KeyError:
+        return f"Ollama Error: Unexpected response format. {response.text}"
+
+
+async def acall_llm(
+        system_prompt: str,
+        user_prompt: str,
+        provider: str = "openai",
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.7,
+        max_tokens: int = 8192,
+        use_cache: bool = True,
+        stage: str = "unknown"
+) -> str:
+    """
+    [統一非同步入口] 與 call_llm 相同的 Provider 路由與錯誤語意 (錯誤以字串回傳)
+    Provider: 'openai', 'groq', 'google', 'ollama', 'mistral', 'deepseek', 'replay'
+    在同步程式中可用 src.llm.event_loop.run_sync(acall_llm(...)) 執行，讓多個呼叫共用同一個 event loop。
+    """
+    if replay_mode() == "replay":
+        provider = REPLAY_PROVIDER
+    with track_llm_call(stage, provider, model, system_prompt + user_prompt) as record:
+        cache = get_response_cache() if use_cache and provider != REPLAY_PROVIDER else None
+        cache_key = ""
+        if cache is not None:
+            cache_key = make_cache_key(provider, model, system_prompt, user_prompt, temperature, max_tokens)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                record.status = "cached"
+                record.response = cached
+                record_response(system_prompt, user_prompt, temperature, max_tokens, record, cached)
+                return cached
+
+        response = await _acall_llm_uncached(system_prompt, user_prompt, provider, model, temperature, max_tokens)
+
+        record.response = response
+        if is_llm_error(response):
+            record.status = "error"
+            return response
+        if cache is not None:
+            cache.put(cache_key, response)
+        record_response(system_prompt, user_prompt, temperature, max_tokens, record, response)
+        return response
+
+
+async def _acall_llm_uncached(
+        system_prompt: str,
+        user_prompt: str,
+        provider: str,
+        model: str,
+        temperature: float,
+        max_tokens: int
+) -> str:
+    """
+    _call_llm_uncached 的 asyncio 版本 (同一個 rate limiter 與重試策略)
+    """
+    limiter = get_rate_limiter(provider)
+    reserved_tokens = reservation(estimate_tokens(system_prompt + user_prompt), max_tokens)
+    throttled_error: ProviderThrottled | None = None
+
+    for attempt in range(config.LLM_MAX_RETRIES + 1):
+        await limiter.aacquire(reserved_tokens)
+        try:
+            response = await _adispatch_llm(system_prompt, user_prompt, provider, model, temperature, max_tokens)
+        except ProviderThrottled as e:
+            limiter.release(reserved_tokens, throttled=True, retry_after=e.retry_after)
+            throttled_error = e
+            if attempt < config.LLM_MAX_RETRIES:
+                wait = limiter.backoff(attempt, e.retry_after)
+                print(f"[Rate Limit] {provider} returned {e.status}, retrying in {wait:.1f}s "
+                      f"(attempt {attempt + 1}/{config.LLM_MAX_RETRIES})")
+                await asyncio.sleep(wait)
+            continue
+        except BaseException:
+            limiter.release(reserved_tokens)
+            raise
+
+        limiter.release(reserved_tokens, used_tokens=_used_tokens(system_prompt, user_prompt, response))
+        return response
+
+    return f"LLM Call Error ({provider}): {str(throttled_error)}"
+
+
+async def _adispatch_llm(
+        system_prompt: str,
+        user_prompt: str,
+        provider: str,
+        model: str,
+        temperature: float,
+        max_tokens: int
+) -> str:
+    provider = provider.lower()
+
+    # --- Case 0: Replay (錄製的回應，不需網路) ---
+    if provider == REPLAY_PROVIDER:
+        return await acall_replay(system_prompt, user_prompt, temperature, max_tokens)
+
+    # --- Case 1: Google Gemini ---
+    if provider in ["google", "gemini"]:
+        if model.startswith("gpt"):
+            model = "gemini-2.5-flash"
+        return await acall_google_gemini(system_prompt, user_prompt, model, temperature, max_tokens=max_tokens)
+
+    # --- Case 2: Ollama (Local) ---
+    if provider == "ollama":
+        return await acall_ollama(system_prompt, user_prompt, model, temperature,
+                                  num_ctx=ollama_num_ctx(system_prompt, user_prompt, max_tokens))
+
+    # --- Case 3: OpenAI Compatible APIs (OpenAI, Groq, Mistral, DeepSeek) ---
+    openai_config = get_client_config(provider)
+    if not openai_config:
+        return f"Error: 不支援的 Provider '{provider}'"
+
+    api_key = openai_config.get("api_key")
+    base_url = openai_config.get("base_url")
+
+    if not api_key:
+        return f"Error: 請在 .env 設定 {provider.upper()}_API_KEY"
+
+    try:
+        client = registry.get_async_openai_client(provider, api_key, base_url)
+
+        response = await client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temperature,
+            timeout=config.LLM_TIMEOUT,
+            max_tokens=max_tokens
+        )
+        _note_openai_usage(response)
+        return response.choices[0].message.content
+
+    except KeyError as e:
+        print(f"[LLM Config Error] Missing key: {e}")
+        return f"Configuration Error: Missing key {str(e)}"
+    except Exception as e:
+        raise_if_throttled(e, provider)
+        print(f"[LLM Call Error] Provider: {provider}, Error: {e}")
+        return f"LLM Call Error ({provider}): {str(e)}"
+
+
+_RELAY_DONE = object()
+
+
+def relay_tokens(func: Callable[..., Any], *args, **kwargs) -> Generator[str, None, Any]:
+    """
+    Run func(*args, on_token=..., **kwargs) in a worker thread and yield every token delta it produces.
+    The return value of func becomes the return value of this generator, so callers can write:
+        result = yield from relay_tokens(run_design_phase, user_input, provider, model)
+    Exceptions raised by func are re-raised in the caller.
+    :param func: A function accepting an on_token callback
+    :type func: Callable
+
+    :return: The return value of func
+    :rtype: Any
+    """
+    token_queue: queue.Queue = queue.Queue()
+    outcome: dict = {}
+
+    def worker():
+        try:
+            outcome["value"] = func(*args, on_token=token_queue.put, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            token_queue.put(_RELAY_DONE)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+    while True:
+        item = token_queue.get()
+        if item is _RELAY_DONE:
+            break
+        yield item
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("value")
+
+
+def format_sse_token(delta: str) -> str:
+    """
+    SSE 的 data 不能包含換行，所以 token 以 JSON 字串編碼，前端用 "TOKEN:" 前綴辨識。
+    """
+    return f"data: TOKEN:{json.dumps(delta, ensure_ascii=False)}\n\n"
+
+
+def relay_sse_tokens(func: Callable[..., Any], *args, **kwargs) -> Generator[str, None, Any]:
+    """
+    Same as relay_tokens, but yields SSE formatted token events ("data: TOKEN:...").
+    """
+    relay = relay_tokens(func, *args, **kwargs)
+    while True:
+        try:
+            delta = next(relay)
+        except StopIteration as stop:
+            return stop.value
+        yield format_sse_token(delta)
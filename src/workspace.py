@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+from config import config
+
+_JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+MANIFEST_FILENAME = "manifest.json"
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def is_valid_job_id(job_id: str | None) -> bool:
+    return bool(job_id) and bool(_JOB_ID_PATTERN.match(job_id))
+
+
+def job_dir(job_id: str) -> str:
+    """
+    The isolated workspace of a job (output/jobs/<job_id>). Every file of a generation
+    (main.py, fuzz_logic.py, game_runtime.py, fuzzer temp files) lives here, so concurrent jobs never clobber each other.
+    :raises ValueError: For ids that are not generated by new_job_id (no path traversal through the session)
+    """
+    if not is_valid_job_id(job_id):
+        raise ValueError(f"Invalid job id: {job_id!r}")
+    return os.path.join(config.JOBS_DIR, job_id)
+
+
+def create_workspace(job_id: str) -> str:
+    path = job_dir(job_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def job_file(job_id: str | None, filename: str = "main.py") -> str | None:
+    """
+    :return: The path of a file of the job, or None when the job id is missing / invalid
+    :rtype: str | None
+    """
+    if not is_valid_job_id(job_id):
+        return None
+    return os.path.join(job_dir(job_id), filename)
+
+
+def job_id_of(path: str | None) -> str | None:
+    """
+    The job owning a workspace path (a directory or a file inside it), or None for paths outside JOBS_DIR.
+    """
+    if not path:
+        return None
+    jobs_root = os.path.abspath(config.JOBS_DIR)
+    path = os.path.abspath(path)
+    if os.path.splitext(path)[1]:
+        path = os.path.dirname(path)
+    if os.path.dirname(path) != jobs_root:
+        return None
+    job_id = os.path.basename(path)
+    return job_id if is_valid_job_id(job_id) else None
+
+
+class ArtifactStore:
+    """
+    Content-addressed store of generation artifacts (GDD, assets JSON, every code revision, fuzz logic).
+    Objects are stored once under objects/<sha256[:2]>/<sha256>, so identical revisions are deduplicated.
+    Each job workspace has a manifest.json listing the artifacts it references (kind, hash, time);
+    gc() removes expired workspaces and every object no manifest references any more.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def put(self, content: str | bytes) -> str:
+        """
+        :return: The SHA-256 of the content (its address)
+        :rtype: str
+        """
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先寫暫存檔再 rename，避免其他 worker 讀到寫了一半的物件
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return digest
+
+    def get(self, digest: str) -> str | None:
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def record(self, job_id: str, kind: str, content: str | bytes) -> str:
+        """
+        Store an artifact and add it to the job's manifest (a repeated identical revision is not added twice in a row).
+        :param kind: "gdd", "assets", "code", "fuzz_logic", ...
+        :type kind: str
+
+        :return: The SHA-256 of the content
+        :rtype: str
+        """
+        digest = self.put(content)
+        manifest_path = os.path.join(create_workspace(job_id), MANIFEST_FILENAME)
+        with self._lock:
+            manifest = _read_manifest(manifest_path)
+            same_kind = [a for a in manifest["artifacts"] if a["kind"] == kind]
+            if not same_kind or same_kind[-1]["hash"] != digest:
+                manifest["artifacts"].append({"kind": kind, "hash": digest, "created_at": time.time()})
+                temp_path = f"{manifest_path}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, ensure_ascii=False, indent=2)
+                os.replace(temp_path, manifest_path)
+        return digest
+
+    def history(self, job_id: str, kind: str | None = None) -> list[dict]:
+        """
+        :return: The manifest entries of the job (optionally only one kind), oldest first
+        :rtype: list[dict]
+        """
+        manifest = _read_manifest(os.path.join(job_dir(job_id), MANIFEST_FILENAME))
+        return [a for a in manifest["artifacts"] if kind is None or a["kind"] == kind]
+
+    def gc(self, max_age: float) -> dict:
+        """
+        Delete job workspaces not modified for max_age seconds (max_age <= 0 keeps every job),
+        then every object that no remaining manifest references.
+        :return: Number of removed jobs and objects
+        :rtype: dict
+        """
+        removed_jobs = 0
+        referenced: set[str] = set()
+        now = time.time()
+
+        if os.path.isdir(config.JOBS_DIR):
+            for name in os.listdir(config.JOBS_DIR):
+                path = os.path.join(config.JOBS_DIR, name)
+                if not is_valid_job_id(name) or not os.path.isdir(path):
+                    continue
+                if max_age > 0 and now - _last_modified(path) > max_age:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed_jobs += 1
+                    continue
+                manifest = _read_manifest(os.path.join(path, MANIFEST_FILENAME))
+                referenced.update(a["hash"] for a in manifest["artifacts"])
+
+        removed_objects = 0
+        objects_root = os.path.join(self.root, "objects")
+        with self._lock:
+            if os.path.isdir(objects_root):
+                for prefix in os.listdir(objects_root):
+                    prefix_dir = os.path.join(objects_root, prefix)
+                    for name in os.listdir(prefix_dir):
+                        # 進行中的暫存檔 (.tmp) 不刪除
+                        if name.endswith(".tmp") or name in referenced:
+                            continue
+                        os.remove(os.path.join(prefix_dir, name))
+                        removed_objects += 1
+                    if not os.listdir(prefix_dir):
+                        os.rmdir(prefix_dir)
+        return {"jobs": removed_jobs, "objects": removed_objects}
+
+
+def _read_manifest(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"artifacts": []}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"artifacts": []}
+    manifest.setdefault("artifacts", [])
+    return manifest
+
+
+def _last_modified(path: str) -> float:
+    latest = os.path.getmtime(path)
+    for entry in os.scandir(path):
+        latest = max(latest, entry.stat().st_mtime)
+    return latest
+
+
+artifact_store = ArtifactStore(config.ARTIFACTS_DIR)
+
+
+def record_artifact(path_or_job: str | None, kind: str, content: str | None) -> str | None:
+    """
+    Record an artifact for the job owning the given workspace path (or job id).
+    Paths outside JOBS_DIR (e.g. the legacy shared output/ directory) are ignored.
+    """
+    job_id = path_or_job if is_valid_job_id(path_or_job) else job_id_of(path_or_job)
+    if job_id is None or content is None:
+        return None
+    try:
+        return artifact_store.record(job_id, kind, content)
+    except OSError as e:
+        print(f"[Workspace] Failed to record {kind} artifact of job {job_id}: {e}")
+        return None
+
+
+def record_file(file_path: str | None, kind: str) -> str | None:
+    """
+    Record the current content of a workspace file (e.g. a new code revision).
+    """
+    if not file_path or not os.path.exists(file_path):
+        return None
+    with open(file_path, "r", encoding="utf-8") as f:
+        return record_artifact(file_path, kind, f.read())
+
+
+def collect_garbage() -> dict:
+    """
+    Remove jobs older than JOB_TTL and unreferenced artifacts.
+    """
+    result = artifact_store.gc(config.JOB_TTL)
+    if result["jobs"] or result["objects"]:
+        print(f"[Workspace] GC removed {result['jobs']} jobs and {result['objects']} artifacts")
+    return result
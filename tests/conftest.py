@@ -0,0 +1,6 @@
+import os
+import sys
+
+# 從專案根目錄匯入 config / src (與 app.py 相同)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
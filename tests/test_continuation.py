@@ -0,0 +1,28 @@
+from src.generation.continuation import has_open_code_fence, stitch
+
+
+def test_open_code_fence():
+    assert has_open_code_fence("```python\nx = 1\n")
+    assert not has_open_code_fence("```python\nx = 1\n```")
+    assert not has_open_code_fence("no code")
+
+
+def test_stitch_drops_reopened_fence():
+    previous = "```python\nimport pygame\nx = 1\n"
+    assert stitch(previous, "```python\ny = 2\n```") == "```python\nimport pygame\nx = 1\ny = 2\n```"
+
+
+def test_stitch_drops_overlap():
+    previous = "```python\ndef update(self):\n    self.x += self.speed\n"
+    continuation = "    self.x += self.speed\n    self.y += 1\n```"
+    assert stitch(previous, continuation) == previous + "    self.y += 1\n```"
+
+
+def test_stitch_replaces_rewritten_partial_line():
+    previous = "```python\nx = 1\nscreen.fi"
+    assert stitch(previous, "screen.fill((0, 0, 0))\n```") == "```python\nx = 1\nscreen.fill((0, 0, 0))\n```"
+
+
+def test_stitch_short_overlap_is_kept():
+    # 少於 MIN_OVERLAP_CHARS 的重疊可能是巧合，不刪除
+    assert stitch("```python\nx = 1\n", "1\n```") == "```python\nx = 1\n1\n```"
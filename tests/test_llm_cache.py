@@ -0,0 +1,75 @@
+import sqlite3
+import time
+
+import pytest
+
+from src.llm.cache import ResponseCache, make_cache_key
+
+
+def test_make_cache_key_depends_on_every_parameter():
+    base = make_cache_key("openai", "gpt-4o-mini", "system", "user", 0.2, 8192)
+    assert base == make_cache_key("openai", "gpt-4o-mini", "system", "user", 0.2, 8192)
+    assert base != make_cache_key("openai", "gpt-4o-mini", "system", "user", 0.7, 8192)
+    assert base != make_cache_key("groq", "gpt-4o-mini", "system", "user", 0.2, 8192)
+
+
+def test_get_put_and_hit_counters(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.get("k") is None
+    cache.put("k", "response")
+    assert cache.get("k") == "response"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_ttl_expires_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl=1)
+    cache.put("k", "response")
+    assert cache.get("k") == "response"
+    cache.ttl = 0.01
+    time.sleep(0.05)
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_by_entry_count(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.put("a", "1")
+    time.sleep(0.01)
+    cache.put("b", "2")
+    time.sleep(0.01)
+    cache.get("a")  # a 比 b 更近期被存取
+    time.sleep(0.01)
+    cache.put("c", "3")
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+
+
+def test_lru_eviction_by_size(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=10)
+    cache.put("a", "12345")
+    time.sleep(0.01)
+    cache.put("b", "123456")
+    assert cache.get("a") is None
+    assert cache.get("b") == "123456"
+    cache.put("huge", "x" * 11)  # 超過上限的回應不快取
+    assert cache.get("huge") is None
+
+
+def test_locked_database_raises_the_original_error(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache(path)
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN EXCLUSIVE")
+    cache._connect = lambda: sqlite3.connect(path, timeout=0.05, isolation_level=None)
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            cache.put("k", "response")
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            cache.get("k")
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+    cache.put("k", "response")
+    assert cache.get("k") == "response"
@@ -0,0 +1,29 @@
+from src.testing.minimizer import ddmin
+
+
+def counting(predicate):
+    calls = []
+
+    def test_many(candidates):
+        calls.extend(candidates)
+        return [predicate(candidate) for candidate in candidates]
+
+    return test_many, calls
+
+
+def test_ddmin_finds_the_two_failure_inducing_inputs():
+    test_many, _ = counting(lambda items: 37 in items and 911 in items)
+    assert ddmin(list(range(1000)), test_many, 500) == [37, 911]
+
+
+def test_ddmin_returns_empty_when_no_input_is_needed():
+    test_many, _ = counting(lambda items: True)
+    assert ddmin(list(range(10)), test_many, 50) == []
+
+
+def test_ddmin_never_exceeds_the_budget():
+    for budget in (1, 5, 17, 64):
+        test_many, calls = counting(lambda items: 37 in items and 911 in items)
+        result = ddmin(list(range(1000)), test_many, budget)
+        assert len(calls) <= budget
+        assert 37 in result and 911 in result
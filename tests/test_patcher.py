@@ -0,0 +1,92 @@
+import pytest
+
+from src.testing.patcher import PatchError, PatchHunk, apply_hunk, apply_patch, parse_patch, parse_search_replace
+
+CODE = """import pygame
+
+
+class Player:
+    def __init__(self):
+        self.x = 0
+        self.speed = 5
+
+    def update(self):
+        self.x += self.speed
+"""
+
+
+def test_parse_search_replace_blocks():
+    text = """Fix:
+<<<<<<< SEARCH
+        self.speed = 5
+=======
+        self.speed = 3
+>>>>>>> REPLACE
+and
+<<<<<<< SEARCH
+import pygame
+=======
+import pygame
+import random
+>>>>>>> REPLACE
+"""
+    hunks = parse_search_replace(text)
+    assert [(h.search, h.replace) for h in hunks] == [
+        ("        self.speed = 5\n", "        self.speed = 3\n"),
+        ("import pygame\n", "import pygame\nimport random\n"),
+    ]
+
+
+def test_parse_patch_falls_back_to_unified_diff():
+    diff = """--- a/main.py
++++ b/main.py
+@@ -7,1 +7,1 @@
+-        self.speed = 5
++        self.speed = 3
+"""
+    hunks = parse_patch(diff)
+    assert hunks == [PatchHunk("        self.speed = 5\n", "        self.speed = 3\n", 7)]
+
+
+def test_apply_exact_match():
+    patched = apply_patch(CODE, "<<<<<<< SEARCH\n        self.speed = 5\n=======\n        self.speed = 3\n>>>>>>> REPLACE")
+    assert "self.speed = 3" in patched
+    assert "self.speed = 5" not in patched
+
+
+def test_apply_reindents_replacement_to_matched_block():
+    # 模型去掉了縮排: 以空白不敏感的比對找到區塊，替換內容縮排回原本的位置
+    patch = "<<<<<<< SEARCH\nself.x += self.speed\n=======\nself.x = min(800, self.x + self.speed)\n>>>>>>> REPLACE"
+    patched = apply_patch(CODE, patch)
+    assert "        self.x = min(800, self.x + self.speed)\n" in patched
+
+
+def test_fuzzy_match_above_threshold():
+    hunk = PatchHunk("        self.speed = 5  # px\n", "        self.speed = 4\n")
+    assert "self.speed = 4" in apply_hunk(CODE, hunk, threshold=0.8)
+
+
+def test_fuzzy_match_below_threshold_raises():
+    hunk = PatchHunk("        self.velocity_y = gravity * 2\n", "        pass\n")
+    with pytest.raises(PatchError, match="not found"):
+        apply_hunk(CODE, hunk, threshold=0.85)
+
+
+def test_ambiguous_match_raises_without_line_hint():
+    code = "x = 1\ny = 2\nx = 1\n"
+    with pytest.raises(PatchError, match="matches 2 places"):
+        apply_hunk(code, PatchHunk("x = 1\n", "x = 3\n"))
+
+
+def test_ambiguous_match_uses_line_hint():
+    code = "x = 1\ny = 2\nx = 1\n"
+    assert apply_hunk(code, PatchHunk("x = 1\n", "x = 3\n", line_hint=3)) == "x = 1\ny = 2\nx = 3\n"
+
+
+def test_empty_search_appends():
+    assert apply_hunk("a = 1\n", PatchHunk("", "b = 2\n")) == "a = 1\nb = 2\n"
+
+
+def test_no_hunks_raises():
+    with pytest.raises(PatchError):
+        apply_patch(CODE, "I could not find the bug.")
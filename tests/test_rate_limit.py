@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+
+from src.llm.rate_limit import AdaptiveConcurrency, TokenBucket, reservation
+
+
+def test_reservation_caps_the_completion_estimate():
+    assert reservation(100, 50) == 150
+    assert reservation(100, 1_000_000) < 1_000_000
+
+
+def test_token_bucket_refund_and_charge():
+    bucket = TokenBucket(60)
+    assert bucket.reserve(60) == 0.0
+    bucket.refund(30)
+    assert bucket.reserve(30) == 0.0
+    bucket.charge(30)
+    assert bucket.reserve(1) > 0
+
+
+def test_async_waiter_is_woken_by_a_release_from_another_thread():
+    window = AdaptiveConcurrency(1, 1)
+    window.acquire()
+    released_at = {}
+
+    def release_later():
+        time.sleep(0.2)
+        released_at["time"] = time.monotonic()
+        window.release()
+
+    async def wait_for_slot():
+        await window.aacquire()
+        return time.monotonic()
+
+    threading.Thread(target=release_later).start()
+    acquired_at = asyncio.run(wait_for_slot())
+    assert 0 <= acquired_at - released_at["time"] < 0.05
+    assert window.in_flight == 1 and window._async_waiters == []
+
+
+def test_waiters_on_separate_event_loops_share_the_window():
+    window = AdaptiveConcurrency(2, 2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    async def call():
+        await window.aacquire()
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        await asyncio.sleep(0.01)
+        with lock:
+            active.pop()
+        window.release()
+
+    async def calls():
+        await asyncio.gather(*(call() for _ in range(10)))
+
+    threads = [threading.Thread(target=asyncio.run, args=(calls(),)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert len(peak) == 30
+    assert max(peak) <= int(window.limit)
+    assert window.in_flight == 0
+
+
+def test_cancelled_waiter_is_removed():
+    window = AdaptiveConcurrency(1, 1)
+    window.acquire()
+
+    async def cancel_waiter():
+        task = asyncio.ensure_future(window.aacquire())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(cancel_waiter())
+    assert window._async_waiters == []
+    assert window.in_flight == 1
@@ -0,0 +1,62 @@
+from src.generation.skeleton import extract_function, find_placeholders, splice
+
+SKELETON = '''import pygame
+
+
+class Game:
+    def draw(self, screen):
+        """Draw the score."""
+        raise NotImplementedError
+
+    def reset(self):
+        self.score = 0
+
+
+def main():
+    """Run the game."""
+    raise NotImplementedError
+'''
+
+
+def test_find_placeholders():
+    placeholders = find_placeholders(SKELETON)
+    assert [(p.name, p.short_name, p.start_line, p.end_line, p.col_offset) for p in placeholders] == [
+        ("Game.draw", "draw", 5, 7, 4),
+        ("main", "main", 13, 15, 0),
+    ]
+
+
+def test_extract_function_dedents_and_skips_placeholders():
+    response = "Here:\n```python\n    def draw(self, screen):\n        screen.fill((0, 0, 0))\n```"
+    assert extract_function(response, "draw") == "def draw(self, screen):\n    screen.fill((0, 0, 0))"
+    assert extract_function("```python\ndef draw(self):\n    raise NotImplementedError\n```", "draw") is None
+    assert extract_function("```python\ndef other():\n    pass\n```", "draw") is None
+
+
+def test_splice_indents_methods_and_keeps_missing_placeholders():
+    placeholders = find_placeholders(SKELETON)
+    code = splice(SKELETON, {"Game.draw": "def draw(self, screen):\n    screen.fill((0, 0, 0))"}, placeholders)
+    assert "    def draw(self, screen):\n        screen.fill((0, 0, 0))\n" in code
+    assert code.count("raise NotImplementedError") == 1
+
+
+def test_multiline_strings_are_not_reindented():
+    response = '''```python
+    def draw(self, screen):
+        text = """Line one
+line two
+    line three"""
+        screen.blit(text)
+```'''
+    source = extract_function(response, "draw")
+    code = splice(SKELETON, {"Game.draw": source}, find_placeholders(SKELETON))
+    namespace = {}
+    exec(compile(code.replace("import pygame\n", ""), "main.py", "exec"), namespace)
+
+    class Screen:
+        def blit(self, text):
+            self.text = text
+
+    screen = Screen()
+    namespace["Game"]().draw(screen)
+    assert screen.text == "Line one\nline two\n    line three"
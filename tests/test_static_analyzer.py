@@ -0,0 +1,90 @@
+from src.testing.static_analyzer import analyze_code
+
+
+def rules(code: str, severity: str | None = None) -> list[str]:
+    return [d.rule for d in analyze_code(code) if severity is None or d.severity == severity]
+
+
+CLEAN_GAME = '''
+import pygame
+import pygame.midi
+
+
+class Player(pygame.sprite.Sprite):
+    def update(self):
+        pass
+
+
+class Game:
+    def __init__(self):
+        self.stats = {}
+        self.all_sprites = pygame.sprite.Group()
+        self.all_sprites.add(Player())
+
+    def run(self, rect):
+        self.stats.update({"score": 1})
+        pygame.display.update(rect)
+        self.all_sprites.update()
+        pygame.midi.init()
+
+
+def main():
+    Game().run(None)
+
+
+if __name__ == "__main__":
+    main()
+'''
+
+
+def test_clean_code_has_no_findings():
+    assert analyze_code(CLEAN_GAME) == []
+
+
+def test_dict_and_display_update_do_not_count_as_sprite_updates():
+    assert "update-signature" not in rules(CLEAN_GAME)
+
+
+def test_group_update_with_more_arguments_than_sprite_accepts():
+    code = CLEAN_GAME.replace("self.all_sprites.update()", "self.all_sprites.update(0.016)")
+    findings = [d for d in analyze_code(code) if d.rule == "update-signature"]
+    assert len(findings) == 1
+    assert "Player.update()" in findings[0].message
+
+
+def test_variadic_update_is_accepted():
+    code = CLEAN_GAME.replace("self.all_sprites.update()", "self.all_sprites.update(0.016)") \
+        .replace("def update(self):", "def update(self, *args):")
+    assert "update-signature" not in rules(code)
+
+
+def test_misspelled_module_attribute_is_reported_once_per_line():
+    code = "import pygame\npygame.draw.rectangle(None)\n"
+    findings = analyze_code(code)
+    assert [(d.rule, d.line) for d in findings] == [("unknown-attribute", 2)]
+    assert findings[0].message == "'pygame.draw' has no attribute 'rectangle'"
+
+
+def test_explicitly_imported_submodule_is_known():
+    code = "import pygame\nimport pygame.midi\npygame.midi.init()\n"
+    assert rules(code) == []
+
+
+def test_undefined_name_and_missing_import():
+    code = "def f():\n    return math.pi + scroe\nscore = 0\n"
+    assert rules(code) == ["missing-import", "undefined-name"]
+    assert "did you mean 'score'" in analyze_code(code)[1].message
+
+
+def test_unreachable_game_loop_is_an_error():
+    code = "import sys\n\ndef main():\n    sys.exit()\n    while True:\n        pass\n\nmain()\n"
+    assert rules(code, "error") == ["unreachable-code"]
+
+
+def test_main_never_called():
+    assert rules("def main():\n    pass\n") == ["unreachable-main"]
+
+
+def test_syntax_error_is_a_single_diagnostic():
+    findings = analyze_code("def broken(:\n    pass\n")
+    assert [d.rule for d in findings] == ["syntax"]